@@ -0,0 +1,100 @@
+# ## Benchmark of the startup time of the Sagehen script
+#
+# Times fresh Python interpreters that import config, import the modules in
+# ../common that are not used for plotting and load
+# ../script/ex-gwf-sagehen-gsf.py with --no_run and --no_plot, the startup
+# path of headless workers. Each case is repeated nrepeat times and the
+# median wall time is reported with the slow packages that were actually
+# executed. Importing flopy and matplotlib.pyplot is timed for reference.
+# The benchmark fails if a headless startup executes one of the packages in
+# deferred, so they stay deferred to the stages that need them. The results
+# depend on the machine, they are saved in ../tables/bench-import-time.csv,
+# which is not tracked by git.
+
+import os
+import sys
+import json
+import subprocess
+
+sys.path.append(os.path.join("..", "common"))
+import config
+import ensemble
+
+# Number of times each case is timed
+nrepeat = 5
+
+# Packages that a headless startup must not execute
+deferred = ("flopy", "matplotlib", "IPython", "pandas", "scipy")
+
+# Code run in a fresh interpreter from ../script for every case
+cases = {
+    "config": "import config",
+    "common": (
+        "import config, arraycache, ensemble, gsflow, mf6bin, mf6bmi, "
+        "mf6lst, mf6run, mf6write, mfnwt, prms"
+    ),
+    "script headless": (
+        "sys.argv[1:] = ['--no_run', '--no_plot']\n"
+        "spec = importlib.util.spec_from_file_location("
+        "'sagehen', 'ex-gwf-sagehen-gsf.py')\n"
+        "spec.loader.exec_module(importlib.util.module_from_spec(spec))"
+    ),
+    "flopy and pyplot": "import flopy, matplotlib.pyplot",
+}
+
+# Wrapper that times the case and lists the packages that were executed
+template = """
+import os, sys, time, json, types, importlib.util
+t0 = time.perf_counter()
+sys.path.append(os.path.join("..", "common"))
+{code}
+seconds = time.perf_counter() - t0
+loaded = [
+    name for name in {deferred!r}
+    if type(sys.modules.get(name)) is types.ModuleType
+]
+print(json.dumps(dict(seconds=seconds, loaded=loaded)))
+"""
+
+
+def time_case(code):
+    """Run code in a fresh interpreter, return the seconds and packages"""
+    proc = subprocess.run(
+        [sys.executable, "-c", template.format(code=code, deferred=deferred)],
+        cwd=os.path.join("..", "script"),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+if __name__ == "__main__":
+    print(
+        "{:<18s} {:>9s} {:>9s}  {}".format("case", "median s", "min s", "loaded")
+    )
+    rows = []
+    for case, code in cases.items():
+        results = [time_case(code) for _ in range(nrepeat)]
+        seconds = sorted(result["seconds"] for result in results)
+        loaded = results[-1]["loaded"]
+        rows.append(
+            dict(
+                case=case,
+                median=seconds[nrepeat // 2],
+                min=seconds[0],
+                loaded=" ".join(loaded),
+            )
+        )
+        print(
+            "{:<18s} {:>9.3f} {:>9.3f}  {}".format(
+                case, seconds[nrepeat // 2], seconds[0], " ".join(loaded)
+            )
+        )
+    fpth = os.path.join(config.work_directory("tables"), "bench-import-time.csv")
+    ensemble.write_table(fpth, rows)
+
+    # the headless startup must not execute the deferred packages
+    for row in rows:
+        if row["case"] != "flopy and pyplot" and row["loaded"]:
+            sys.exit("{} executed {}".format(row["case"], row["loaded"]))
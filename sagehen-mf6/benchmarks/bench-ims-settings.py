@@ -0,0 +1,148 @@
+# ## Benchmark of IMS solver settings for the Sagehen model
+#
+# Runs the Sagehen model from ../script/ex-gwf-sagehen-gsf.py with every
+# combination of the IMS settings in ims_grid. For each configuration it
+# records the wall time, the total outer and inner iterations, the number
+# of time steps that failed to converge and the largest volumetric budget
+# discrepancy. Configurations are then ranked by wall time, with runs that
+# failed or did not converge ranked last. The runs are made one at a time
+# so the wall times are not affected by other runs, and the transient
+# stress period is shortened to ndays days to keep the sweep tractable.
+# The results are saved in ../tables/bench-ims-settings.csv.
+
+import os
+import sys
+import shutil
+import itertools
+import importlib.util
+import numpy as np
+
+sys.path.append(os.path.join("..", "common"))
+import config
+import mf6run
+import mf6lst
+import ensemble
+
+# Length of the transient stress period in days
+ndays = 365
+
+# IMS settings that are varied, every combination is run. Names of
+# ims_options entries are passed to ModflowIms, other names override the
+# script variables with the same name
+ims_grid = {
+    "linear_acceleration": ["BICGSTAB"],
+    "preconditioner_levels": [4, 8],
+    "preconditioner_drop_tolerance": [1e-3, 1e-4],
+    "under_relaxation": ["dbd", "none"],
+    "backtracking_number": [0, 20],
+    "relax": [0.0, 0.97],
+}
+
+
+def load_script():
+    """Import the Sagehen script as a module"""
+    spec = importlib.util.spec_from_file_location(
+        "sagehen", os.path.join("..", "script", "ex-gwf-sagehen-gsf.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def configurations(grid):
+    """Generate a dictionary of settings for every combination in grid"""
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def run(ex, idx, settings):
+    """Build, write and run one configuration, return its metrics"""
+    options = dict(ex.ims_options)
+    for name, value in settings.items():
+        if name in options or name not in vars(ex):
+            options[name] = value
+        else:
+            setattr(ex, name, value)
+    ex.ims_options = options
+
+    sim = ex.build_model("bench-ims-{:03d}".format(idx))
+    ex.write_model(sim)
+    sim_ws = sim.simulation_data.mfpath.get_sim_path()
+    success, buff, progress = mf6run.run(
+        ex.mf6exe,
+        sim_ws,
+        perioddata=list(zip(ex.perlen, ex.nstp, ex.tsmult)),
+        callback=lambda progress: None,
+    )
+    row = dict(settings, config=idx, success=success)
+    row.update(
+        seconds=progress.elapsed,
+        outer=progress.nouter,
+        inner=progress.ninner,
+        failed=progress.nfail,
+        steps_per_second=progress.steps_per_second,
+        discrepancy=np.nan,
+    )
+    fpth = os.path.join(sim_ws, "{}.lst".format(sim.model_names[0]))
+    if success and os.path.isfile(fpth):
+        budget = mf6lst.read_listing(fpth, cache=False).budget
+        row["discrepancy"] = np.abs(budget["PERCENT_DISCREPANCY"]).max()
+    shutil.rmtree(sim_ws)
+    return row
+
+
+def rank(rows):
+    """Sort rows by wall time, failed and non-converged runs last"""
+    return sorted(
+        rows,
+        key=lambda row: (
+            not row["success"],
+            row["failed"] > 0,
+            row["seconds"],
+        ),
+    )
+
+
+if __name__ == "__main__":
+    ex = load_script()
+    ex.perlen = [1, ndays]
+    ex.nstp = [1, ndays]
+    ex.sagehen_inputs = ex.SagehenInputs(ex.dat_pth)
+    defaults = dict(ex.ims_options)
+    defaults.update(
+        nouter=ex.nouter, ninner=ex.ninner, hclose=ex.hclose, relax=ex.relax
+    )
+
+    rows = []
+    for idx, settings in enumerate(configurations(ims_grid)):
+        # every configuration starts from the settings of the script
+        ex.ims_options = {name: defaults[name] for name in ex.ims_options}
+        for name in ("nouter", "ninner", "hclose", "relax"):
+            setattr(ex, name, defaults[name])
+        rows.append(run(ex, idx, settings))
+    rows = rank(rows)
+
+    names = list(ims_grid)
+    print(
+        "{:>4s} {:>6s} ".format("rank", "config")
+        + " ".join("{:>12.12s}".format(name) for name in names)
+        + " {:>9s} {:>7s} {:>8s} {:>6s} {:>10s}".format(
+            "seconds", "outer", "inner", "failed", "discrep %"
+        )
+    )
+    for irank, row in enumerate(rows, start=1):
+        print(
+            "{:>4d} {:>6d} ".format(irank, row["config"])
+            + " ".join("{:>12}".format(str(row[name])) for name in names)
+            + " {:>9.2f} {:>7d} {:>8d} {:>6d} {:>10.4f}{}".format(
+                row["seconds"],
+                row["outer"],
+                row["inner"],
+                row["failed"],
+                row["discrepancy"],
+                "" if row["success"] else "  run failed",
+            )
+        )
+    fpth = os.path.join(config.work_directory("tables"), "bench-ims-settings.csv")
+    ensemble.write_table(fpth, rows)
@@ -0,0 +1,111 @@
+# ## Benchmark of the incremental MF6 listing file parser
+#
+# Times mf6lst.read_listing on synthetic MODFLOW 6 listing files with
+# daily solver summaries, volumetric budget tables and time summaries, from
+# 1,000 to 16,000 time steps. The first read parses the whole file, a
+# second read resumes from the cache and only parses the lines that were
+# appended since, and flopy's Mf6ListBudget is timed for reference.
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+sys.path.append(os.path.join("..", "common"))
+import flopy
+import mf6lst
+
+# Time step of the synthetic listing file
+step = """
+ {calls} CALLS TO NUMERICAL SOLUTION IN TIME STEP {kstp} STRESS PERIOD 1
+ {inner} TOTAL ITERATIONS
+
+  VOLUME BUDGET FOR ENTIRE MODEL AT END OF TIME STEP{kstp:>5d}, STRESS PERIOD   1
+  ---------------------------------------------------------------------------------------------------
+
+     CUMULATIVE VOLUME      L**3       RATES FOR THIS TIME STEP      L**3/T          PACKAGE NAME
+     ------------------                 ------------------------                     ----------------
+
+           IN:                                      IN:
+           ---                                      ---
+                 STO-SS =       {cum:>10.4f}                   STO-SS =       {rate:>10.4f}     STO
+                 STO-SY =       {cum:>10.4f}                   STO-SY =       {rate:>10.4f}     STO
+                    CHD =       {cum:>10.4f}                      CHD =       {rate:>10.4f}     CHD-1
+              UZF-GWRCH =       {cum:>10.4f}                UZF-GWRCH =       {rate:>10.4f}     UZF-1
+                    SFR =       {cum:>10.4f}                      SFR =       {rate:>10.4f}     SFR-1
+
+            TOTAL IN =       {cum:>10.4f}                 TOTAL IN =       {rate:>10.4f}
+
+          OUT:                                     OUT:
+          ----                                     ----
+                 STO-SS =       {cum:>10.4f}                   STO-SS =       {rate:>10.4f}     STO
+                 STO-SY =       {cum:>10.4f}                   STO-SY =       {rate:>10.4f}     STO
+                    CHD =       {cum:>10.4f}                      CHD =       {rate:>10.4f}     CHD-1
+                    SFR =       {cum:>10.4f}                      SFR =       {rate:>10.4f}     SFR-1
+
+           TOTAL OUT =       {cum:>10.4f}                TOTAL OUT =       {rate:>10.4f}
+
+            IN - OUT =       1.0000E-05                 IN - OUT =       1.0000E-05
+
+ PERCENT DISCREPANCY =           0.00     PERCENT DISCREPANCY =           0.00
+
+
+         TIME SUMMARY AT END OF TIME STEP{kstp:>5d} IN STRESS PERIOD    1
+                    SECONDS     MINUTES      HOURS       DAYS        YEARS
+                    -----------------------------------------------------------
+   TIME STEP LENGTH  86400.      1440.0      24.000      1.0000     2.73785E-03
+ STRESS PERIOD TIME  86400.      1440.0      24.000  {kstp:>10.4f}     2.73785E-03
+         TOTAL TIME  86400.      1440.0      24.000  {kstp:>10.4f}     2.73785E-03
+"""
+
+
+def write_listing(fpth, nstp, start=1):
+    """Append time steps start to nstp to a synthetic listing file"""
+    with open(fpth, "a") as f:
+        for kstp in range(start, nstp + 1):
+            f.write(
+                step.format(
+                    kstp=kstp,
+                    calls=3 + kstp % 4,
+                    inner=30 + kstp % 50,
+                    cum=100.0 * kstp,
+                    rate=100.0 + kstp % 7,
+                )
+            )
+
+
+if __name__ == "__main__":
+    ws = tempfile.mkdtemp()
+    try:
+        print(
+            "{:>8s} {:>8s} {:>10s} {:>12s} {:>12s}".format(
+                "steps", "MiB", "parse s", "append 1% s", "flopy s"
+            )
+        )
+        for nstp in (1000, 2000, 4000, 8000, 16000):
+            fpth = os.path.join(ws, "model{}.lst".format(nstp))
+            write_listing(fpth, nstp)
+            size = os.path.getsize(fpth) / 2**20
+
+            t0 = time.perf_counter()
+            mf6lst.read_listing(fpth)
+            parse = time.perf_counter() - t0
+
+            # append 1% more time steps and read the file again
+            write_listing(fpth, nstp + nstp // 100, start=nstp + 1)
+            t0 = time.perf_counter()
+            lst = mf6lst.read_listing(fpth)
+            append = time.perf_counter() - t0
+            assert lst.budget["kstp"].size == nstp + nstp // 100
+
+            t0 = time.perf_counter()
+            flopy.utils.Mf6ListBudget(fpth).get_incremental()
+            reference = time.perf_counter() - t0
+            print(
+                "{:>8d} {:>8.1f} {:>10.3f} {:>12.3f} {:>12.3f}".format(
+                    nstp, size, parse, append, reference
+                )
+            )
+    finally:
+        shutil.rmtree(ws)
@@ -0,0 +1,99 @@
+# ## Benchmark of the MODFLOW-NWT array reader
+#
+# Compares mfnwt.ArrayFileReader.read_array with np.loadtxt on synthetic
+# INTERNAL (FREE) arrays with several million cells. Rows are written on
+# a single line and wrapped over several lines, as MODFLOW allows. The
+# last case re-reads an OPEN/CLOSE array through the .npy array cache.
+
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join("..", "common"))
+import mfnwt
+
+# Array dimensions
+nrow, ncol = 2000, 2000
+
+# Number of values per line for the wrapped arrays
+nwrap = 20
+
+
+def write_array(fpth, arr, nwrap=None):
+    """Write arr as an INTERNAL (FREE) array block"""
+    with open(fpth, "w") as f:
+        f.write("INTERNAL  1.0  (FREE)  0\n")
+        for row in arr:
+            if nwrap is None:
+                np.savetxt(f, row[None, :], fmt="%.6g")
+            else:
+                n = (row.size // nwrap) * nwrap
+                np.savetxt(f, row[:n].reshape(-1, nwrap), fmt="%.6g")
+                if n < row.size:
+                    np.savetxt(f, row[None, n:], fmt="%.6g")
+
+
+def report(label, t_reader, t_loadtxt):
+    print(
+        "{:<18s} read_array {:7.3f} s   np.loadtxt {:7.3f} s   "
+        "speedup {:6.1f}x".format(
+            label, t_reader, t_loadtxt, t_loadtxt / t_reader
+        )
+    )
+
+
+def best_of(func, nrep=3):
+    times = []
+    for _ in range(nrep):
+        t0 = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    arr = np.round(rng.uniform(0.0, 3000.0, size=(nrow, ncol)), 2)
+    print("{} x {} array ({} cells)".format(nrow, ncol, arr.size))
+    with tempfile.TemporaryDirectory() as ws:
+        for label, wrap in (("one row per line", None), ("wrapped rows", nwrap)):
+            fpth = os.path.join(ws, "array.txt")
+            write_array(fpth, arr, nwrap=wrap)
+
+            t_reader, result = best_of(
+                lambda: mfnwt.ArrayFileReader(fpth).read_array((nrow, ncol))
+            )
+            assert np.allclose(result, arr)
+            if wrap is None:
+                t_loadtxt, result = best_of(
+                    lambda: np.loadtxt(fpth, skiprows=1)
+                )
+            else:
+                t_loadtxt, result = best_of(
+                    lambda: np.loadtxt(fpth, skiprows=1).reshape(nrow, ncol)
+                )
+            assert np.allclose(result, arr)
+            report(label, t_reader, t_loadtxt)
+
+        # OPEN/CLOSE array re-read through the array cache
+        fpth = os.path.join(ws, "array.txt")
+        write_array(fpth, arr)
+        with open(fpth) as f:
+            lines = f.readlines()
+        with open(fpth, "w") as f:
+            f.writelines(lines[1:])
+        pkg_pth = os.path.join(ws, "package.txt")
+        with open(pkg_pth, "w") as f:
+            f.write("OPEN/CLOSE array.txt  1.0  (FREE)  0\n")
+        mfnwt.ArrayFileReader(pkg_pth, cache=True).read_array((nrow, ncol))
+        t_reader, result = best_of(
+            lambda: mfnwt.ArrayFileReader(pkg_pth, cache=True).read_array(
+                (nrow, ncol)
+            )
+        )
+        assert np.allclose(result, arr)
+        t_loadtxt, result = best_of(lambda: np.loadtxt(fpth))
+        report("cached OPEN/CLOSE", t_reader, t_loadtxt)
@@ -0,0 +1,58 @@
+# ## Benchmark of the MF6 SFR connection generator
+#
+# Times build_sagehen_helper_funcs.gen_mf6_sfr_connections on synthetic
+# stream networks from 1,000 to 100,000 reaches to confirm that the
+# connection data are generated in time proportional to the number of
+# reaches.
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join("..", "data", "sagehen-gsf"))
+import build_sagehen_helper_funcs as sageBld
+
+# Number of reaches in every synthetic segment
+nrch_per_seg = 10
+
+# Every ndiv-th segment is a diversion from its outflow segment
+ndiv = 25
+
+
+def synthetic_network(nreaches):
+    """Generate orig_seg and orig_rch tables for a binary-tree network
+
+    Segment 1 is the outlet and segment s > 1 outflows to segment s // 2.
+    Every ndiv-th segment also diverts from segment s // 2.
+    """
+    nseg = max(1, nreaches // nrch_per_seg)
+    orig_seg = []
+    orig_rch = []
+    for segid in range(1, nseg + 1):
+        outseg = segid // 2
+        iupseg = 0
+        if segid > 1 and segid % ndiv == 0:
+            iupseg = segid // 2
+            outseg = segid // 4
+        orig_seg.append(
+            (segid, 1, outseg, iupseg, 0.0, 0.0, 0.0, 0, 0.04,
+             "seg{}".format(segid))
+        )
+        for ireach in range(1, nrch_per_seg + 1):
+            orig_rch.append((1, segid, ireach, segid, ireach))
+    return orig_seg, orig_rch
+
+
+if __name__ == "__main__":
+    print("{:>10s} {:>12s} {:>14s}".format("reaches", "seconds", "us per reach"))
+    for nreaches in (1000, 10000, 20000, 50000, 100000):
+        orig_seg, orig_rch = synthetic_network(nreaches)
+        t0 = time.perf_counter()
+        conns = sageBld.gen_mf6_sfr_connections(orig_seg, orig_rch)
+        elapsed = time.perf_counter() - t0
+        assert len(conns) == len(orig_rch)
+        print(
+            "{:>10d} {:>12.4f} {:>14.2f}".format(
+                len(orig_rch), elapsed, 1e6 * elapsed / len(orig_rch)
+            )
+        )
@@ -0,0 +1,122 @@
+# ## Benchmark of the streaming MF6 period data writer
+#
+# Times mf6write.write_period_files for daily UZF period data with the
+# number of Sagehen land surface UZF cells, from 100 to 800 stress periods.
+# Each period is generated on demand, so the peak traced memory should not
+# grow with the number of periods and the time per period should be
+# constant. The size of the delta-encoded input (mf6write.delta_periods) is
+# reported for different fractions of cells that change every day.
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.append(os.path.join("..", "common"))
+import mf6write
+
+# Number of land surface UZF cells in the Sagehen model
+ncells = 3386
+
+# UZF period data fields
+dtype = [
+    ("iuzno", int),
+    ("finf", float),
+    ("pet", float),
+    ("extdp", float),
+    ("extwc", float),
+    ("ha", float),
+    ("hroot", float),
+    ("rootact", float),
+]
+
+
+def daily_periods(nper, finf, fchange=1.0):
+    """Generate UZF period data for nper daily stress periods
+
+    The infiltration of a random fraction fchange of the cells changes
+    every day.
+    """
+    rng = np.random.default_rng(0)
+    records = np.zeros(ncells, dtype=dtype)
+    records["iuzno"] = np.arange(ncells)
+    records["finf"] = finf
+    records["pet"] = 0.008
+    records["extdp"] = 1.0
+    records["extwc"] = 0.055
+    for kper in range(1, nper + 1):
+        changed = rng.random(ncells) < fchange
+        records["finf"][changed] = finf[changed] * rng.gamma(0.5, 2.0)
+        yield kper, records
+
+
+def write(nper, finf, trace=False, fchange=None):
+    """Write nper periods, return the elapsed time, peak traced memory and
+    the number of bytes written
+
+    All records are written unless fchange is specified, in which case
+    only the records that change are written.
+    """
+    ws = tempfile.mkdtemp()
+    try:
+        fpth = os.path.join(ws, "model.uzf")
+        with open(fpth, "w") as f:
+            f.write("BEGIN period  1\nEND period  1\n")
+        if trace:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        if fchange is None:
+            periods = daily_periods(nper, finf)
+        else:
+            periods = mf6write.delta_periods(
+                daily_periods(nper, finf, fchange)
+            )
+        mf6write.write_period_files(fpth, periods, index_fields=("iuzno",))
+        elapsed = time.perf_counter() - t0
+        nbytes = sum(
+            os.path.getsize(os.path.join(ws, fname)) for fname in os.listdir(ws)
+        )
+        peak = 0
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    finally:
+        shutil.rmtree(ws)
+    return elapsed, peak, nbytes
+
+
+if __name__ == "__main__":
+    finf = np.random.default_rng(1).uniform(0.0008, 0.0024, ncells)
+    print("{:>10s} {:>12s} {:>14s}".format("periods", "seconds", "ms per period"))
+    for nper in (100, 200, 400, 800):
+        elapsed, _, _ = write(nper, finf)
+        print(
+            "{:>10d} {:>12.3f} {:>14.2f}".format(
+                nper, elapsed, 1e3 * elapsed / nper
+            )
+        )
+
+    # memory is traced separately because tracing slows the writer down
+    print("{:>10s} {:>14s}".format("periods", "peak MiB"))
+    for nper in (10, 20, 40):
+        _, peak, _ = write(nper, finf, trace=True)
+        print("{:>10d} {:>14.2f}".format(nper, peak / 2**20))
+
+    # delta encoding of 365 daily periods
+    nper = 365
+    _, _, full = write(nper, finf)
+    print(
+        "{:>10s} {:>12s} {:>14s} {:>14s}".format(
+            "changed", "seconds", "MiB written", "fraction"
+        )
+    )
+    for fchange in (1.0, 0.5, 0.1, 0.01, 0.0):
+        elapsed, _, nbytes = write(nper, finf, fchange=fchange)
+        print(
+            "{:>10.2f} {:>12.3f} {:>14.2f} {:>14.3f}".format(
+                fchange, elapsed, nbytes / 2**20, nbytes / full
+            )
+        )
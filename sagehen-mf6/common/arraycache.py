@@ -0,0 +1,159 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# name of the cache directory created next to each source array file
+cache_dirname = ".npycache"
+
+
+def load_array(
+    fpth,
+    dtype=np.float64,
+    cache_ws=None,
+    mmap_mode="r",
+    loader=None,
+    key="",
+    writer=None,
+    hash_contents=True,
+):
+    """Load a whitespace-delimited text array through a binary .npy cache
+
+    The first call parses the text file with np.loadtxt (or loader) and
+    saves the result as a .npy file. Later calls open the .npy file as a memory map
+    so the text is not parsed again. The cache entry is keyed by the source
+    path and dtype and is validated against the size and content hash of
+    the source file, so it is rebuilt whenever the text file changes. With
+    hash_contents=False it is validated against the size and modification
+    time only and the source file is never read to hash it.
+
+    Parameters
+    ----------
+    fpth : str
+        path to the text array file
+    dtype : numpy dtype
+        dtype of the returned array (default is np.float64)
+    cache_ws : str
+        directory for the cache files (default is a .npycache directory
+        next to fpth)
+    mmap_mode : str
+        numpy memory-map mode used to open the cached array (default is "r")
+    loader : callable
+        function that parses fpth and returns an array, used instead of
+        np.loadtxt (default is None)
+    key : str
+        additional cache key that distinguishes different arrays read from
+        the same file, for example with different loaders (default is "")
+    writer : callable
+        function called as writer(fpth, npy_pth) that converts fpth and
+        writes the .npy file npy_pth itself, for example in chunks with
+        numpy.lib.format.open_memmap so that large files are never held
+        in memory. Used instead of loader (default is None)
+    hash_contents : bool
+        boolean indicating if a cache entry with the same size but a
+        different modification time is validated by hashing the contents
+        of fpth. Set to False for large files that are always rewritten
+        when they change, such as model output (default is True)
+
+    Returns
+    -------
+    arr : numpy.ndarray
+        array backed by the memory-mapped cache file
+
+    """
+    fpth = os.path.abspath(fpth)
+    dtype = np.dtype(dtype)
+    if cache_ws is None:
+        cache_ws = os.path.join(os.path.dirname(fpth), cache_dirname)
+
+    cache_key = _hexdigest(
+        "{}|{}|{}".format(fpth, dtype.str, key).encode(), digest_size=8
+    )
+    base = os.path.join(
+        cache_ws, "{}.{}".format(os.path.basename(fpth), cache_key)
+    )
+    npy_pth = base + ".npy"
+    meta_pth = base + ".json"
+
+    stat = os.stat(fpth)
+    meta = _read_meta(meta_pth)
+    digest = None
+    if (
+        meta is not None
+        and meta["size"] == stat.st_size
+        and os.path.isfile(npy_pth)
+    ):
+        # unchanged modification time - trust the cache without hashing
+        if meta["mtime_ns"] == stat.st_mtime_ns:
+            return _open(npy_pth, mmap_mode)
+        # touched but possibly unchanged - compare content hashes
+        if hash_contents:
+            digest = _file_digest(fpth)
+        if digest is not None and digest == meta["digest"]:
+            meta["mtime_ns"] = stat.st_mtime_ns
+            _write_meta(meta_pth, meta)
+            return _open(npy_pth, mmap_mode)
+
+    if digest is None and hash_contents:
+        digest = _file_digest(fpth)
+    if not os.path.isdir(cache_ws):
+        os.makedirs(cache_ws, exist_ok=True)
+    tmp_pth = "{}.{}.tmp".format(npy_pth, os.getpid())
+    if writer is not None:
+        writer(fpth, tmp_pth)
+    else:
+        if loader is None:
+            arr = np.loadtxt(fpth, dtype=dtype)
+        else:
+            arr = np.asarray(loader(fpth), dtype=dtype)
+        with open(tmp_pth, "wb") as f:
+            np.save(f, arr)
+    os.replace(tmp_pth, npy_pth)
+    _write_meta(
+        meta_pth,
+        {
+            "source": fpth,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "digest": digest,
+            "dtype": dtype.str,
+        },
+    )
+    return _open(npy_pth, mmap_mode)
+
+
+# protected functions
+def _open(npy_pth, mmap_mode):
+    """Open a cached .npy file without copying the data"""
+    return np.asarray(np.load(npy_pth, mmap_mode=mmap_mode))
+
+
+def _hexdigest(data, digest_size=16):
+    """Return the blake2b hex digest of a bytes object"""
+    return hashlib.blake2b(data, digest_size=digest_size).hexdigest()
+
+
+def _file_digest(fpth, blocksize=1 << 20):
+    """Return the blake2b hex digest of the contents of a file"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(fpth, "rb") as f:
+        for block in iter(lambda: f.read(blocksize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_meta(meta_pth):
+    """Read the json metadata for a cache entry, None if it is missing"""
+    try:
+        with open(meta_pth, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_pth, meta):
+    """Atomically write the json metadata for a cache entry"""
+    tmp_pth = "{}.{}.tmp".format(meta_pth, os.getpid())
+    with open(tmp_pth, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_pth, meta_pth)
@@ -1,63 +1,100 @@
 import os
 import sys
-import matplotlib.pyplot as plt
-from IPython import get_ipython
-
-# Setup working directories
-work_directories = (
-    os.path.join("..", "examples"),
-    os.path.join("..", "figures"),
-    os.path.join("..", "tables"),
-)
-for work_dir in work_directories:
-    if not os.path.isdir(work_dir):
-        os.makedirs(work_dir)
-
-# run settings
-buildModel = True
-writeModel = True
-runModel = True
-plotModel = True
-plotSave = True
+import shutil
+import fnmatch
+import tempfile
+import importlib.util
+
+# matplotlib, IPython and flopy are slow to import and are not needed by
+# every stage, they are imported when they are first used
+
+
+# Setup working directories, they are created when they are first used
+def work_directory(name):
+    """Return the path of a working directory, creating it if needed
+
+    Parameters
+    ----------
+    name : str
+        name of the working directory, for example examples, figures or
+        tables
+
+    Returns
+    -------
+    pth : str
+        path of the working directory
+
+    """
+    pth = os.path.join("..", name)
+    os.makedirs(pth, exist_ok=True)
+    return pth
+
+
+# Import a module when one of its attributes is first used
+def lazy_import(name):
+    """Return a module that is only executed when it is first used
+
+    Parameters
+    ----------
+    name : str
+        name of a top level module, for example flopy
+
+    Returns
+    -------
+    module : module
+        module object, it is executed on the first attribute access
+
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError("No module named {}".format(name), name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
 
 
 # Test if being run as a script
 def is_notebook():
-    try:
-        shell = get_ipython().__class__.__name__
-        if shell == "ZMQInteractiveShell":
-            return True  # Jupyter notebook or qtconsole
-        elif shell == "TerminalInteractiveShell":
-            return False  # Terminal running IPython
-        else:
-            return False  # Other type (?)
-    except NameError:
+    # a notebook has already imported IPython
+    if "IPython" not in sys.modules:
         return False
+    # get_ipython returns None outside of an IPython shell
+    shell = sys.modules["IPython"].get_ipython().__class__.__name__
+    if shell == "ZMQInteractiveShell":
+        return True  # Jupyter notebook or qtconsole
+    elif shell == "TerminalInteractiveShell":
+        return False  # Terminal running IPython
+    else:
+        return False  # Other type (?)
 
 
 # common figure settings
 figure_ext = ".png"
-plt.rcParams['image.cmap'] = "jet_r"
 
-# parse command line arguments
-if is_notebook():
-    plotSave = False
-else:
-    for idx, arg in enumerate(sys.argv):
-        if arg in ("-nr", "--no_run"):
-            runModel = False
-        elif arg in ("-nw", "--no_write"):
-            writeModel = False
-        elif arg in ("-np", "--no_plot"):
-            plotModel = False
-        elif arg in ("-fe", "--figure_extension"):
-            if idx + 1 < len(sys.argv):
-                extension = sys.argv[idx + 1]
-                if not extension.startswith("."):
-                    extension = "." + extension
-                figure_exts = tuple(plt.gcf().canvas.get_supported_filetypes().keys())
-                if extension.lower() in figure_exts:
-                    figure_ext = extension
+
+def pyplot():
+    """Import matplotlib.pyplot and apply the common figure settings"""
+    import matplotlib.pyplot as plt
+
+    plt.rcParams['image.cmap'] = "jet_r"
+    return plt
+
+
+def _figure_extension(extension):
+    """Return extension if matplotlib can save it, otherwise figure_ext"""
+    from matplotlib.backend_bases import FigureCanvasBase
+
+    figure_exts = tuple(
+        "." + ext for ext in FigureCanvasBase.get_supported_filetypes()
+    )
+    if extension.lower() in figure_exts:
+        return extension
+    return figure_ext
 
 # base example workspace
 base_ws = os.path.join("..", "examples")
@@ -65,13 +102,264 @@ base_ws = os.path.join("..", "examples")
 # data files required for examples
 data_ws = os.path.join("..", "data")
 
+# memory-backed file systems used for tmpfs workspaces, in order of
+# preference
+tmpfs_roots = ("/dev/shm", "/run/shm")
+
+# outputs copied from a tmpfs workspace back to the base workspace. The
+# package manifest is not copied, it describes the input files of the tmpfs
+# workspace and not the input files in the base workspace
+tmpfs_keep = ("*.lst", "*.obs.bin", "*.bmi.npz")
+
+
+class RunConfig:
+    def __init__(
+        self,
+        build=True,
+        write=True,
+        run=True,
+        plot=True,
+        plot_save=True,
+        bmi=True,
+        ensemble=False,
+        figure_ext=figure_ext,
+        base_ws=base_ws,
+        tmpfs=False,
+        keep=tmpfs_keep,
+    ):
+        """Create a RunConfig object with the stages and workspaces of a run
+
+        Every stage of a script takes an optional RunConfig, so a run can
+        override the settings parsed from the command line. When tmpfs is
+        used the simulation workspaces are created on a memory-backed file
+        system, the many small input files and the MODFLOW 6 outputs never
+        touch the disk, and only the outputs that match keep are copied to
+        the workspace in base_ws by copy_back.
+
+        Parameters
+        ----------
+        build : bool
+            boolean indicating if the simulation is built (default is True)
+        write : bool
+            boolean indicating if the input files are written (default is
+            True)
+        run : bool
+            boolean indicating if the simulation is run (default is True)
+        plot : bool
+            boolean indicating if the results are plotted (default is True)
+        plot_save : bool
+            boolean indicating if the figures are saved (default is True)
+        bmi : bool
+            boolean indicating if the simulation is run through the MODFLOW
+            6 BMI when libmf6 is available (default is True)
+        ensemble : bool
+            boolean indicating if the ensemble is run instead of the
+            scenario (default is False)
+        figure_ext : str
+            extension of the saved figures (default is ".png")
+        base_ws : str
+            directory of the simulation workspaces (default is
+            ../examples)
+        tmpfs : bool or str
+            False to create the simulation workspaces in base_ws, True to
+            create them on the first of tmpfs_roots that exists or the path
+            of a directory on a tmpfs file system (default is False)
+        keep : tuple
+            file name patterns of the outputs that copy_back copies to
+            base_ws (default is tmpfs_keep)
+        """
+        self.build = build
+        self.write = write
+        self.run = run
+        self.plot = plot
+        self.plot_save = plot_save
+        self.bmi = bmi
+        self.ensemble = ensemble
+        self.figure_ext = figure_ext
+        self.base_ws = base_ws
+        self.tmpfs = tmpfs
+        self.keep = tuple(keep)
+
+    def __repr__(self):
+        return "RunConfig({})".format(
+            ", ".join(
+                "{}={!r}".format(name, value)
+                for name, value in vars(self).items()
+            )
+        )
+
+    @classmethod
+    def from_argv(cls, argv, **kwargs):
+        """Create a RunConfig object from command line arguments
+
+        Parameters
+        ----------
+        argv : list
+            command line arguments, for example sys.argv
+        kwargs : dict
+            settings that are not set by the command line arguments
+
+        Returns
+        -------
+        run_config : RunConfig
+            run configuration
+
+        """
+        run_config = cls(**kwargs)
+        for idx, arg in enumerate(argv):
+            if arg in ("-nr", "--no_run"):
+                run_config.run = False
+            elif arg in ("-nw", "--no_write"):
+                run_config.write = False
+            elif arg in ("-np", "--no_plot"):
+                run_config.plot = False
+            elif arg in ("-nb", "--no_bmi"):
+                run_config.bmi = False
+            elif arg in ("-en", "--ensemble"):
+                run_config.ensemble = True
+            elif arg in ("-tm", "--tmpfs"):
+                run_config.tmpfs = True
+            elif arg in ("-fe", "--figure_extension"):
+                if idx + 1 < len(argv):
+                    extension = argv[idx + 1]
+                    if not extension.startswith("."):
+                        extension = "." + extension
+                    run_config.figure_ext = _figure_extension(extension)
+        return run_config
+
+    def replace(self, **kwargs):
+        """Return a copy of the run configuration with other settings
+
+        Parameters
+        ----------
+        kwargs : dict
+            settings that are changed, for example run=False
+
+        Returns
+        -------
+        run_config : RunConfig
+            run configuration
+
+        """
+        unknown = set(kwargs) - set(vars(self))
+        if unknown:
+            raise TypeError(
+                "unknown run settings: {}".format(", ".join(sorted(unknown)))
+            )
+        settings = dict(vars(self))
+        settings.update(kwargs)
+        return type(self)(**settings)
+
+    @property
+    def tmpfs_root(self):
+        """Directory of the tmpfs workspaces, None if tmpfs is not used"""
+        if not self.tmpfs:
+            return None
+        if self.tmpfs is True:
+            root = next(
+                (pth for pth in tmpfs_roots if os.path.isdir(pth)), None
+            )
+            if root is None:
+                root = tempfile.gettempdir()
+        else:
+            root = self.tmpfs
+        # one directory for every process, ensemble members run in
+        # different processes
+        return os.path.join(root, "sagehen-{}".format(os.getpid()))
+
+    def workspace(self, sim_name):
+        """Return the simulation workspace of sim_name
+
+        Parameters
+        ----------
+        sim_name : str
+            simulation name
+
+        Returns
+        -------
+        sim_ws : str
+            path of the simulation workspace, in base_ws or on tmpfs
+
+        """
+        root = self.tmpfs_root
+        if root is None:
+            root = self.base_ws
+        return os.path.join(root, sim_name)
+
+    def copy_back(self, sim_ws):
+        """Copy the outputs of a tmpfs workspace to base_ws and remove it
+
+        The outputs that match the keep patterns are copied to the
+        workspace with the same name in base_ws. Nothing is done for a
+        workspace that is not on tmpfs.
+
+        Parameters
+        ----------
+        sim_ws : str
+            path of the simulation workspace
+
+        Returns
+        -------
+        fnames : list
+            names of the copied files
+
+        """
+        root = self.tmpfs_root
+        sim_ws = os.path.abspath(sim_ws)
+        if root is None or os.path.dirname(sim_ws) != os.path.abspath(root):
+            return []
+        dst_ws = os.path.join(self.base_ws, os.path.basename(sim_ws))
+        fnames = []
+        if os.path.isdir(sim_ws):
+            fnames = sorted(
+                fname
+                for fname in os.listdir(sim_ws)
+                if any(fnmatch.fnmatch(fname, pattern) for pattern in self.keep)
+            )
+            if fnames:
+                os.makedirs(dst_ws, exist_ok=True)
+            for fname in fnames:
+                shutil.copy2(
+                    os.path.join(sim_ws, fname), os.path.join(dst_ws, fname)
+                )
+            shutil.rmtree(sim_ws)
+        # the process directory is removed with its last workspace
+        if os.path.isdir(root) and not os.listdir(root):
+            os.rmdir(root)
+        return fnames
+
+
+# parse command line arguments
+if is_notebook():
+    run_config = RunConfig(plot_save=False)
+else:
+    run_config = RunConfig.from_argv(sys.argv)
+
+# run settings of the command line, run_config is used by the scripts
+buildModel = run_config.build
+writeModel = run_config.write
+runModel = run_config.run
+plotModel = run_config.plot
+plotSave = run_config.plot_save
+bmiModel = run_config.bmi
+ensembleModel = run_config.ensemble
+figure_ext = run_config.figure_ext
+
 # set executable extension
 eext = ""
 if sys.platform.lower() == "win32":
     eext = ".exe"
 
+# set shared library extension
+soext = ".so"
+if sys.platform.lower() == "win32":
+    soext = ".dll"
+elif sys.platform.lower() == "darwin":
+    soext = ".dylib"
+
 # paths to executables
 mf6_exe = os.path.abspath(os.path.join("..", "bin", "mf6" + eext))
+libmf6 = os.path.abspath(os.path.join("..", "bin", "libmf6" + soext))
 mf2005_exe = os.path.abspath(os.path.join("..", "bin", "mf2005" + eext))
 mf2005dbl_exe = os.path.abspath(os.path.join("..", "bin", "mf2005dbl" + eext))
 mt3dms_exe = os.path.abspath(os.path.join("..", "bin", "mt3dms" + eext))
@@ -0,0 +1,93 @@
+import os
+import csv
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def available_cores():
+    """Return the number of cores that this process can run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def run_ensemble(func, members, max_workers=None, verbose=True):
+    """Run every member of an ensemble on a process pool
+
+    func is called as func(idx, member) in a worker process for each
+    member, so func must be a module-level function and every member must
+    write to its own workspace. A member that raises an exception is
+    reported and does not stop the other members.
+
+    Parameters
+    ----------
+    func : callable
+        function that builds, writes, runs and post-processes one member
+        and returns a dictionary of summary metrics
+    members : list
+        list of dictionaries of parameter overrides, one per member
+    max_workers : int
+        number of worker processes (default is the number of available
+        cores, but no more than the number of members)
+    verbose : bool
+        boolean indicating if the progress is reported (default is True)
+
+    Returns
+    -------
+    results : list
+        summary metrics of each member, in the order of members. The
+        result of a failed member has success set to False and the error
+        message in error
+
+    """
+    members = list(members)
+    if max_workers is None:
+        max_workers = min(available_cores(), len(members))
+    max_workers = max(1, max_workers)
+    results = [None] * len(members)
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(func, idx, member): idx
+            for idx, member in enumerate(members)
+        }
+        for ndone, future in enumerate(as_completed(futures), start=1):
+            idx = futures[future]
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                results[idx] = dict(
+                    members[idx], member=idx, success=False, error=str(e)
+                )
+            if verbose:
+                print(
+                    "member {} finished ({}/{}, {:.1f} s)".format(
+                        idx, ndone, len(members), time.perf_counter() - t0
+                    )
+                )
+    return results
+
+
+def write_table(fpth, rows):
+    """Write a list of dictionaries as a comma-separated table
+
+    Parameters
+    ----------
+    fpth : str
+        path to the table
+    rows : list
+        list of dictionaries, one per row. The columns are the keys of the
+        rows in the order they are first found and missing values are left
+        empty
+
+    """
+    columns = {}
+    for row in rows:
+        columns.update(dict.fromkeys(row))
+    tmp_pth = "{}.{}.tmp".format(fpth, os.getpid())
+    with open(tmp_pth, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(columns))
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_pth, fpth)
@@ -0,0 +1,140 @@
+import numpy as np
+import arraycache
+import prms
+
+# gvr.params parameters that map PRMS HRUs to MODFLOW cells
+gvr_names = ("gvr_hru_id", "gvr_cell_id", "gvr_hru_pct", "gvr_cell_pct")
+
+
+class HruCellMap:
+    def __init__(self, hru_id, cell_id, hru_pct, cell_pct, cell_index, nhru=None):
+        """Create a HruCellMap object
+
+        The gravity reservoir (gvr) intersection of PRMS HRUs and MODFLOW
+        cells is compiled into two CSR sparse matrices with one row for
+        each entry of a model ordering, for example iuzno, and one column
+        for each HRU. HRU fluxes are regridded to the model ordering and
+        cell results are regridded back to HRUs with a single sparse
+        matrix-vector (or matrix-matrix) product.
+
+        Parameters
+        ----------
+        hru_id : numpy.ndarray
+            one-based HRU of each intersection (gvr_hru_id)
+        cell_id : numpy.ndarray
+            one-based MODFLOW cell number of each intersection in row-major
+            order (gvr_cell_id)
+        hru_pct : numpy.ndarray
+            fraction of the HRU area in the intersection (gvr_hru_pct)
+        cell_pct : numpy.ndarray
+            fraction of the cell area in the intersection (gvr_cell_pct)
+        cell_index : numpy.ndarray
+            zero-based row of each MODFLOW cell, -1 for cells that are not
+            part of the model ordering. A (nrow, ncol) array such as the
+            layer 1 cell_iuzno array is flattened in row-major order
+        nhru : int
+            number of HRUs (default is the largest hru_id)
+        """
+        # scipy is only imported when a map is built
+        import scipy.sparse as sp
+
+        cell_index = np.asarray(cell_index).ravel()
+        hru = np.asarray(hru_id, dtype=np.int64) - 1
+        row = cell_index[np.asarray(cell_id, dtype=np.int64) - 1]
+        if nhru is None:
+            nhru = int(hru.max()) + 1
+        nrow = int(cell_index.max()) + 1
+        mapped = row >= 0
+        self.nhru = nhru
+        self.nrow = nrow
+        # number of intersections with cells outside of the model ordering
+        self.nunmapped = int(mapped.size - mapped.sum())
+
+        shape = (nrow, nhru)
+        ij = (row[mapped], hru[mapped])
+        self.cell_matrix = sp.csr_matrix(
+            (np.asarray(cell_pct, dtype=float)[mapped], ij), shape=shape
+        )
+        self.hru_matrix = sp.csr_matrix(
+            (np.asarray(hru_pct, dtype=float)[mapped], ij), shape=shape
+        )
+
+    @classmethod
+    def from_params(cls, fpth, cell_index, nhru=None, cache=False):
+        """Create a HruCellMap from a PRMS gvr.params file
+
+        Parameters
+        ----------
+        fpth : str
+            path to a PRMS parameter file with the gvr_hru_id, gvr_cell_id,
+            gvr_hru_pct and gvr_cell_pct parameters
+        cell_index : numpy.ndarray
+            zero-based row of each MODFLOW cell, -1 for cells that are not
+            part of the model ordering
+        nhru : int
+            number of HRUs (default is the largest gvr_hru_id)
+        cache : bool
+            boolean indicating if the intersection table is cached as a
+            memory-mapped .npy file with arraycache.load_array (default is
+            False)
+
+        Returns
+        -------
+        hru_map : HruCellMap
+            HruCellMap object
+
+        """
+        if cache:
+            table = arraycache.load_array(
+                fpth, loader=_read_gvr, key="gvr intersections"
+            )
+        else:
+            table = _read_gvr(fpth)
+        hru_id, cell_id, hru_pct, cell_pct = table
+        return cls(hru_id, cell_id, hru_pct, cell_pct, cell_index, nhru=nhru)
+
+    def to_cells(self, values):
+        """Regrid HRU values to the model ordering
+
+        Cell values are the sum of the HRU values weighted by the fraction
+        of the cell area in each HRU, so depths and rates per unit area
+        are preserved.
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            (nhru,) or (nhru, n) HRU values
+
+        Returns
+        -------
+        cell_values : numpy.ndarray
+            (nrow,) or (nrow, n) values in the model ordering
+
+        """
+        return self.cell_matrix @ values
+
+    def to_hrus(self, values):
+        """Regrid values in the model ordering back to HRUs
+
+        HRU values are the sum of the cell values weighted by the fraction
+        of the HRU area in each cell, using the transpose product.
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            (nrow,) or (nrow, n) values in the model ordering
+
+        Returns
+        -------
+        hru_values : numpy.ndarray
+            (nhru,) or (nhru, n) HRU values
+
+        """
+        return self.hru_matrix.T @ values
+
+
+# protected functions
+def _read_gvr(fpth):
+    """Return the gvr intersection table as a (4, nhrucell) array"""
+    params = prms.read_params(fpth)
+    return np.vstack([params[name] for name in gvr_names]).astype(float)
@@ -0,0 +1,889 @@
+import os
+import numpy as np
+import arraycache
+
+# header of a MODFLOW 6 array record (head, drawdown and concentration)
+# for double and single precision files
+_array_header = {
+    np.float64: np.dtype(
+        [
+            ("kstp", "<i4"),
+            ("kper", "<i4"),
+            ("pertim", "<f8"),
+            ("totim", "<f8"),
+            ("text", "S16"),
+            ("ncol", "<i4"),
+            ("nrow", "<i4"),
+            ("ilay", "<i4"),
+        ]
+    ),
+    np.float32: np.dtype(
+        [
+            ("kstp", "<i4"),
+            ("kper", "<i4"),
+            ("pertim", "<f4"),
+            ("totim", "<f4"),
+            ("text", "S16"),
+            ("ncol", "<i4"),
+            ("nrow", "<i4"),
+            ("ilay", "<i4"),
+        ]
+    ),
+}
+
+# record index of an array file, offset is the byte offset of the data
+array_index_dtype = np.dtype(
+    [
+        ("kstp", "<i4"),
+        ("kper", "<i4"),
+        ("pertim", "<f8"),
+        ("totim", "<f8"),
+        ("text", "S16"),
+        ("ncol", "<i4"),
+        ("nrow", "<i4"),
+        ("ilay", "<i4"),
+        ("offset", "<i8"),
+    ]
+)
+
+# record index of a budget file, offset is the byte offset of the data
+budget_index_dtype = np.dtype(
+    [
+        ("kstp", "<i4"),
+        ("kper", "<i4"),
+        ("text", "S16"),
+        ("ncol", "<i4"),
+        ("nrow", "<i4"),
+        ("nlay", "<i4"),
+        ("imeth", "<i4"),
+        ("delt", "<f8"),
+        ("pertim", "<f8"),
+        ("totim", "<f8"),
+        ("modelnam", "S16"),
+        ("paknam", "S16"),
+        ("modelnam2", "S16"),
+        ("paknam2", "S16"),
+        ("ndat", "<i4"),
+        ("nlist", "<i4"),
+        ("offset", "<i8"),
+    ]
+)
+
+
+class HeadFile:
+    def __init__(self, fpth, precision=None, cache=True):
+        """Create a HeadFile object for a MODFLOW 6 head file
+
+        The record headers are read in one scan that skips over the data,
+        and the record index (kstp, kper, pertim, totim, text, ncol, nrow,
+        ilay and the byte offset of the data) is saved as a .npy file with
+        arraycache.load_array, so the file is not scanned again until its
+        size or modification time changes. The contents are not hashed to
+        validate the index because a head file is rewritten by every model
+        run. The file is memory-mapped and the heads are returned as views
+        of the memory map, so time slices and cell time series only read
+        the pages that they use.
+
+        Parameters
+        ----------
+        fpth : str
+            path to a MODFLOW 6 binary head file
+        precision : str
+            "double" or "single" (default is None, in which case the
+            precision is determined from the first record header)
+        cache : bool
+            boolean indicating if the record index is saved next to fpth
+            (default is True)
+        """
+        self.fpth = fpth
+        if precision is None:
+            precision = _array_precision(fpth)
+        self.precision = precision
+        self.realtype = np.float64 if precision == "double" else np.float32
+        if cache:
+            self.index = arraycache.load_array(
+                fpth,
+                dtype=array_index_dtype,
+                loader=self._scan,
+                key="array index {}".format(precision),
+                mmap_mode=None,
+                hash_contents=False,
+            )
+        else:
+            self.index = self._scan(fpth)
+        self._mm = np.memmap(fpth, dtype=np.uint8, mode="r")
+
+        # first record of every time, records of a time are consecutive
+        index = self.index
+        new_time = np.ones(index.size, dtype=bool)
+        new_time[1:] = (index["kstp"][1:] != index["kstp"][:-1]) | (
+            index["kper"][1:] != index["kper"][:-1]
+        )
+        self._time_start = np.flatnonzero(new_time)
+        self._time_end = np.append(self._time_start[1:], index.size)
+        self.nlay = int(index["ilay"].max()) if index.size else 0
+        self._view = self._regular_view()
+
+    @property
+    def ntimes(self):
+        """Number of saved times"""
+        return self._time_start.size
+
+    def get_times(self):
+        """Return the simulation time of every saved time"""
+        return self.index["totim"][self._time_start].tolist()
+
+    def get_kstpkper(self):
+        """Return the zero-based (kstp, kper) of every saved time"""
+        first = self.index[self._time_start]
+        return list(zip(first["kstp"] - 1, first["kper"] - 1))
+
+    def get_data(self, idx=None, kstpkper=None, totim=None):
+        """Return the heads of one saved time
+
+        Parameters
+        ----------
+        idx : int
+            zero-based index of the saved time (default is the last time)
+        kstpkper : tuple
+            zero-based (kstp, kper), used instead of idx
+        totim : float
+            simulation time, used instead of idx
+
+        Returns
+        -------
+        head : numpy.ndarray
+            (nlay, nrow, ncol) heads, a read-only view of the memory map
+            when all of the records have the same shape
+
+        """
+        idx = self._time_index(idx, kstpkper, totim)
+        if self._view is not None:
+            return self._view[idx]
+        records = self.index[self._time_start[idx] : self._time_end[idx]]
+        return np.stack([self._record(record) for record in records])
+
+    def get_ts(self, cellids):
+        """Return the time series of the heads of one or more cells
+
+        Parameters
+        ----------
+        cellids : tuple or list
+            zero-based (k, i, j) of a cell, or a list of them
+
+        Returns
+        -------
+        ts : numpy.ndarray
+            (ntimes, 1 + ncells) array with the simulation time in the
+            first column, like flopy's HeadFile.get_ts
+
+        """
+        cellids = np.atleast_2d(np.asarray(cellids, dtype=np.int64))
+        ts = np.empty((self.ntimes, 1 + cellids.shape[0]))
+        ts[:, 0] = self.get_times()
+        if self._view is not None:
+            k, i, j = cellids.T
+            # only the pages with the cells are read from the file
+            ts[:, 1:] = self._view[:, k, i, j]
+            return ts
+        for itime in range(self.ntimes):
+            head = self.get_data(itime)
+            ts[itime, 1:] = head[tuple(cellids.T)]
+        return ts
+
+    def close(self):
+        """Release the memory map"""
+        self._view = None
+        self._mm = None
+
+    # protected methods
+    def _scan(self, fpth):
+        """Read the record headers and return the record index"""
+        header_dtype = _array_header[self.realtype]
+        itemsize = np.dtype(self.realtype).itemsize
+        size = os.path.getsize(fpth)
+        index = _regular_index(fpth, header_dtype, itemsize, size)
+        if index is not None:
+            return index
+        records = []
+        with open(fpth, "rb") as f:
+            offset = 0
+            while offset + header_dtype.itemsize <= size:
+                f.seek(offset)
+                header = np.fromfile(f, dtype=header_dtype, count=1)[0]
+                offset += header_dtype.itemsize
+                records.append(tuple(header) + (offset,))
+                offset += int(header["ncol"]) * int(header["nrow"]) * itemsize
+        if offset != size:
+            raise ValueError("{} ends with an incomplete record".format(fpth))
+        return np.array(records, dtype=array_index_dtype)
+
+    def _record(self, record):
+        """Return the data of a record as a view of the memory map"""
+        shape = (int(record["nrow"]), int(record["ncol"]))
+        return np.ndarray(
+            shape,
+            dtype=self.realtype,
+            buffer=self._mm,
+            offset=int(record["offset"]),
+        )
+
+    def _regular_view(self):
+        """Return a (ntimes, nlay, nrow, ncol) view of the file, None if
+        the records do not have the same shape and spacing"""
+        index = self.index
+        if index.size == 0 or np.any(
+            self._time_end - self._time_start != self.nlay
+        ):
+            return None
+        nrow, ncol = int(index["nrow"][0]), int(index["ncol"][0])
+        if np.any(index["nrow"] != nrow) or np.any(index["ncol"] != ncol):
+            return None
+        stride = np.diff(index["offset"])
+        if stride.size and np.any(stride != stride[0]):
+            return None
+        itemsize = np.dtype(self.realtype).itemsize
+        rstride = int(stride[0]) if stride.size else nrow * ncol * itemsize
+        return np.ndarray(
+            (self.ntimes, self.nlay, nrow, ncol),
+            dtype=self.realtype,
+            buffer=self._mm,
+            offset=int(index["offset"][0]),
+            strides=(self.nlay * rstride, rstride, ncol * itemsize, itemsize),
+        )
+
+    def _time_index(self, idx, kstpkper, totim):
+        """Return the index of a saved time"""
+        if kstpkper is not None:
+            first = self.index[self._time_start]
+            match = np.flatnonzero(
+                (first["kstp"] == kstpkper[0] + 1)
+                & (first["kper"] == kstpkper[1] + 1)
+            )
+        elif totim is not None:
+            match = np.flatnonzero(
+                np.isclose(self.index["totim"][self._time_start], totim)
+            )
+        else:
+            return self.ntimes - 1 if idx is None else idx
+        if match.size == 0:
+            raise ValueError(
+                "{} is not a saved time in {}".format(
+                    kstpkper if kstpkper is not None else totim, self.fpth
+                )
+            )
+        return int(match[0])
+
+
+class BudgetFile:
+    def __init__(self, fpth, precision="double", cache=True):
+        """Create a BudgetFile object for a MODFLOW 6 budget file
+
+        The record headers are read in one scan that skips over the data,
+        and the record index (kstp, kper, text, dimensions, imeth, times,
+        model and package names, ndat, nlist and the byte offset of the
+        data) is saved as a .npy file with arraycache.load_array, so the
+        file is not scanned again until its size or modification time
+        changes. The contents are not hashed to validate the index because
+        a budget file is rewritten by every model run. Records are selected
+        by term (text), time and package name from the index, and their
+        data are returned as views of the memory-mapped file, so only the
+        records that are used are read.
+
+        Parameters
+        ----------
+        fpth : str
+            path to a MODFLOW 6 model or advanced package budget file
+        precision : str
+            "double" or "single" (default is "double")
+        cache : bool
+            boolean indicating if the record index is saved next to fpth
+            (default is True)
+        """
+        self.fpth = fpth
+        self.precision = precision
+        self.realtype = np.float64 if precision == "double" else np.float32
+        if cache:
+            self.index = arraycache.load_array(
+                fpth,
+                dtype=budget_index_dtype,
+                loader=self._scan,
+                key="budget index {}".format(precision),
+                mmap_mode=None,
+                hash_contents=False,
+            )
+        else:
+            self.index = self._scan(fpth)
+        self._mm = np.memmap(fpth, dtype=np.uint8, mode="r")
+        self._text = np.char.upper(np.char.strip(self.index["text"]))
+        self._paknam = np.char.upper(np.char.strip(self.index["paknam"]))
+        self._paknam2 = np.char.upper(np.char.strip(self.index["paknam2"]))
+
+    def get_record_names(self):
+        """Return the terms in the file, in the order they are written"""
+        names = []
+        for text in self._text:
+            name = text.decode()
+            if name not in names:
+                names.append(name)
+        return names
+
+    def get_times(self):
+        """Return the simulation time of every saved time"""
+        return self.index["totim"][self._time_start()].tolist()
+
+    def get_kstpkper(self):
+        """Return the zero-based (kstp, kper) of every saved time"""
+        first = self.index[self._time_start()]
+        return list(zip(first["kstp"] - 1, first["kper"] - 1))
+
+    def find(self, text, paknam=None):
+        """Return the positions in index of the records of a term
+
+        Parameters
+        ----------
+        text : str
+            budget term, for example "EXT-OUTFLOW" or "INFILTRATION"
+        paknam : str
+            package name that is matched with the paknam or paknam2 of the
+            records, for example "CHD-1" in a model budget file (default is
+            None, in which case records of every package are returned)
+
+        Returns
+        -------
+        irec : numpy.ndarray
+            positions in index, in file order
+
+        """
+        match = self._text == text.strip().upper().encode()
+        if paknam is not None:
+            name = paknam.strip().upper().encode()
+            match &= (self._paknam == name) | (self._paknam2 == name)
+        irec = np.flatnonzero(match)
+        if irec.size == 0:
+            raise ValueError(
+                "{} is not in {}".format(
+                    text if paknam is None else "{} {}".format(text, paknam),
+                    self.fpth,
+                )
+            )
+        return irec
+
+    def get_data(self, text, idx=None, totim=None, paknam=None):
+        """Return one record of a term
+
+        Parameters
+        ----------
+        text : str
+            budget term
+        idx : int
+            zero-based index of the record among the records of the term
+            (default is the last record)
+        totim : float
+            simulation time, used instead of idx
+        paknam : str
+            package name, see find (default is None)
+
+        Returns
+        -------
+        data : numpy.ndarray
+            (nlay, nrow, ncol) array for array records, or a structured
+            array with id1, id2, q and the auxiliary variables for list
+            records. Both are read-only views of the memory map
+
+        """
+        irec = self.find(text, paknam)
+        if totim is not None:
+            match = np.flatnonzero(np.isclose(self.index["totim"][irec], totim))
+            if match.size == 0:
+                raise ValueError(
+                    "{} is not saved at time {} in {}".format(
+                        text, totim, self.fpth
+                    )
+                )
+            idx = match[0]
+        elif idx is None:
+            idx = -1
+        return self._record(int(irec[idx]))
+
+    def get_term(self, text, paknam=None, field="q"):
+        """Return a term for all of the saved times
+
+        When the records of the term have the same size and are evenly
+        spaced in the file, which is the case for the budget files of a
+        model with the same output every time step, the result is a
+        strided view of the memory map and no data are read until the
+        values are used.
+
+        Parameters
+        ----------
+        text : str
+            budget term
+        paknam : str
+            package name, see find (default is None)
+        field : str
+            field of list records that is returned (default is "q")
+
+        Returns
+        -------
+        values : numpy.ndarray
+            (nrecords, nlay, nrow, ncol) for array records or
+            (nrecords, nlist) for list records
+
+        """
+        irec = self.find(text, paknam)
+        records = self.index[irec]
+        view = self._regular_view(records, field)
+        if view is not None:
+            return view
+        data = [self._record(int(i)) for i in irec]
+        if records["imeth"][0] == 6:
+            data = [record[field] for record in data]
+        return np.stack(data)
+
+    def reduce(self, text, paknam=None, ids=None, field="q", func=np.sum):
+        """Reduce a term to one value per record in constant memory
+
+        The records of the term are read one at a time, so the memory use
+        does not depend on the number of saved times.
+
+        Parameters
+        ----------
+        text : str
+            budget term
+        paknam : str
+            package name, see find (default is None)
+        ids : array_like
+            one-based ids that are reduced, the id1 (for example the reach
+            or uzf cell number) of list records or the node number of array
+            records (default is None, in which case all values are reduced)
+        field : str
+            field of list records that is reduced (default is "q")
+        func : callable
+            reduction applied to the values of each record (default is
+            np.sum)
+
+        Returns
+        -------
+        totim : numpy.ndarray
+            simulation time of each record
+        values : numpy.ndarray
+            reduced value of each record
+
+        """
+        irec = self.find(text, paknam)
+        if ids is not None:
+            ids = np.asarray(ids)
+        values = np.empty(irec.size)
+        for n, i in enumerate(irec):
+            data = self._record(int(i))
+            if self.index["imeth"][i] == 6:
+                q = data[field]
+                if ids is not None:
+                    q = q[np.isin(data["id1"], ids)]
+            else:
+                q = data.ravel()
+                if ids is not None:
+                    q = q[ids - 1]
+            values[n] = func(q)
+        return self.index["totim"][irec], values
+
+    def close(self):
+        """Release the memory map"""
+        self._mm = None
+
+    # protected methods
+    def _scan(self, fpth):
+        """Read the record headers and return the record index"""
+        real = np.dtype(self.realtype)
+        header1 = np.dtype(
+            [
+                ("kstp", "<i4"),
+                ("kper", "<i4"),
+                ("text", "S16"),
+                ("ncol", "<i4"),
+                ("nrow", "<i4"),
+                ("nlay", "<i4"),
+            ]
+        )
+        header2 = np.dtype(
+            [("imeth", "<i4"), ("delt", real), ("pertim", real), ("totim", real)]
+        )
+        names = np.dtype(
+            [
+                ("modelnam", "S16"),
+                ("paknam", "S16"),
+                ("modelnam2", "S16"),
+                ("paknam2", "S16"),
+                ("ndat", "<i4"),
+            ]
+        )
+        size = os.path.getsize(fpth)
+        index = []
+        with open(fpth, "rb") as f:
+            offset = 0
+            while offset < size:
+                f.seek(offset)
+                h1 = np.frombuffer(f.read(header1.itemsize), header1)[0]
+                offset += header1.itemsize
+                record = dict(zip(header1.names, h1.tolist()))
+                nlay = record["nlay"]
+                record["nlay"] = abs(nlay)
+                record.update(imeth=0, delt=np.nan, pertim=np.nan, totim=np.nan)
+                if nlay < 0:
+                    # compact header
+                    h2 = np.frombuffer(f.read(header2.itemsize), header2)[0]
+                    offset += header2.itemsize
+                    record.update(zip(header2.names, h2.tolist()))
+                record.update(
+                    modelnam=b"",
+                    paknam=b"",
+                    modelnam2=b"",
+                    paknam2=b"",
+                    ndat=0,
+                    nlist=0,
+                )
+                imeth = record["imeth"]
+                if imeth in (0, 1):
+                    nval = record["ncol"] * record["nrow"] * record["nlay"]
+                    record["offset"] = offset
+                    offset += nval * real.itemsize
+                elif imeth == 6:
+                    h3 = np.frombuffer(f.read(names.itemsize), names)[0]
+                    offset += names.itemsize
+                    record.update(zip(names.names, h3.tolist()))
+                    # skip the names of the auxiliary variables
+                    offset += 16 * (record["ndat"] - 1)
+                    f.seek(offset)
+                    record["nlist"] = int(np.frombuffer(f.read(4), "<i4")[0])
+                    offset += 4
+                    record["offset"] = offset
+                    nbytes = 8 + real.itemsize * record["ndat"]
+                    offset += record["nlist"] * nbytes
+                else:
+                    raise ValueError(
+                        "imeth {} in {} is not supported".format(imeth, fpth)
+                    )
+                index.append(
+                    tuple(record[name] for name in budget_index_dtype.names)
+                )
+        if offset > size:
+            raise ValueError("{} ends with an incomplete record".format(fpth))
+        return np.array(index, dtype=budget_index_dtype)
+
+    def _time_start(self):
+        """Return the positions in index of the first record of each time"""
+        index = self.index
+        new_time = np.ones(index.size, dtype=bool)
+        new_time[1:] = (index["kstp"][1:] != index["kstp"][:-1]) | (
+            index["kper"][1:] != index["kper"][:-1]
+        )
+        return np.flatnonzero(new_time)
+
+    def _list_dtype(self, i):
+        """Return the dtype of the list data of record i"""
+        record = self.index[i]
+        real = np.dtype(self.realtype)
+        fields = [("id1", "<i4"), ("id2", "<i4"), ("q", real)]
+        naux = int(record["ndat"]) - 1
+        if naux > 0:
+            start = int(record["offset"]) - 4 - 16 * naux
+            auxnames = bytes(self._mm[start : start + 16 * naux])
+            for iaux in range(naux):
+                name = auxnames[16 * iaux : 16 * (iaux + 1)].strip().decode()
+                fields.append((name.lower(), real))
+        return np.dtype(fields)
+
+    def _record(self, i):
+        """Return the data of record i as a view of the memory map"""
+        record = self.index[i]
+        offset = int(record["offset"])
+        if record["imeth"] == 6:
+            return np.ndarray(
+                (int(record["nlist"]),),
+                dtype=self._list_dtype(i),
+                buffer=self._mm,
+                offset=offset,
+            )
+        shape = (int(record["nlay"]), int(record["nrow"]), int(record["ncol"]))
+        return np.ndarray(
+            shape, dtype=self.realtype, buffer=self._mm, offset=offset
+        )
+
+    def _regular_view(self, records, field):
+        """Return a strided view of the records of a term, None if the
+        records do not have the same size and spacing"""
+        if records.size < 2:
+            return None
+        stride = np.diff(records["offset"])
+        if np.any(stride != stride[0]):
+            return None
+        rstride = int(stride[0])
+        offset = int(records["offset"][0])
+        if records["imeth"][0] == 6:
+            if np.any(records["nlist"] != records["nlist"][0]):
+                return None
+            i = int(np.flatnonzero(self.index["offset"] == offset)[0])
+            dtype = self._list_dtype(i)
+            nlist = int(records["nlist"][0])
+            view = np.ndarray(
+                (records.size, nlist),
+                dtype=dtype,
+                buffer=self._mm,
+                offset=offset,
+                strides=(rstride, dtype.itemsize),
+            )
+            return view[field]
+        shape = (
+            int(records["nlay"][0]),
+            int(records["nrow"][0]),
+            int(records["ncol"][0]),
+        )
+        if np.any(records["nlay"] != shape[0]) or np.any(
+            (records["nrow"] != shape[1]) | (records["ncol"] != shape[2])
+        ):
+            return None
+        itemsize = np.dtype(self.realtype).itemsize
+        return np.ndarray(
+            (records.size,) + shape,
+            dtype=self.realtype,
+            buffer=self._mm,
+            offset=offset,
+            strides=(
+                rstride,
+                shape[1] * shape[2] * itemsize,
+                shape[2] * itemsize,
+                itemsize,
+            ),
+        )
+
+
+class ObsFile:
+    def __init__(self, fpth):
+        """Create an ObsFile object for a MODFLOW 6 binary observation file
+
+        The file is read incrementally: every call to update reads only
+        the records that were appended since the last call, so the same
+        object can follow the observations while MODFLOW 6 runs. A file
+        that does not exist yet, or that only has part of its header, has
+        no records until it is written.
+
+        Parameters
+        ----------
+        fpth : str
+            path to a MODFLOW 6 observation file written with BINARY
+        """
+        self.fpth = fpth
+        self.names = None
+        self.precision = None
+        self.dtype = None
+        self._offset = 0
+        self._chunks = []
+        self._data = None
+        self.update()
+
+    @property
+    def nobs(self):
+        """Number of observations, 0 until the header is written"""
+        return 0 if self.names is None else len(self.names)
+
+    @property
+    def data(self):
+        """Structured array with totim and a field for every observation"""
+        if self._data is None:
+            if self._chunks:
+                self._data = np.concatenate(self._chunks)
+                self._chunks = [self._data]
+            else:
+                self._data = self._empty()
+        return self._data
+
+    def update(self):
+        """Read the records appended since the last update
+
+        Returns
+        -------
+        records : numpy.ndarray
+            the new records, empty if there are none
+
+        """
+        empty = self._empty()
+        if not os.path.isfile(self.fpth):
+            return empty
+        with open(self.fpth, "rb") as f:
+            if self.names is None and not self._read_header(f):
+                return empty
+            f.seek(self._offset)
+            buf = f.read()
+        nrec = len(buf) // self.dtype.itemsize
+        if nrec == 0:
+            return empty
+        records = np.frombuffer(buf, dtype=self.dtype, count=nrec).copy()
+        self._offset += nrec * self.dtype.itemsize
+        self._chunks.append(records)
+        self._data = None
+        return records
+
+    def get_times(self):
+        """Return the simulation time of every record"""
+        return self.data["totim"]
+
+    def get_data(self, obsname):
+        """Return the values of one observation
+
+        Parameters
+        ----------
+        obsname : str
+            observation name (case insensitive)
+
+        Returns
+        -------
+        values : numpy.ndarray
+            value of the observation for every record
+
+        """
+        name = obsname.upper()
+        if name not in self.dtype.names:
+            raise ValueError("{} is not in {}".format(obsname, self.fpth))
+        return self.data[name]
+
+    # protected methods
+    def _empty(self):
+        """Return an array without records"""
+        return np.zeros(0, dtype=self.dtype or [("totim", "<f8")])
+
+    def _read_header(self, f):
+        """Read the header, False if it is not completely written"""
+        header = f.read(100)
+        if len(header) < 100:
+            return False
+        if not header.startswith(b"cont"):
+            raise ValueError(
+                "{} is not a continuous observation file".format(self.fpth)
+            )
+        precision = "double" if b"double" in header[5:11] else "single"
+        lenobsname = int(header[11:])
+        buf = f.read(4)
+        if len(buf) < 4:
+            return False
+        nobs = int(np.frombuffer(buf, dtype="<i4")[0])
+        buf = f.read(nobs * lenobsname)
+        if len(buf) < nobs * lenobsname:
+            return False
+        names = [
+            buf[i * lenobsname : (i + 1) * lenobsname].strip().decode().upper()
+            for i in range(nobs)
+        ]
+        real = "<f8" if precision == "double" else "<f4"
+        self.precision = precision
+        self.names = names
+        self.dtype = np.dtype(
+            [("totim", real)] + [(name, real) for name in names]
+        )
+        self._offset = 104 + nobs * lenobsname
+        return True
+
+
+def read_head(fpth, precision=None, cache=True):
+    """Open a MODFLOW 6 head file with a persisted record index
+
+    Parameters
+    ----------
+    fpth : str
+        path to a MODFLOW 6 binary head file
+    precision : str
+        "double" or "single" (default is None, in which case the precision
+        is determined from the file)
+    cache : bool
+        boolean indicating if the record index is saved next to fpth
+        (default is True)
+
+    Returns
+    -------
+    hds : HeadFile
+        HeadFile object with memory-mapped access to the heads
+
+    """
+    return HeadFile(fpth, precision=precision, cache=cache)
+
+
+def read_budget(fpth, precision="double", cache=True):
+    """Open a MODFLOW 6 budget file with a persisted record index
+
+    Parameters
+    ----------
+    fpth : str
+        path to a MODFLOW 6 model or advanced package budget file
+    precision : str
+        "double" or "single" (default is "double")
+    cache : bool
+        boolean indicating if the record index is saved next to fpth
+        (default is True)
+
+    Returns
+    -------
+    cbc : BudgetFile
+        BudgetFile object with indexed, memory-mapped access to the terms
+
+    """
+    return BudgetFile(fpth, precision=precision, cache=cache)
+
+
+def read_obs(fpth):
+    """Open a MODFLOW 6 binary observation file for incremental reading
+
+    Parameters
+    ----------
+    fpth : str
+        path to a MODFLOW 6 observation file written with BINARY
+
+    Returns
+    -------
+    obs : ObsFile
+        ObsFile object, call update to read records that are appended
+        later
+
+    """
+    return ObsFile(fpth)
+
+
+# protected functions
+def _regular_index(fpth, header_dtype, itemsize, size):
+    """Return the record index of a file with records of the same size,
+    None if the records have different sizes"""
+    first = np.fromfile(fpth, dtype=header_dtype, count=1)
+    if first.size == 0:
+        return np.zeros(0, dtype=array_index_dtype)
+    nval = int(first["ncol"][0]) * int(first["nrow"][0])
+    rsize = header_dtype.itemsize + nval * itemsize
+    if size % rsize != 0:
+        return None
+    # read every header through a strided view of the memory-mapped file
+    mm = np.memmap(fpth, dtype=np.uint8, mode="r")
+    headers = np.ndarray(
+        (size // rsize,), dtype=header_dtype, buffer=mm, strides=(rsize,)
+    )
+    if np.any(headers["ncol"] != first["ncol"][0]) or np.any(
+        headers["nrow"] != first["nrow"][0]
+    ):
+        return None
+    index = np.empty(headers.size, dtype=array_index_dtype)
+    for name in header_dtype.names:
+        index[name] = headers[name]
+    index["offset"] = header_dtype.itemsize + rsize * np.arange(headers.size)
+    del headers, mm
+    return index
+
+
+def _array_precision(fpth):
+    """Return the precision of an array file from the first header"""
+    for precision, realtype in (("double", np.float64), ("single", np.float32)):
+        header = np.fromfile(fpth, dtype=_array_header[realtype], count=1)
+        if header.size == 0:
+            raise ValueError("{} is empty".format(fpth))
+        text = header["text"][0]
+        if text.strip() and all(32 <= c < 127 for c in text):
+            nval = int(header["ncol"][0]) * int(header["nrow"][0])
+            if 0 < nval and header["ilay"][0] > 0:
+                return precision
+    raise ValueError("could not determine the precision of {}".format(fpth))
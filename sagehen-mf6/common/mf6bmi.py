@@ -0,0 +1,462 @@
+import os
+import time
+import numpy as np
+
+# integer variables that are part of the MODFLOW 6 state: the time step and
+# stress period, the active and inactive cells and the number of UZF waves
+state_integers = ("KPER", "KSTP", "IBOUND", "NWAVST")
+
+
+class Mf6BmiDriver:
+    def __init__(
+        self,
+        libmf6,
+        sim_ws,
+        gwfname,
+        uzfname="UZF-1",
+        sfrname="SFR-1",
+        solution_id=1,
+    ):
+        """Create a Mf6BmiDriver object
+
+        MODFLOW 6 is loaded in-process from the shared library through the
+        BMI/XMI interface (xmipy). Infiltration is written to UZF and heads
+        and SFR flows are read back through get_value_ptr views of the
+        MODFLOW 6 memory, so no files are written and no arrays are
+        allocated while time stepping.
+
+        Parameters
+        ----------
+        libmf6 : str
+            path to the MODFLOW 6 shared library
+        sim_ws : str
+            simulation workspace with the MODFLOW 6 input files
+        gwfname : str
+            name of the groundwater flow model
+        uzfname : str
+            name of the UZF package (default is "UZF-1")
+        sfrname : str
+            name of the SFR package (default is "SFR-1")
+        solution_id : int
+            solution group that is solved (default is 1)
+        """
+        self.libmf6 = os.path.abspath(libmf6)
+        self.sim_ws = sim_ws
+        self.gwfname = gwfname.upper()
+        self.uzfname = uzfname.upper()
+        self.sfrname = sfrname.upper()
+        self.solution_id = solution_id
+        self.mf6 = None
+
+    def initialize(self):
+        """Load and initialize MODFLOW 6 and get the memory views"""
+        from xmipy import XmiWrapper
+
+        mf6 = XmiWrapper(self.libmf6, working_directory=self.sim_ws)
+        mf6.initialize()
+        self.mf6 = mf6
+
+        self.head = self.get_value_ptr("X", self.gwfname)
+        self.sinf = self.get_value_ptr("SINF", self.gwfname, self.uzfname)
+        self.sfr_qoutflow = self.get_value_ptr(
+            "QOUTFLOW", self.gwfname, self.sfrname
+        )
+        self.sfr_stage = self.get_value_ptr(
+            "STAGE", self.gwfname, self.sfrname
+        )
+        self.max_iter = int(
+            self.get_value_ptr("MXITER", "SLN_{}".format(self.solution_id))[0]
+        )
+        # reduced node number of each user node, empty if all are active
+        self.nodereduced = self.get_value_ptr(
+            "NODEREDUCED", self.gwfname, "DIS"
+        )
+        self.start_time = mf6.get_start_time()
+        self.end_time = mf6.get_end_time()
+        self._addresses = None
+
+    def get_value_ptr(self, name, component, subcomponent=None):
+        """Return a view of a MODFLOW 6 variable
+
+        Parameters
+        ----------
+        name : str
+            variable name
+        component : str
+            model or solution name
+        subcomponent : str
+            package name (default is None)
+
+        Returns
+        -------
+        value : numpy.ndarray
+            array that shares memory with MODFLOW 6
+
+        """
+        if subcomponent is None:
+            address = self.mf6.get_var_address(name, component)
+        else:
+            address = self.mf6.get_var_address(name, component, subcomponent)
+        return self.mf6.get_value_ptr(address)
+
+    def node_index(self, cellids):
+        """Return the zero-based index in head of zero-based cellids
+
+        Parameters
+        ----------
+        cellids : numpy.ndarray
+            (n, 3) zero-based (k, i, j) cell ids
+
+        Returns
+        -------
+        index : numpy.ndarray
+            zero-based index of each cell in the head view
+
+        """
+        cellids = np.asarray(cellids)
+        shape = self.mf6.get_value_ptr(
+            self.mf6.get_var_address("MSHAPE", self.gwfname, "DIS")
+        )
+        nodes = np.ravel_multi_index(cellids.T, tuple(shape))
+        if self.nodereduced.size > 0:
+            nodes = self.nodereduced[nodes] - 1
+        if np.any(nodes < 0):
+            raise ValueError("cellids include inactive cells")
+        return nodes
+
+    def update(self, infiltration=None):
+        """Solve one time step
+
+        Parameters
+        ----------
+        infiltration : callable
+            function called as infiltration(time, sinf) after the period
+            data and time series for the time step are applied and before
+            it is solved. time is the simulation time at the start of the
+            time step and sinf is the UZF infiltration view that the
+            function updates in place (default is None)
+
+        Returns
+        -------
+        converged : bool
+            boolean indicating if the time step converged
+
+        """
+        mf6 = self.mf6
+        t = mf6.get_current_time()
+        mf6.prepare_time_step(mf6.get_time_step())
+        if infiltration is not None:
+            infiltration(t, self.sinf)
+        mf6.prepare_solve(self.solution_id)
+        converged = False
+        kiter = 0
+        while kiter < self.max_iter:
+            converged = mf6.solve(self.solution_id)
+            kiter += 1
+            if converged:
+                break
+        mf6.finalize_solve(self.solution_id)
+        mf6.finalize_time_step()
+        return converged
+
+    def run(
+        self,
+        infiltration=None,
+        head_index=None,
+        reaches=None,
+        verbose=True,
+        checkpoint=None,
+        checkpoint_interval=None,
+        key="",
+    ):
+        """Run the simulation with MODFLOW 6 in-process
+
+        With a checkpoint file the state of MODFLOW 6 and the saved results
+        are written to it every checkpoint_interval simulated time units,
+        and a run that finds a checkpoint with the same key resumes from
+        it. The results of a resumed run are identical to the results of a
+        run that was not interrupted, but the MODFLOW 6 output files only
+        have the time steps that were solved after the restart. The
+        checkpoint is removed when the run is done.
+
+        Parameters
+        ----------
+        infiltration : callable
+            function called as infiltration(time, sinf) before each time
+            step is solved, see update (default is None)
+        head_index : numpy.ndarray
+            zero-based indexes in the head view that are saved after every
+            time step, see node_index (default is None)
+        reaches : numpy.ndarray
+            zero-based SFR reaches that have their outflow saved after every
+            time step (default is None)
+        verbose : bool
+            boolean indicating if the throughput is reported (default is
+            True)
+        checkpoint : str
+            path of the checkpoint file, see save_checkpoint (default is
+            None)
+        checkpoint_interval : float
+            simulated time between checkpoints, None to only resume from
+            an existing checkpoint (default is None)
+        key : str
+            identifier of the simulation inputs, a checkpoint is only
+            resumed if it was saved with the same key (default is "")
+
+        Returns
+        -------
+        results : dict
+            dictionary with the simulation times (times), the saved heads
+            (head) and SFR outflows (qoutflow), a boolean for every time
+            step indicating if it converged (converged), the number of time
+            steps that did not converge (nfail) and the throughput in
+            simulated days per second (days_per_second)
+
+        """
+        if self.mf6 is None:
+            self.initialize()
+        mf6 = self.mf6
+
+        # preallocate the saved results for every time step
+        nstep = self._count_time_steps()
+        times = np.empty(nstep)
+        converged = np.ones(nstep, dtype=bool)
+        head = None
+        if head_index is not None:
+            head_index = np.asarray(head_index)
+            head = np.empty((nstep, head_index.size))
+        qoutflow = None
+        if reaches is not None:
+            reaches = np.asarray(reaches)
+            qoutflow = np.empty((nstep, reaches.size))
+
+        nfail = 0
+        kstp = 0
+        t0 = time.perf_counter()
+        start_time = self.start_time
+        if checkpoint is not None:
+            saved = self.load_checkpoint(checkpoint, key=key)
+            if saved is not None:
+                self._resume(saved["state"], saved["kper"], infiltration)
+                kstp = saved["kstp"]
+                nfail = saved["nfail"]
+                times[:kstp] = saved["times"]
+                converged[:kstp] = saved["converged"]
+                if head is not None:
+                    head[:kstp] = saved["head"]
+                if qoutflow is not None:
+                    qoutflow[:kstp] = saved["qoutflow"]
+                start_time = mf6.get_current_time()
+                if verbose:
+                    print(
+                        "resumed after time step {} at time {}".format(
+                            kstp, start_time
+                        )
+                    )
+        next_checkpoint = None
+        if checkpoint is not None and checkpoint_interval:
+            next_checkpoint = mf6.get_current_time() + checkpoint_interval
+
+        while mf6.get_current_time() < self.end_time:
+            if not self.update(infiltration):
+                converged[kstp] = False
+                nfail += 1
+            t = mf6.get_current_time()
+            times[kstp] = t
+            if head is not None:
+                np.take(self.head, head_index, out=head[kstp])
+            if qoutflow is not None:
+                np.take(self.sfr_qoutflow, reaches, out=qoutflow[kstp])
+            kstp += 1
+            if (
+                next_checkpoint is not None
+                and next_checkpoint <= t < self.end_time
+            ):
+                self.save_checkpoint(
+                    checkpoint,
+                    key=key,
+                    kstp=kstp,
+                    nfail=nfail,
+                    times=times[:kstp],
+                    converged=converged[:kstp],
+                    head=None if head is None else head[:kstp],
+                    qoutflow=None if qoutflow is None else qoutflow[:kstp],
+                )
+                next_checkpoint = t + checkpoint_interval
+        elapsed = time.perf_counter() - t0
+        if checkpoint is not None and os.path.isfile(checkpoint):
+            os.remove(checkpoint)
+
+        days_per_second = (self.end_time - start_time) / elapsed
+        if verbose:
+            print(
+                "{} time steps, {:.1f} simulated days per second, "
+                "{} failed to converge".format(kstp, days_per_second, nfail)
+            )
+        return {
+            "times": times[:kstp],
+            "head": None if head is None else head[:kstp],
+            "qoutflow": None if qoutflow is None else qoutflow[:kstp],
+            "converged": converged[:kstp],
+            "nfail": nfail,
+            "days_per_second": days_per_second,
+        }
+
+    def get_state(self):
+        """Return a copy of the MODFLOW 6 state
+
+        The state is every double precision variable of the model, the
+        time discretization and the solution, which includes the heads,
+        the UZF wave state, the SFR stages and the budget accumulators,
+        and the integer variables in state_integers. The other integer
+        variables are dimensions, options and file units that are set when
+        the simulation is initialized and are not restored.
+
+        Returns
+        -------
+        state : dict
+            dictionary of variable addresses and copies of their values
+
+        """
+        return {
+            address: np.array(self.mf6.get_value(address))
+            for address in self._state_addresses()
+        }
+
+    def set_state(self, state):
+        """Overwrite the MODFLOW 6 state with a state from get_state
+
+        Parameters
+        ----------
+        state : dict
+            dictionary of variable addresses and values
+
+        """
+        addresses = self._state_addresses()
+        missing = set(addresses) - set(state)
+        if missing:
+            raise ValueError(
+                "state does not have {} of the MODFLOW 6 variables, "
+                "for example {}".format(len(missing), min(missing))
+            )
+        for address in addresses:
+            value = state[address]
+            current = self.mf6.get_value(address)
+            if np.shape(current) != np.shape(value):
+                raise ValueError(
+                    "{} has shape {}, the state has shape {}".format(
+                        address, np.shape(current), np.shape(value)
+                    )
+                )
+            self.mf6.set_value(address, value)
+
+    def save_checkpoint(self, fpth, key="", **results):
+        """Save the MODFLOW 6 state and the results to a checkpoint file
+
+        The checkpoint is a compressed npz file that replaces the previous
+        checkpoint in one step, so an interrupted save leaves the previous
+        checkpoint intact.
+
+        Parameters
+        ----------
+        fpth : str
+            path of the checkpoint file
+        key : str
+            identifier of the simulation inputs (default is "")
+        results : dict
+            arrays saved with the state, None values are skipped
+
+        """
+        arrays = {
+            "state/{}".format(address): value
+            for address, value in self.get_state().items()
+        }
+        for name, value in results.items():
+            if value is not None:
+                arrays["results/{}".format(name)] = value
+        arrays["key"] = np.array(key)
+        arrays["kper"] = np.array(self._current_period())
+        tmp_pth = "{}.{}.tmp.npz".format(fpth, os.getpid())
+        np.savez_compressed(tmp_pth, **arrays)
+        os.replace(tmp_pth, fpth)
+
+    def load_checkpoint(self, fpth, key=""):
+        """Load a checkpoint file saved with the same key
+
+        Parameters
+        ----------
+        fpth : str
+            path of the checkpoint file
+        key : str
+            identifier of the simulation inputs (default is "")
+
+        Returns
+        -------
+        checkpoint : dict
+            the state (state), the stress period of the state (kper) and
+            the saved results, None if there is no checkpoint for key
+
+        """
+        if not os.path.isfile(fpth):
+            return None
+        with np.load(fpth) as saved:
+            if saved["key"].item() != key:
+                return None
+            checkpoint = {"state": {}, "kper": int(saved["kper"])}
+            for name in saved.files:
+                group, _, address = name.partition("/")
+                if group == "state":
+                    checkpoint["state"][address] = saved[name]
+                elif group == "results":
+                    value = saved[name]
+                    checkpoint[address] = value if value.ndim else value.item()
+        return checkpoint
+
+    def finalize(self):
+        """Finalize MODFLOW 6 and release the shared library"""
+        if self.mf6 is not None:
+            self.mf6.finalize()
+            self.mf6 = None
+
+    # protected methods
+    def _state_addresses(self):
+        """Return the addresses of the variables that make up the state"""
+        if self._addresses is None:
+            components = (
+                self.gwfname,
+                "TDIS",
+                "SLN_{}".format(self.solution_id),
+            )
+            self._addresses = sorted(
+                address
+                for address in self.mf6.get_input_var_names()
+                if address.split("/")[0].upper() in components
+                and (
+                    self.mf6.get_var_type(address).startswith("DOUBLE")
+                    or address.split("/")[-1].upper() in state_integers
+                )
+            )
+        return self._addresses
+
+    def _current_period(self):
+        """Return the current stress period"""
+        return int(self.get_value_ptr("KPER", "TDIS")[0])
+
+    def _resume(self, state, kper, infiltration=None):
+        """Advance to stress period kper and restore a saved state
+
+        The time steps up to the first time step of kper are solved so the
+        packages read the period data of kper, and their results are then
+        replaced by the saved state.
+        """
+        while (
+            self._current_period() < kper
+            and self.mf6.get_current_time() < self.end_time
+        ):
+            self.update(infiltration)
+        self.set_state(state)
+
+    def _count_time_steps(self):
+        """Return the number of time steps in the simulation"""
+        nstp = self.mf6.get_value_ptr(self.mf6.get_var_address("NSTP", "TDIS"))
+        return int(np.sum(nstp))
@@ -0,0 +1,389 @@
+import os
+import re
+import hashlib
+import numpy as np
+import arraycache
+
+# section headers
+_budget_header = re.compile(
+    r"^\s*(.+?)\s+BUDGET FOR ENTIRE MODEL AT END OF TIME STEP\s*(\d+),\s*"
+    r"STRESS PERIOD\s+(\d+)"
+)
+_time_header = re.compile(
+    r"^\s*TIME SUMMARY AT END OF TIME STEP\s*(\d+)\s+IN STRESS PERIOD\s+(\d+)"
+)
+
+# solution summary lines
+_calls = re.compile(
+    r"^\s*(\d+)\s+CALLS TO NUMERICAL SOLUTION IN TIME STEP\s*(\d+)\s+"
+    r"STRESS PERIOD\s+(\d+)"
+)
+_total = re.compile(r"^\s*(\d+)\s+TOTAL ITERATIONS")
+_failed = re.compile(r"FAILED TO MEET SOLVER CONVERGENCE CRITERIA")
+
+# budget table lines, cumulative and rate entries with the package name
+_budget_entry = re.compile(
+    r"^\s*(.+?)\s*=\s*(\S+)\s+(.+?)\s*=\s*(\S+)(?:\s+(\S+))?\s*$"
+)
+_budget_direction = re.compile(r"^\s*(IN|OUT):\s+(IN|OUT):\s*$")
+
+# elapsed run time at the end of the simulation listing file
+_elapsed = re.compile(r"^\s*Elapsed run time:\s*(.+)$")
+_elapsed_units = {"days": 86400.0, "hours": 3600.0, "minutes": 60.0}
+
+# bytes before the resume offset that must match when a cache is reused
+_tail_bytes = 4096
+
+
+class ListingFile:
+    def __init__(self, fpth, time_units="days", cache=False):
+        """Create a ListingFile object for a MODFLOW 6 listing file
+
+        The listing file is parsed incrementally: every call to update
+        reads only the lines appended since the last call, so the same
+        object can follow a listing file while MODFLOW 6 runs and be read
+        again after the run without parsing the file a second time. The
+        IMS convergence summary (CALLS TO NUMERICAL SOLUTION and TOTAL
+        ITERATIONS lines), the volumetric budget tables, the time summary
+        tables and the elapsed run time are collected into columns.
+
+        Parameters
+        ----------
+        fpth : str
+            path to a MODFLOW 6 model or simulation listing file
+        time_units : str
+            column of the time summary tables that is saved as totim
+            (default is "days")
+        cache : bool
+            boolean indicating if the parsed columns and the file offset
+            are saved in the arraycache directory next to fpth, so a later
+            ListingFile for the same file only parses the lines appended
+            since the cache was saved (default is False)
+        """
+        self.fpth = fpth
+        self.time_units = time_units.upper()
+        self.cache = cache
+        self.offset = 0
+        self.elapsed = None
+        self._solver = _Columns()
+        self._budget = _Columns()
+        self._times = _Columns()
+        self._nfail = 0
+        # parser state, None between sections
+        self._section = None
+        self._row = None
+        self._direction = None
+        self._labels = None
+        if cache:
+            self._load_cache()
+        self.update()
+
+    def update(self):
+        """Parse the lines appended to the file since the last update
+
+        Returns
+        -------
+        nbytes : int
+            number of bytes parsed
+
+        """
+        if not os.path.isfile(self.fpth):
+            return 0
+        with open(self.fpth, "rb") as f:
+            f.seek(self.offset)
+            buf = f.read()
+        # only complete lines are parsed, a partial last line is read
+        # again by the next update
+        end = buf.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+        for line in buf[:end].decode(errors="replace").splitlines():
+            self._parse(line)
+        self.offset += end
+        if self.cache and self._section is None:
+            self._save_cache()
+        return end
+
+    @property
+    def solver(self):
+        """Dictionary of kper, kstp, outer and inner iteration arrays, one
+        entry per time step"""
+        return self._solver.arrays()
+
+    @property
+    def budget(self):
+        """Dictionary of budget arrays, one entry per budget table
+
+        kper and kstp identify each table. Every budget term has a
+        "<term>_IN" and "<term>_OUT" rate column and a "CUM_<term>_IN" and
+        "CUM_<term>_OUT" cumulative column, with the package name appended
+        to terms that appear more than once. TOTAL_IN, TOTAL_OUT, IN-OUT
+        and PERCENT_DISCREPANCY are included.
+        """
+        return self._budget.arrays()
+
+    @property
+    def times(self):
+        """Dictionary of kper, kstp, delt and totim arrays from the time
+        summary tables"""
+        return self._times.arrays()
+
+    @property
+    def nfail(self):
+        """Number of time steps that failed to converge"""
+        return self._nfail
+
+    # protected methods
+    def _parse(self, line):
+        """Update the columns and the parser state with one line"""
+        section = self._section
+        if section is None:
+            # lines without a keyword are skipped without a regular
+            # expression
+            if "TIME STEP" in line:
+                m = _calls.match(line)
+                if m is not None:
+                    self._row = {
+                        "kper": int(m.group(3)),
+                        "kstp": int(m.group(2)),
+                        "outer": int(m.group(1)),
+                    }
+                    self._section = "solver"
+                    return
+                m = _budget_header.match(line)
+                if m is not None:
+                    self._row = {"kper": int(m.group(3)), "kstp": int(m.group(2))}
+                    self._section = "budget"
+                    self._direction = None
+                    return
+                m = _time_header.match(line)
+                if m is not None:
+                    self._row = {"kper": int(m.group(2)), "kstp": int(m.group(1))}
+                    self._section = "time"
+                    self._labels = None
+                    return
+            if "FAILED" in line and _failed.search(line) is not None:
+                self._nfail += 1
+            elif "Elapsed" in line:
+                m = _elapsed.match(line)
+                if m is not None:
+                    self.elapsed = _elapsed_seconds(m.group(1))
+            return
+
+        if section == "solver":
+            m = _total.match(line)
+            if m is not None:
+                self._row["inner"] = int(m.group(1))
+                self._end_section(self._solver)
+            elif line.strip():
+                # the summary has no TOTAL ITERATIONS line
+                self._end_section(self._solver)
+                self._parse(line)
+        elif section == "budget":
+            self._parse_budget(line)
+        elif section == "time":
+            self._parse_time(line)
+
+    def _parse_budget(self, line):
+        """Parse a line of a volumetric budget table"""
+        if "=" not in line:
+            if ":" in line:
+                m = _budget_direction.match(line)
+                if m is not None:
+                    self._direction = m.group(1)
+            return
+        m = _budget_entry.match(line)
+        if m is None:
+            return
+        name, cum, rate = m.group(1), m.group(2), m.group(4)
+        name = " ".join(name.split())
+        if name == "PERCENT DISCREPANCY":
+            self._row["PERCENT_DISCREPANCY"] = _to_float(rate)
+            self._row["CUM_PERCENT_DISCREPANCY"] = _to_float(cum)
+            self._end_section(self._budget)
+            return
+        if name in ("TOTAL IN", "TOTAL OUT"):
+            key = name.replace(" ", "_")
+        elif name == "IN - OUT":
+            key = "IN-OUT"
+        else:
+            key = "{}_{}".format(name, self._direction)
+            if key in self._row and m.group(5) is not None:
+                key = "{}_{}_{}".format(name, m.group(5), self._direction)
+        self._row[key] = _to_float(rate)
+        self._row["CUM_" + key] = _to_float(cum)
+
+    def _parse_time(self, line):
+        """Parse a line of a time summary table"""
+        tokens = line.split()
+        if not tokens:
+            return
+        if self._labels is None:
+            if tokens[0].isalpha() and tokens[0].upper() == tokens[0]:
+                self._labels = tokens
+            return
+        if tokens[0].startswith("-"):
+            return
+        try:
+            column = self._labels.index(self.time_units)
+        except ValueError:
+            column = 0
+        values = tokens[-len(self._labels) :]
+        label = " ".join(tokens[: -len(self._labels)])
+        if label == "TIME STEP LENGTH":
+            self._row["delt"] = _to_float(values[column])
+        elif label == "TOTAL TIME":
+            self._row["totim"] = _to_float(values[column])
+            self._end_section(self._times)
+
+    def _end_section(self, columns):
+        """Append the row of the current section and reset the state"""
+        columns.append(self._row)
+        self._section = None
+        self._row = None
+
+    def _cache_path(self):
+        """Path of the cache file of the listing file"""
+        fpth = os.path.abspath(self.fpth)
+        return os.path.join(
+            os.path.dirname(fpth),
+            arraycache.cache_dirname,
+            "{}.listing.npz".format(os.path.basename(fpth)),
+        )
+
+    def _tail_digest(self, offset):
+        """Hash of the bytes of the file just before offset"""
+        start = max(0, offset - _tail_bytes)
+        with open(self.fpth, "rb") as f:
+            f.seek(start)
+            data = f.read(offset - start)
+        if len(data) != offset - start:
+            return None
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def _load_cache(self):
+        """Resume from the cache if it matches the start of the file"""
+        cache_pth = self._cache_path()
+        if not os.path.isfile(cache_pth) or not os.path.isfile(self.fpth):
+            return
+        with np.load(cache_pth) as cached:
+            meta = cached["meta"].item()
+            offset, digest, nfail, elapsed = meta.split("|")
+            offset = int(offset)
+            if self._tail_digest(offset) != digest:
+                return
+            for name, columns in (
+                ("solver", self._solver),
+                ("budget", self._budget),
+                ("times", self._times),
+            ):
+                prefix = name + "/"
+                columns.extend(
+                    {
+                        key[len(prefix) :]: cached[key]
+                        for key in cached.files
+                        if key.startswith(prefix)
+                    }
+                )
+        self.offset = offset
+        self._nfail = int(nfail)
+        self.elapsed = float(elapsed) if elapsed else None
+
+    def _save_cache(self):
+        """Save the columns and the offset of the parsed lines"""
+        cache_pth = self._cache_path()
+        os.makedirs(os.path.dirname(cache_pth), exist_ok=True)
+        meta = "{}|{}|{}|{}".format(
+            self.offset,
+            self._tail_digest(self.offset),
+            self._nfail,
+            "" if self.elapsed is None else repr(self.elapsed),
+        )
+        arrays = {"meta": np.array(meta)}
+        for name, columns in (
+            ("solver", self._solver),
+            ("budget", self._budget),
+            ("times", self._times),
+        ):
+            for key, values in columns.arrays().items():
+                arrays["{}/{}".format(name, key)] = values
+        tmp_pth = "{}.{}.tmp.npz".format(cache_pth, os.getpid())
+        np.savez(tmp_pth, **arrays)
+        os.replace(tmp_pth, cache_pth)
+
+
+class _Columns:
+    def __init__(self):
+        """Columns of rows with possibly different keys, missing values are
+        NaN"""
+        self.n = 0
+        self.columns = {}
+
+    def append(self, row):
+        for key in row:
+            if key not in self.columns:
+                self.columns[key] = [np.nan] * self.n
+        for key, values in self.columns.items():
+            values.append(row.get(key, np.nan))
+        self.n += 1
+
+    def extend(self, arrays):
+        n = max((len(values) for values in arrays.values()), default=0)
+        for key, values in arrays.items():
+            self.columns[key] = values.tolist()
+        self.n = n
+
+    def arrays(self):
+        arrays = {}
+        for key, values in self.columns.items():
+            if key in ("kper", "kstp", "outer", "inner") and not any(
+                value != value for value in values
+            ):
+                arrays[key] = np.array(values, dtype=np.int64)
+            else:
+                arrays[key] = np.array(values, dtype=np.float64)
+        return arrays
+
+
+def read_listing(fpth, time_units="days", cache=True):
+    """Parse a MODFLOW 6 listing file into columnar arrays
+
+    Parameters
+    ----------
+    fpth : str
+        path to a MODFLOW 6 model or simulation listing file
+    time_units : str
+        column of the time summary tables that is saved as totim (default
+        is "days")
+    cache : bool
+        boolean indicating if the parsed columns are cached, see
+        ListingFile (default is True)
+
+    Returns
+    -------
+    lst : ListingFile
+        ListingFile object, call update to parse lines that are appended
+        later
+
+    """
+    return ListingFile(fpth, time_units=time_units, cache=cache)
+
+
+# protected functions
+def _to_float(value):
+    """Convert a listing file number, MODFLOW can drop the E of exponents"""
+    try:
+        return float(value)
+    except ValueError:
+        m = re.match(r"^([-+]?[\d.]+)([-+]\d+)$", value)
+        if m is None:
+            return np.nan
+        return float("{}E{}".format(m.group(1), m.group(2)))
+
+
+def _elapsed_seconds(text):
+    """Convert the elapsed run time text to seconds"""
+    seconds = 0.0
+    for value, unit in re.findall(r"([\d.]+)\s+([A-Za-z]+)", text):
+        seconds += float(value) * _elapsed_units.get(unit.lower(), 1.0)
+    return seconds
@@ -0,0 +1,319 @@
+import os
+import re
+import time
+import asyncio
+import concurrent.futures
+import numpy as np
+import mf6lst
+
+# MODFLOW 6 stdout line written at the start of every time step, the
+# solution summary lines of the simulation listing file are parsed with the
+# patterns of mf6lst
+_solving = re.compile(r"Solving:\s+Stress period:\s+(\d+)\s+Time step:\s+(\d+)")
+
+
+class Mf6Progress:
+    def __init__(self, name, perioddata=None):
+        """Create a Mf6Progress object
+
+        Progress of a MODFLOW 6 run that is updated from the stdout and
+        listing file lines as they are written.
+
+        Parameters
+        ----------
+        name : str
+            name of the run used in the progress reports
+        perioddata : list
+            (perlen, nstp, tsmult) of every stress period, used to convert
+            the time step into simulated time (default is None, in which
+            case only time steps are reported)
+        """
+        self.name = name
+        self.kper = 0
+        self.kstp = 0
+        self.nstep = 0
+        self.nouter = 0
+        self.ninner = 0
+        self.nfail = 0
+        self.t0 = time.perf_counter()
+        self.done = False
+        self.success = False
+        self._step_times = None
+        self._first_step = None
+        if perioddata is not None:
+            self._first_step, self._step_times = _step_end_times(perioddata)
+
+    @property
+    def elapsed(self):
+        """Wall-clock seconds since the run started"""
+        return time.perf_counter() - self.t0
+
+    @property
+    def total_steps(self):
+        """Number of time steps in the simulation, None if unknown"""
+        if self._step_times is None:
+            return None
+        return self._step_times.size
+
+    @property
+    def simulated_time(self):
+        """Simulated time at the end of the current time step"""
+        if self._step_times is None or self.kper < 1:
+            return None
+        return self._step_times[self._first_step[self.kper - 1] + self.kstp - 1]
+
+    @property
+    def steps_per_second(self):
+        """Throughput in time steps per wall-clock second"""
+        return self.nstep / max(self.elapsed, 1e-9)
+
+    @property
+    def days_per_second(self):
+        """Throughput in simulated time units per wall-clock second"""
+        t = self.simulated_time
+        if t is None:
+            return None
+        return t / max(self.elapsed, 1e-9)
+
+    def report(self):
+        """Return a one-line progress report"""
+        line = "{}: period {} step {}".format(self.name, self.kper, self.kstp)
+        if self.total_steps is not None:
+            line += " ({:.1f}%)".format(100.0 * self.nstep / self.total_steps)
+        line += ", {} outer / {} inner iterations, {} failed".format(
+            self.nouter, self.ninner, self.nfail
+        )
+        line += ", {:.1f} steps/s".format(self.steps_per_second)
+        if self.days_per_second is not None:
+            line += ", {:.1f} days/s".format(self.days_per_second)
+        return line
+
+    def parse_stdout(self, line):
+        """Update the progress from a stdout line
+
+        Returns True if the line started a new time step.
+        """
+        m = _solving.search(line)
+        if m is None:
+            return False
+        self.kper, self.kstp = int(m.group(1)), int(m.group(2))
+        self.nstep += 1
+        return True
+
+    def parse_listing(self, line):
+        """Update the iteration counts from a simulation listing file line
+
+        Returns True if the line finished the solution of a time step.
+        """
+        m = mf6lst._calls.search(line)
+        if m is not None:
+            self.nouter += int(m.group(1))
+            return False
+        m = mf6lst._total.search(line)
+        if m is not None:
+            self.ninner += int(m.group(1))
+            return True
+        if mf6lst._failed.search(line) is not None:
+            self.nfail += 1
+        return False
+
+
+async def run_simulation(
+    exe,
+    sim_ws,
+    name=None,
+    perioddata=None,
+    listing="mfsim.lst",
+    callback=None,
+    interval=1.0,
+    normal_msg="normal termination",
+):
+    """Run MODFLOW 6 and stream its stdout and listing file
+
+    MODFLOW 6 runs as a subprocess of the event loop. Its stdout and the
+    simulation listing file are read line by line as they are written
+    and parsed into a Mf6Progress object, so several simulations can be
+    supervised concurrently from one event loop, see run_simulations.
+
+    Parameters
+    ----------
+    exe : str
+        path to the MODFLOW 6 executable
+    sim_ws : str
+        simulation workspace
+    name : str
+        name of the run used in the progress reports (default is the
+        name of sim_ws)
+    perioddata : list
+        (perlen, nstp, tsmult) of every stress period (default is None)
+    listing : str
+        name of the simulation listing file (default is "mfsim.lst")
+    callback : callable
+        function called as callback(progress) at most every interval
+        seconds while the model runs and once when it ends (default is
+        None, in which case the progress report is printed)
+    interval : float
+        seconds between progress callbacks (default is 1.0)
+    normal_msg : str
+        lower case message in stdout that indicates a successful run
+        (default is "normal termination")
+
+    Returns
+    -------
+    success : bool
+        boolean indicating if normal_msg was found in stdout
+    buff : list
+        lines of stdout
+    progress : Mf6Progress
+        progress of the finished run
+
+    """
+    if name is None:
+        name = os.path.basename(os.path.normpath(sim_ws))
+    if callback is None:
+        callback = _print_report
+    progress = Mf6Progress(name, perioddata=perioddata)
+    lst_pth = os.path.join(sim_ws, listing)
+    # a listing file from a previous run is replaced by the new run
+    if os.path.isfile(lst_pth):
+        os.remove(lst_pth)
+
+    # gfortran buffers stdout when it is a pipe unless told otherwise
+    env = dict(os.environ, GFORTRAN_UNBUFFERED_PRECONNECTED="y")
+    proc = await asyncio.create_subprocess_exec(
+        exe,
+        cwd=sim_ws,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        env=env,
+    )
+
+    last = [progress.t0]
+
+    def update():
+        now = time.perf_counter()
+        if now - last[0] >= interval:
+            last[0] = now
+            callback(progress)
+
+    buff = []
+
+    async def read_stdout():
+        async for raw in proc.stdout:
+            line = raw.decode(errors="replace").rstrip()
+            buff.append(line)
+            if progress.parse_stdout(line):
+                update()
+
+    listing_task = asyncio.ensure_future(
+        _follow(lst_pth, progress.parse_listing, proc)
+    )
+    try:
+        await read_stdout()
+        await proc.wait()
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        await listing_task
+
+    progress.done = True
+    progress.success = any(normal_msg in line.lower() for line in buff)
+    callback(progress)
+    return progress.success, buff, progress
+
+
+async def run_simulations(runs, **kwargs):
+    """Run several MODFLOW 6 simulations concurrently
+
+    Parameters
+    ----------
+    runs : list
+        list of (exe, sim_ws) pairs, or of dictionaries of run_simulation
+        arguments
+    kwargs : dict
+        run_simulation arguments shared by all of the runs
+
+    Returns
+    -------
+    results : list
+        (success, buff, progress) of each run, in the order of runs
+
+    """
+    tasks = []
+    for run in runs:
+        if isinstance(run, dict):
+            tasks.append(run_simulation(**dict(kwargs, **run)))
+        else:
+            tasks.append(run_simulation(*run, **kwargs))
+    return await asyncio.gather(*tasks)
+
+
+def run(exe, sim_ws, **kwargs):
+    """Run one simulation with run_simulation in a new event loop
+
+    The event loop runs on a worker thread if the calling thread already
+    runs one, for example in a Jupyter notebook, where asyncio.run can not
+    be used.
+    """
+    coro = run_simulation(exe, sim_ws, **kwargs)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+# protected functions
+def _print_report(progress):
+    """Default progress callback"""
+    if progress.done:
+        status = "normal termination" if progress.success else "failed"
+        print("{} in {:.1f} s".format(progress.report(), progress.elapsed))
+        print("{}: {}".format(progress.name, status))
+    else:
+        print(progress.report())
+
+
+async def _follow(fpth, parse, proc, poll=0.1):
+    """Pass the lines appended to a file to parse until proc exits"""
+    f = None
+    partial = ""
+    try:
+        while True:
+            running = proc.returncode is None
+            if f is None and os.path.isfile(fpth):
+                f = open(fpth, "r", errors="replace")
+            if f is not None:
+                chunk = f.read()
+                if chunk:
+                    lines = (partial + chunk).split("\n")
+                    partial = lines.pop()
+                    for line in lines:
+                        parse(line)
+            if not running:
+                break
+            await asyncio.sleep(poll)
+        if partial:
+            parse(partial)
+    finally:
+        if f is not None:
+            f.close()
+
+
+def _step_end_times(perioddata):
+    """Return the first step index of each period and the step end times"""
+    first = []
+    times = []
+    t = 0.0
+    for perlen, nstp, tsmult in perioddata:
+        first.append(len(times))
+        if tsmult == 1.0:
+            dt = np.full(nstp, perlen / nstp)
+        else:
+            dt0 = perlen * (tsmult - 1.0) / (tsmult**nstp - 1.0)
+            dt = dt0 * tsmult ** np.arange(nstp)
+        times.extend(t + np.cumsum(dt))
+        t += perlen
+    return np.array(first), np.array(times)
@@ -0,0 +1,375 @@
+import os
+import re
+import json
+import hashlib
+from itertools import chain
+import numpy as np
+
+# printf formats used for each kind of record field
+_field_formats = {"i": "%d", "u": "%d", "f": "%.15G", "O": "%s", "U": "%s"}
+
+_begin_period = re.compile(r"^\s*BEGIN\s+PERIOD\s+(\d+)", re.I)
+
+
+def store_griddata_external(
+    model, packages=("dis", "ic", "npf", "sto"), binary=True
+):
+    """Store the griddata arrays of model packages in external files
+
+    flopy writes binary external files with the MODFLOW 6 array header
+    followed directly by the numpy buffer of each layer, so the values are
+    not formatted as text and MODFLOW 6 reads them without parsing. The
+    external files are written immediately and the package files
+    reference them with OPEN/CLOSE when the simulation is written.
+
+    Parameters
+    ----------
+    model : flopy.mf6.MFModel
+        flopy model with the packages
+    packages : tuple
+        names of the packages with griddata arrays (default is ("dis",
+        "ic", "npf", "sto"))
+    binary : bool
+        boolean indicating if the external files are binary (default is
+        True)
+
+    Returns
+    -------
+    fnames : list
+        names of the external files, or of the first layer file of
+        layered arrays, relative to the simulation workspace
+
+    """
+    ext = ".bin" if binary else ".txt"
+    # the files are written before the simulation creates its workspace
+    os.makedirs(model.model_ws, exist_ok=True)
+    fnames = []
+    for pname in packages:
+        package = model.get_package(pname)
+        if package is None:
+            continue
+        for name, dataset in package.blocks["griddata"].datasets.items():
+            if not dataset.has_data():
+                continue
+            fname = "{}.{}.{}{}".format(model.name, pname, name, ext)
+            dataset.store_as_external_file(fname, binary=binary)
+            fnames.append(fname)
+    return fnames
+
+
+def write_period_files(fpth, periods, index_fields=(), ext=".txt"):
+    """Stream PERIOD blocks that read external files into an MF6 package
+
+    Each (kper, records) pair produced by periods is written to its own
+    external text file, and a PERIOD block that includes the file with
+    OPEN/CLOSE is appended to the package file. Only one period is held
+    in memory at a time, so memory use does not depend on the number of
+    stress periods and the write time grows linearly with it.
+
+    Periods that are written with this function must follow the PERIOD
+    blocks that are already in the package file, for example the blocks
+    written by flopy for the first stress periods.
+
+    Parameters
+    ----------
+    fpth : str
+        path to the MODFLOW 6 package file
+    periods : iterable
+        iterable, such as a generator, of (kper, records) pairs where kper
+        is the zero-based stress period and records is a numpy structured
+        array with the period data fields in file order
+    index_fields : tuple
+        names of fields that hold zero-based indexes that are written
+        one-based, like flopy does for cellids and feature numbers
+        (default is ())
+    ext : str
+        extension of the external files (default is ".txt")
+
+    Returns
+    -------
+    fnames : list
+        names of the external files relative to the package file
+
+    """
+    ws = os.path.dirname(fpth)
+    last = _last_period(fpth)
+    fnames = []
+    with open(fpth, "a") as f:
+        for kper, records in periods:
+            if kper + 1 <= last:
+                raise ValueError(
+                    "stress period {} is not after the last PERIOD block "
+                    "({}) in {}".format(kper + 1, last, fpth)
+                )
+            last = kper + 1
+            fname = "{}.per{:05d}{}".format(os.path.basename(fpth), last, ext)
+            _write_records(os.path.join(ws, fname), records, index_fields)
+            f.write(
+                "\nBEGIN period  {}\n  OPEN/CLOSE  {}\nEND period  {}\n".format(
+                    last, fname, last
+                )
+            )
+            fnames.append(fname)
+    return fnames
+
+
+def delta_periods(periods, previous=None, key="iuzno"):
+    """Reduce period data to the records that change between periods
+
+    Advanced packages such as UZF keep the settings of every feature that
+    is not listed in a PERIOD block, and keep all settings when a PERIOD
+    block is not specified. Each period is compared with the previous
+    period and only the records with a changed value are produced, and
+    periods without changes are skipped, so the size of the written input
+    follows the amount of change in the forcing.
+
+    Parameters
+    ----------
+    periods : iterable
+        iterable of (kper, records) pairs, see write_period_files. records
+        may be reused by the iterable between periods
+    previous : numpy.ndarray
+        records of the period before the first period in periods, for
+        example the steady-state period data written by flopy (default is
+        None, in which case the first period is produced in full)
+    key : str
+        field that identifies each record (default is "iuzno")
+
+    Returns
+    -------
+    delta : generator
+        generator of (kper, records) pairs with the changed records
+
+    """
+    for kper, records in periods:
+        if (
+            previous is None
+            or previous.shape != records.shape
+            or np.any(previous[key] != records[key])
+        ):
+            changed = slice(None)
+        else:
+            changed = np.zeros(records.shape[0], dtype=bool)
+            for name in records.dtype.names:
+                changed |= previous[name] != records[name]
+            if not changed.any():
+                continue
+        # copy, in case the records are updated in place by periods
+        previous = records.copy()
+        yield kper, previous[changed]
+
+
+class PackageManifest:
+    def __init__(self, sim, fname="mfsim.manifest.json"):
+        """Create a PackageManifest object
+
+        A fingerprint of every package in a flopy simulation is computed
+        by hashing the data of the package and is compared with the
+        fingerprint stored in a manifest file in the simulation workspace
+        when the package was last written. The size and modification time
+        of the package file are stored with the fingerprint, so only
+        packages with a changed fingerprint, or a file that is missing or
+        was changed by something else, are written.
+
+        Parameters
+        ----------
+        sim : flopy.mf6.MFSimulation
+            flopy simulation
+        fname : str
+            name of the manifest file in the simulation workspace (default
+            is "mfsim.manifest.json")
+        """
+        self.sim = sim
+        self.ws = sim.simulation_data.mfpath.get_sim_path()
+        self.fpth = os.path.join(self.ws, fname)
+        try:
+            with open(self.fpth, "r") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.fingerprints = {}
+        self.written = set()
+
+    def packages(self):
+        """Return the packages of the simulation in write order"""
+        sim = self.sim
+        packages = [sim.name_file] + list(sim.sim_package_list)
+        for name in sim.model_names:
+            model = sim.get_model(name)
+            packages.append(model.name_file)
+            packages.extend(model.packagelist)
+        return packages
+
+    def changed(self, extra=None):
+        """Return the file names of the packages that need to be written
+
+        Parameters
+        ----------
+        extra : dict
+            dictionary of additional inputs, keyed by package file name,
+            that are hashed into the fingerprint of the package, for
+            example period data that are appended to the package file after
+            it is written. Values can be arrays, scalars, or iterables such
+            as generators that are hashed one item at a time (default is
+            None)
+
+        Returns
+        -------
+        fnames : list
+            file names of the packages with a changed fingerprint
+
+        """
+        if extra is None:
+            extra = {}
+        fnames = []
+        for package in self.packages():
+            fname = package.filename
+            digest = package_fingerprint(package, extra.get(fname))
+            self.fingerprints[fname] = digest
+            entry = self._entry(fname, digest)
+            if entry is None or self.manifest.get(fname) != entry:
+                fnames.append(fname)
+        return fnames
+
+    def write(self, fnames):
+        """Write packages and save their fingerprints in the manifest
+
+        Arrays are wrapped at sim.simulation_data.max_columns_of_data.
+        sim.write_simulation sets it to the number of columns of a
+        structured grid if it was not set, so set it when the simulation
+        is built for the packages to match the files of write_simulation.
+
+        Parameters
+        ----------
+        fnames : list
+            file names of the packages to write, see changed
+
+        """
+        fnames = set(fnames)
+        for package in self.packages():
+            if package.filename in fnames:
+                package.write()
+        self.written.update(fnames)
+        self.save()
+
+    def save(self):
+        """Save the fingerprints and file sizes and times in the manifest
+
+        write saves the manifest, call save again after data are appended
+        to a written package file, for example with write_period_files.
+        Packages that were not written keep their entry if their file did
+        not change.
+
+        """
+        manifest = {
+            fname: entry
+            for fname, entry in self.manifest.items()
+            if fname not in self.fingerprints
+        }
+        for fname, digest in self.fingerprints.items():
+            entry = self._entry(fname, digest)
+            if entry is not None and (
+                fname in self.written or self.manifest.get(fname) == entry
+            ):
+                manifest[fname] = entry
+        if manifest == self.manifest and os.path.isfile(self.fpth):
+            return
+        self.manifest = manifest
+        tmp_pth = "{}.{}.tmp".format(self.fpth, os.getpid())
+        with open(tmp_pth, "w") as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_pth, self.fpth)
+
+    # protected methods
+    def _entry(self, fname, digest):
+        """Return the manifest entry of a file, None if the file is missing"""
+        try:
+            st = os.stat(os.path.join(self.ws, fname))
+        except OSError:
+            return None
+        return {
+            "fingerprint": digest,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+        }
+
+def package_fingerprint(package, extra=None):
+    """Return a hash of the data of a flopy package
+
+    Parameters
+    ----------
+    package : flopy.mf6.MFPackage
+        flopy package
+    extra : object
+        additional input that is hashed with the package data, see
+        PackageManifest.changed (default is None)
+
+    Returns
+    -------
+    digest : str
+        blake2b hex digest
+
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(package.filename.encode())
+    for bname, block in package.blocks.items():
+        for name, dataset in block.datasets.items():
+            if not dataset.has_data():
+                continue
+            h.update("{}/{}".format(bname, name).encode())
+            _hash_data(h, dataset.get_data())
+    if extra is not None:
+        h.update(b"extra")
+        _hash_data(h, extra)
+    return h.hexdigest()
+
+
+# protected functions
+def _hash_data(h, data):
+    """Update a hash with flopy data, arrays, containers or iterables"""
+    if isinstance(data, np.ndarray):
+        h.update("{}{}".format(data.dtype.descr, data.shape).encode())
+        if data.dtype.hasobject:
+            h.update(repr(data.tolist()).encode())
+        else:
+            h.update(np.ascontiguousarray(data).data)
+    elif isinstance(data, dict):
+        for key in sorted(data, key=repr):
+            h.update(repr(key).encode())
+            _hash_data(h, data[key])
+    elif isinstance(data, (list, tuple)) or (
+        hasattr(data, "__iter__") and not isinstance(data, (str, bytes))
+    ):
+        h.update(b"[")
+        for item in data:
+            _hash_data(h, item)
+        h.update(b"]")
+    else:
+        h.update(repr(data).encode())
+
+
+def _last_period(fpth):
+    """Return the one-based number of the last PERIOD block in a file"""
+    last = 0
+    with open(fpth, "r") as f:
+        for line in f:
+            m = _begin_period.match(line)
+            if m is not None:
+                last = int(m.group(1))
+    return last
+
+
+def _write_records(fpth, records, index_fields):
+    """Write a structured array as whitespace-delimited text"""
+    fmt = "  ".join(
+        _field_formats[records.dtype[name].kind]
+        for name in records.dtype.names
+    )
+    if index_fields:
+        records = records.copy()
+        for name in index_fields:
+            records[name] += 1
+    # format the whole period with a single string operation
+    values = tuple(chain.from_iterable(records.tolist()))
+    with open(fpth, "w") as f:
+        f.write(("  " + fmt + "\n") * records.shape[0] % values)
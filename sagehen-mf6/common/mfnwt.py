@@ -0,0 +1,1052 @@
+import os
+import re
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+import arraycache
+
+# reach (item 2) columns in the order they appear in a REACHINPUT file
+sfr2_reach_dtype = np.dtype(
+    [
+        ("krch", int),
+        ("irch", int),
+        ("jrch", int),
+        ("iseg", int),
+        ("ireach", int),
+        ("rchlen", float),
+        ("strtop", float),
+        ("slope", float),
+        ("strthick", float),
+        ("strhc1", float),
+        ("thts", float),
+        ("thti", float),
+        ("eps", float),
+        ("uhc", float),
+    ]
+)
+
+# segment (item 6a) columns, the first four match the orig_seg tables used
+# by gen_mf6_sfr_connections
+sfr2_segment_dtype = np.dtype(
+    [
+        ("nseg", int),
+        ("icalc", int),
+        ("outseg", int),
+        ("iupseg", int),
+        ("iprior", int),
+        ("nstrpts", int),
+        ("flow", float),
+        ("runoff", float),
+        ("etsw", float),
+        ("pptsw", float),
+        ("roughch", float),
+        ("roughbk", float),
+        ("width1", float),
+        ("width2", float),
+    ]
+)
+
+# gage file columns, lake gages have a negative gageseg (the lake number)
+# and a gagerch of 0
+gage_dtype = np.dtype(
+    [
+        ("gageseg", int),
+        ("gagerch", int),
+        ("unit", int),
+        ("outtype", int),
+    ]
+)
+
+# number of item 2 values read for each ISFROPT
+_sfr2_reach_columns = {0: 6, 1: 10, 2: 13, 3: 14, 4: 6, 5: 6}
+
+
+def read_sfr2(fpth):
+    """Read the reach and segment data from a MODFLOW-NWT SFR2 file
+
+    The file is read in a single pass, line by line, and each record is
+    stored directly in a preallocated numpy structured array so that large
+    files are never held in memory as text. Segment data are read for the
+    first stress period only.
+
+    Parameters
+    ----------
+    fpth : str
+        path to the SFR2 file
+
+    Returns
+    -------
+    reaches : numpy.recarray
+        reach data (item 2) with one-based krch, irch, jrch, iseg and
+        ireach. Columns that are not defined for the ISFROPT of the file
+        are set to nan.
+    segments : numpy.recarray
+        segment data (items 6a, 6b and 6c) for the first stress period.
+        Columns that are not defined for the ICALC of a segment are set
+        to 0 (integers) or nan (floats).
+
+    """
+    with open(fpth, "r") as f:
+        records = _data_records(f)
+
+        # item 1a options and item 1c dimensions
+        tokens = next(records)
+        reachinput = False
+        while not _is_number(tokens[0]):
+            keyword = tokens[0].upper()
+            if keyword == "REACHINPUT":
+                reachinput = True
+            elif keyword == "OPTIONS":
+                for tokens in records:
+                    if tokens[0].upper() == "END":
+                        break
+                    if tokens[0].upper() == "REACHINPUT":
+                        reachinput = True
+            tokens = next(records)
+        nstrm = int(tokens[0])
+        nss = int(tokens[1])
+        if int(tokens[2]) > 0:
+            raise NotImplementedError("SFR2 parameters are not supported")
+        isfropt = 0
+        if nstrm < 0 or reachinput:
+            isfropt = int(tokens[8])
+        nstrm = abs(nstrm)
+
+        # item 2 - reach data
+        ncols = _sfr2_reach_columns[isfropt]
+        reaches = np.empty(nstrm, dtype=sfr2_reach_dtype)
+        for idx in range(nstrm):
+            tokens = next(records)
+            reaches[idx] = tuple(_int_or_float(tokens[:ncols])) + (
+                np.nan,
+            ) * (len(sfr2_reach_dtype) - ncols)
+
+        # item 5 - stress period 1 dimensions
+        tokens = next(records)
+        itmp = int(tokens[0])
+        if itmp < 0:
+            raise ValueError("ITMP for the first stress period must be >= 0")
+
+        # item 6 - segment data
+        segments = np.zeros(itmp, dtype=sfr2_segment_dtype)
+        for name in sfr2_segment_dtype.names[6:]:
+            segments[name] = np.nan
+        for idx in range(itmp):
+            _read_sfr2_segment(records, isfropt, segments[idx : idx + 1])
+
+    if itmp != nss:
+        raise ValueError(
+            "{} segments read for the first stress period, "
+            "expected NSS={}".format(itmp, nss)
+        )
+    return reaches.view(np.recarray), segments.view(np.recarray)
+
+
+def read_gag(fpth):
+    """Read the gages from a MODFLOW-NWT GAGE file
+
+    Parameters
+    ----------
+    fpth : str
+        path to the GAGE file
+
+    Returns
+    -------
+    gages : numpy.recarray
+        one-based gageseg and gagerch, unit and outtype of every gage. Lake
+        gages have a negative gageseg and a gagerch of 0
+
+    """
+    with open(fpth, "r") as f:
+        records = _data_records(f)
+        numgage = int(next(records)[0])
+        gages = np.zeros(numgage, dtype=gage_dtype)
+        for idx in range(numgage):
+            # trailing comments are not numbers
+            values = [int(t) for t in next(records)[:4] if _is_number(t)]
+            if values[0] < 0:
+                # lake gage, LAKE UNIT [OUTTYPE]
+                values.insert(1, 0)
+            # OUTTYPE is optional and defaults to 0
+            values = (values + [0, 0])[:4]
+            gages[idx] = tuple(values)
+    return gages.view(np.recarray)
+
+
+def read_dis(fpth, ws=None, cache=False):
+    """Read a MODFLOW-NWT discretization (DIS) file
+
+    Parameters
+    ----------
+    fpth : str
+        path to the DIS file
+    ws : str
+        directory that OPEN/CLOSE file names are relative to (default is
+        the directory containing fpth)
+    cache : bool
+        boolean indicating if OPEN/CLOSE arrays are cached as memory-mapped
+        .npy files (default is False)
+
+    Returns
+    -------
+    dis : dict
+        dimensions (nlay, nrow, ncol, nper, itmuni, lenuni), laycbd, delr,
+        delc, top, botm with shape (nlay + number of confining beds, nrow,
+        ncol), and the stress period perlen, nstp, tsmult and steady lists
+
+    """
+    f = ArrayFileReader(fpth, ws=ws, cache=cache)
+    nlay, nrow, ncol, nper, itmuni, lenuni = [
+        int(v) for v in f.read_values(6)
+    ]
+    laycbd = [int(v) for v in f.read_values(nlay)]
+    delr = f.read_array((ncol,))
+    delc = f.read_array((nrow,))
+    top = f.read_array((nrow, ncol))
+    nbotm = nlay + sum(1 for v in laycbd if v != 0)
+    botm = np.empty((nbotm, nrow, ncol))
+    for k in range(nbotm):
+        botm[k] = f.read_array((nrow, ncol))
+    perlen, nstp, tsmult, steady = [], [], [], []
+    for kper in range(nper):
+        tokens = f.readline().split()
+        perlen.append(float(tokens[0]))
+        nstp.append(int(tokens[1]))
+        tsmult.append(float(tokens[2]))
+        steady.append(tokens[3].upper() == "SS")
+    return {
+        "nlay": nlay,
+        "nrow": nrow,
+        "ncol": ncol,
+        "nper": nper,
+        "itmuni": itmuni,
+        "lenuni": lenuni,
+        "laycbd": laycbd,
+        "delr": delr,
+        "delc": delc,
+        "top": top,
+        "botm": botm,
+        "perlen": perlen,
+        "nstp": nstp,
+        "tsmult": tsmult,
+        "steady": steady,
+    }
+
+
+def read_bas(fpth, nlay, nrow, ncol, ws=None, cache=False):
+    """Read a MODFLOW-NWT basic (BAS6) file
+
+    Parameters
+    ----------
+    fpth : str
+        path to the BAS6 file
+    nlay, nrow, ncol : int
+        model dimensions
+    ws : str
+        directory that OPEN/CLOSE file names are relative to (default is
+        the directory containing fpth)
+    cache : bool
+        boolean indicating if OPEN/CLOSE arrays are cached as memory-mapped
+        .npy files (default is False)
+
+    Returns
+    -------
+    bas : dict
+        options, ibound and strt with shape (nlay, nrow, ncol) and hnoflo
+
+    """
+    f = ArrayFileReader(fpth, ws=ws, cache=cache)
+    options = f.readline().upper().split()
+    ibound = np.empty((nlay, nrow, ncol), dtype=int)
+    for k in range(nlay):
+        ibound[k] = f.read_array((nrow, ncol), dtype=int)
+    hnoflo = float(f.read_values(1)[0])
+    strt = np.empty((nlay, nrow, ncol))
+    for k in range(nlay):
+        strt[k] = f.read_array((nrow, ncol))
+    return {"options": options, "ibound": ibound, "hnoflo": hnoflo, "strt": strt}
+
+
+def read_upw(
+    fpth, nlay, nrow, ncol, transient=True, laycbd=None, ws=None, cache=False
+):
+    """Read a MODFLOW-NWT upstream weighting (UPW) file
+
+    Parameters
+    ----------
+    fpth : str
+        path to the UPW file
+    nlay, nrow, ncol : int
+        model dimensions
+    transient : bool
+        boolean indicating if the model has a transient stress period, in
+        which case storage arrays are read (default is True)
+    laycbd : list
+        confining bed flag for each layer (default is None)
+    ws : str
+        directory that OPEN/CLOSE file names are relative to (default is
+        the directory containing fpth)
+    cache : bool
+        boolean indicating if OPEN/CLOSE arrays are cached as memory-mapped
+        .npy files (default is False)
+
+    Returns
+    -------
+    upw : dict
+        laytyp, layavg, chani, layvka, laywet, and hk, hani, vka, ss, sy and
+        vkcb arrays with shape (nlay, nrow, ncol). Arrays that are not
+        defined for a layer are zero.
+
+    """
+    if laycbd is None:
+        laycbd = [0] * nlay
+    f = ArrayFileReader(fpth, ws=ws, cache=cache)
+    tokens = f.read_values(4)
+    if int(tokens[2]) > 0:
+        raise NotImplementedError("UPW parameters are not supported")
+    upw = {
+        "iupwcb": int(tokens[0]),
+        "hdry": float(tokens[1]),
+        "iphdry": int(tokens[3]),
+    }
+    for name in ("laytyp", "layavg"):
+        upw[name] = [int(v) for v in f.read_values(nlay)]
+    upw["chani"] = [float(v) for v in f.read_values(nlay)]
+    for name in ("layvka", "laywet"):
+        upw[name] = [int(v) for v in f.read_values(nlay)]
+    for name in ("hk", "hani", "vka", "ss", "sy", "vkcb"):
+        upw[name] = np.zeros((nlay, nrow, ncol))
+    for k in range(nlay):
+        upw["hk"][k] = f.read_array((nrow, ncol))
+        if upw["chani"][k] <= 0.0:
+            upw["hani"][k] = f.read_array((nrow, ncol))
+        upw["vka"][k] = f.read_array((nrow, ncol))
+        if transient:
+            upw["ss"][k] = f.read_array((nrow, ncol))
+            if upw["laytyp"][k] != 0:
+                upw["sy"][k] = f.read_array((nrow, ncol))
+        if laycbd[k] != 0:
+            upw["vkcb"][k] = f.read_array((nrow, ncol))
+    return upw
+
+
+def read_uzf(fpth, nrow, ncol, nper=1, steady=None, ws=None, cache=False):
+    """Read a MODFLOW-NWT unsaturated-zone flow (UZF1) file
+
+    Parameters
+    ----------
+    fpth : str
+        path to the UZF1 file
+    nrow, ncol : int
+        model dimensions
+    nper : int
+        number of stress periods (default is 1)
+    steady : list
+        steady-state flag for each stress period (default is None, which
+        is a steady-state first stress period)
+    ws : str
+        directory that OPEN/CLOSE file names are relative to (default is
+        the directory containing fpth)
+    cache : bool
+        boolean indicating if OPEN/CLOSE arrays are cached as memory-mapped
+        .npy files (default is False)
+
+    Returns
+    -------
+    uzf : dict
+        options, the item 1 variables, iuzfbnd, irunbnd, vks, eps, thts,
+        thtr and thti arrays with shape (nrow, ncol) (None if not
+        specified), the gage records and a list of finf, pet, extdp and
+        extwc arrays for each stress period (None if the values of the
+        previous stress period are reused)
+
+    """
+    f = ArrayFileReader(fpth, ws=ws, cache=cache)
+    options = []
+    tokens = f.readline().split()
+    while not _is_number(tokens[0]):
+        keyword = tokens[0].upper()
+        if keyword == "OPTIONS":
+            tokens = f.readline().split()
+            while tokens[0].upper() != "END":
+                options.append(tokens[0].upper())
+                tokens = f.readline().split()
+        else:
+            options.extend(token.upper() for token in tokens)
+        tokens = f.readline().split()
+    uzf = {"options": options}
+    for name in ("nuztop", "iuzfopt", "irunflg", "ietflg", "iuzfcb1", "iuzfcb2"):
+        uzf[name] = int(tokens.pop(0))
+    if uzf["iuzfopt"] > 0:
+        uzf["ntrail2"] = int(tokens.pop(0))
+        uzf["nsets2"] = int(tokens.pop(0))
+    uzf["nuzgag"] = int(tokens.pop(0))
+    uzf["surfdep"] = float(tokens.pop(0))
+
+    shape = (nrow, ncol)
+    uzf["iuzfbnd"] = f.read_array(shape, dtype=int)
+    uzf["irunbnd"] = None
+    if uzf["irunflg"] > 0:
+        uzf["irunbnd"] = f.read_array(shape, dtype=int)
+    for name in ("vks", "eps", "thts", "thtr", "thti"):
+        uzf[name] = None
+    if abs(uzf["iuzfopt"]) == 1:
+        uzf["vks"] = f.read_array(shape)
+    if uzf["iuzfopt"] > 0:
+        uzf["eps"] = f.read_array(shape)
+        uzf["thts"] = f.read_array(shape)
+        if "SPECIFYTHTR" in options:
+            uzf["thtr"] = f.read_array(shape)
+        if "SPECIFYTHTI" in options or (steady is not None and not steady[0]):
+            uzf["thti"] = f.read_array(shape)
+    # IUZROW IUZCOL IFTUNIT IUZOPT, or only IFTUNIT if it is negative
+    uzf["gages"] = []
+    for _ in range(uzf["nuzgag"]):
+        tokens = f.readline().split()
+        n = 1 if int(tokens[0]) < 0 else 4
+        uzf["gages"].append([int(v) for v in tokens[:n]])
+
+    for name in ("finf", "pet", "extdp", "extwc"):
+        uzf[name] = []
+    for kper in range(nper):
+        names = ["finf"]
+        if uzf["ietflg"] > 0:
+            names += ["pet", "extdp"]
+            if uzf["iuzfopt"] > 0:
+                names.append("extwc")
+        for name in names:
+            nuzf = int(f.read_values(1)[0])
+            uzf[name].append(f.read_array(shape) if nuzf >= 0 else None)
+        for name in ("pet", "extdp", "extwc"):
+            if name not in names:
+                uzf[name].append(None)
+    return uzf
+
+
+class ArrayFileReader:
+    def __init__(self, fpth, ws=None, units=None, cache=False):
+        """Create an ArrayFileReader object
+
+        The file is read into memory once and the line boundaries are
+        located with vectorized numpy operations, so array blocks are
+        parsed without tokenizing the file line by line in python.
+
+        Parameters
+        ----------
+        fpth : str
+            path to a MODFLOW input file
+        ws : str
+            directory that OPEN/CLOSE file names are relative to (default
+            is the directory containing fpth)
+        units : dict
+            dictionary mapping unit numbers to file paths for EXTERNAL
+            array control records (default is None)
+        cache : bool
+            boolean indicating if arrays read from OPEN/CLOSE and EXTERNAL
+            files are cached as memory-mapped .npy files with
+            arraycache.load_array (default is False)
+        """
+        with open(fpth, "rb") as f:
+            self.buf = f.read()
+        if ws is None:
+            ws = os.path.dirname(fpth)
+        self.ws = ws
+        self.units = units if units is not None else {}
+        self.cache = cache
+
+        b = np.frombuffer(self.buf, dtype=np.uint8)
+        newlines = np.flatnonzero(b == 10)
+        self.line_start = np.concatenate(([0], newlines + 1))
+        self.line_end = np.concatenate((newlines, [b.size]))
+        self._value_start = None
+        self._nvalues = None
+        self.nlines = self.line_start.size
+        self.iline = 0
+
+    def readline(self):
+        """Return the next line that is not a comment
+
+        Returns
+        -------
+        line : str
+            text of the line without the line terminator
+
+        """
+        while self.iline < self.nlines:
+            line = self._line(self.iline).decode()
+            self.iline += 1
+            if not line.startswith("#"):
+                return line.rstrip("\r")
+        raise EOFError("end of file reached")
+
+    def read_values(self, n):
+        """Read n free-format values that may span several lines
+
+        Parameters
+        ----------
+        n : int
+            number of values
+
+        Returns
+        -------
+        values : list
+            list of string values
+
+        """
+        values = []
+        while len(values) < n:
+            values.extend(self.readline().replace(",", " ").split())
+        return values[:n]
+
+    def read_array(self, shape, dtype=float):
+        """Read an array control record and the array that it defines
+
+        Free-format (CONSTANT, INTERNAL, EXTERNAL and OPEN/CLOSE) and
+        fixed-format control records are supported. Formatted arrays can
+        use (FREE) or a fortran I, F, E, G or D edit descriptor.
+
+        Parameters
+        ----------
+        shape : tuple
+            (nrow, ncol) for a two-dimensional array or (ncol,) for a
+            one-dimensional array
+        dtype : numpy dtype
+            dtype of the returned array (default is float)
+
+        Returns
+        -------
+        arr : numpy.ndarray
+            array with the control record multiplier applied
+
+        """
+        if len(shape) == 1:
+            nrow, ncol = 1, shape[0]
+        else:
+            nrow, ncol = shape
+        line = self.readline()
+        tokens = line.replace(",", " ").split()
+        keyword = tokens[0].upper()
+        fname = None
+        if keyword == "CONSTANT":
+            return np.full(shape, _to_number(tokens[1]), dtype=dtype)
+        elif keyword == "INTERNAL":
+            cnstnt, fmtin = tokens[1], tokens[2]
+        elif keyword in ("EXTERNAL", "OPEN/CLOSE"):
+            if keyword == "EXTERNAL":
+                fname = self.units[int(tokens[1])]
+            else:
+                fname = os.path.join(self.ws, tokens[1])
+            cnstnt, fmtin = tokens[2], tokens[3]
+        else:
+            # fixed-format control record: LOCAT CNSTNT FMTIN IPRN
+            locat = int(line[0:10])
+            cnstnt = line[10:20]
+            fmtin = line[20:40].strip()
+            if locat == 0:
+                return np.full(shape, _to_number(cnstnt), dtype=dtype)
+            elif locat < 0:
+                raise NotImplementedError("binary arrays are not supported")
+            fname = self.units.get(locat)
+        if fmtin.upper().startswith("(BINARY"):
+            raise NotImplementedError("binary arrays are not supported")
+
+        if fname is None:
+            arr = self._read_formatted(nrow, ncol, fmtin)
+        elif self.cache:
+            arr = arraycache.load_array(
+                fname,
+                loader=lambda fpth: ArrayFileReader(fpth)._read_formatted(
+                    nrow, ncol, fmtin
+                ),
+                key="{}x{} {}".format(nrow, ncol, fmtin.upper()),
+            )
+        else:
+            arr = ArrayFileReader(fname)._read_formatted(nrow, ncol, fmtin)
+        cnstnt = _to_number(cnstnt)
+        if cnstnt not in (0.0, 1.0):
+            arr = arr * cnstnt
+        return arr.reshape(shape).astype(dtype, copy=False)
+
+    # protected methods
+    def _line(self, iline):
+        return self.buf[self.line_start[iline] : self.line_end[iline]]
+
+    def _read_formatted(self, nrow, ncol, fmtin):
+        """Read nrow rows of ncol values in the fmtin format"""
+        if fmtin.upper().startswith("(FREE"):
+            return self._read_free(nrow, ncol)
+        return self._read_fixed(nrow, ncol, fmtin)
+
+    @property
+    def value_start(self):
+        """Offset of the first byte of every value in the file"""
+        if self._value_start is None:
+            b = np.frombuffer(self.buf, dtype=np.uint8)
+            # a value starts at every non-separator byte that follows a
+            # separator (whitespace or comma)
+            isval = np.zeros(b.size + 1, dtype=bool)
+            np.greater(b, 32, out=isval[1:])
+            if b"," in self.buf:
+                isval[1:] &= b != 44
+            self._value_start = np.flatnonzero(isval[1:] > isval[:-1])
+        return self._value_start
+
+    @property
+    def nvalues(self):
+        """Number of values on every line of the file"""
+        if self._nvalues is None:
+            self._nvalues = np.searchsorted(
+                self.value_start, self.line_end
+            ) - np.searchsorted(self.value_start, self.line_start)
+        return self._nvalues
+
+    def _read_free(self, nrow, ncol):
+        """Read nrow rows of ncol free-format values
+
+        Each row starts on a new line and values after the last value of
+        a row on the same line are ignored, which is how MODFLOW reads
+        free-format arrays. The values are parsed with _parse_free, or
+        with np.fromstring if a value is not supported by _parse_free.
+        """
+        first = self.iline
+        nvalues = self.nvalues
+
+        # lines of the first row
+        iline = first
+        n = 0
+        while n < ncol:
+            if iline >= self.nlines:
+                # repeat counts may hold more values than tokens
+                return self._read_free_repeats(nrow, ncol)
+            n += nvalues[iline]
+            iline += 1
+        nline = iline - first
+        last = first + nrow * nline
+        uniform = last <= self.nlines and np.array_equal(
+            nvalues[first:last].reshape(nrow, nline),
+            np.broadcast_to(nvalues[first:iline], (nrow, nline)),
+        )
+        if not uniform:
+            # rows wrapped over a varying number of lines
+            row_line = np.empty(nrow, dtype=int)
+            iline = first
+            for i in range(nrow):
+                row_line[i] = iline
+                n = 0
+                while n < ncol:
+                    if iline >= self.nlines:
+                        return self._read_free_repeats(nrow, ncol)
+                    n += nvalues[iline]
+                    iline += 1
+            last = iline
+
+        text = self.buf[self.line_start[first] : self.line_end[last - 1]]
+        if b"*" in text:
+            # n*value repeat counts - the number of values on a line is not
+            # the number of tokens, so assemble the rows line by line
+            return self._read_free_repeats(nrow, ncol)
+        offsets = np.zeros(last - first + 1, dtype=np.int64)
+        np.cumsum(nvalues[first:last], out=offsets[1:])
+        i0 = np.searchsorted(self.value_start, self.line_start[first])
+        starts = self.value_start[i0 : i0 + offsets[-1]]
+        values = _parse_free(text, starts - self.line_start[first])
+        if values is None:
+            values = np.fromstring(
+                text.translate(_free_table), dtype=float, sep=" "
+            )
+        if values.size != offsets[-1]:
+            raise ValueError(
+                "could not parse the array starting on line {}".format(
+                    first + 1
+                )
+            )
+        self.iline = last
+        if uniform:
+            return values.reshape(nrow, offsets[-1] // nrow)[:, :ncol]
+        index = offsets[row_line - first][:, None] + np.arange(ncol)
+        return values[index]
+
+    def _read_free_repeats(self, nrow, ncol):
+        """Read free-format rows that include n*value repeat counts"""
+        arr = np.empty((nrow, ncol))
+        for i in range(nrow):
+            row = []
+            n = 0
+            while n < ncol:
+                if self.iline >= self.nlines:
+                    raise EOFError("end of file reached reading array")
+                text = self._line(self.iline).translate(_free_table)
+                self.iline += 1
+                values = _expand_repeats(text)
+                row.append(values)
+                n += values.size
+            arr[i] = np.concatenate(row)[:ncol]
+        return arr
+
+    def _read_fixed(self, nrow, ncol, fmtin):
+        """Read nrow rows of ncol values with a fortran edit descriptor"""
+        match = _fixed_format.match(fmtin)
+        if match is None:
+            raise NotImplementedError(
+                "unsupported array format {}".format(fmtin)
+            )
+        nper = int(match.group(1) or 1)
+        width = int(match.group(3))
+        lines_per_row = -(-ncol // nper)
+        nlines = nrow * lines_per_row
+        first = self.iline
+        if first + nlines > self.nlines:
+            raise EOFError("end of file reached reading array")
+        self.iline = first + nlines
+
+        linewidth = nper * width
+        text = b"".join(
+            self._line(iline).rstrip(b"\r").ljust(linewidth)[:linewidth]
+            for iline in range(first, first + nlines)
+        )
+        fields = np.frombuffer(
+            text.translate(_fixed_table), dtype="S{}".format(width)
+        )
+        fields = fields.reshape(nrow, lines_per_row * nper)[:, :ncol]
+        # blank fields are zero in fortran formatted input
+        fields = np.where(np.char.strip(fields) == b"", b"0", fields)
+        return fields.astype(float)
+
+
+# protected functions
+def _read_sfr2_segment(records, isfropt, seg):
+    """Read items 6a-6f for a single SFR2 segment into seg"""
+    tokens = next(records)
+    icalc = int(tokens[1])
+    iupseg = int(tokens[3])
+    seg["nseg"] = int(tokens[0])
+    seg["icalc"] = icalc
+    seg["outseg"] = int(tokens[2])
+    seg["iupseg"] = iupseg
+    pos = 4
+    if iupseg > 0:
+        seg["iprior"] = int(tokens[pos])
+        pos += 1
+    if icalc == 4:
+        seg["nstrpts"] = int(tokens[pos])
+        pos += 1
+    for name in ("flow", "runoff", "etsw", "pptsw"):
+        seg[name] = float(tokens[pos])
+        pos += 1
+    if icalc in (1, 2):
+        seg["roughch"] = float(tokens[pos])
+        pos += 1
+    if icalc == 2:
+        seg["roughbk"] = float(tokens[pos])
+
+    # items 6b and 6c - upstream and downstream properties. The channel
+    # width (and depth) is only defined for ICALC <= 1. With ISFROPT 1-3
+    # the reach properties come from item 2 and the items are only read
+    # for ICALC <= 1.
+    if isfropt in (0, 4, 5):
+        for name in ("width1", "width2"):
+            tokens = next(records)
+            if icalc <= 1:
+                seg[name] = float(tokens[3])
+    elif icalc <= 1:
+        for name in ("width1", "width2"):
+            seg[name] = float(next(records)[0])
+
+    # items 6d-6f - eight-point cross section or rating tables
+    nskip = {2: 2, 4: 3}.get(icalc, 0)
+    for _ in range(nskip):
+        next(records)
+
+
+def _to_number(token):
+    """Convert a fortran-style numeric string to a float"""
+    return float(token.strip().upper().replace("D", "E"))
+
+
+def _expand_repeats(text):
+    """Parse free-format values that include n*value repeat counts"""
+    values = []
+    for token in text.split():
+        if b"*" in token:
+            n, value = token.split(b"*")
+            values.append(np.full(int(n), float(value)))
+        else:
+            values.append(np.array([float(token)]))
+    return np.concatenate(values)
+
+
+def _parse_free(text, starts):
+    """Parse the free-format numbers that start at the offsets starts
+
+    The mantissa of every token is loaded as an unsigned 64-bit word and
+    its digits are combined eight at a time with vectorized bit
+    operations, so no python runs per token or per line. Tokens are
+    parsed in chunks to keep the temporary arrays in the processor cache.
+    Mantissas of up to eight digits are exact doubles that are scaled by
+    a single exact power of ten, so the result is identical to float().
+
+    Parameters
+    ----------
+    text : bytes
+        text that holds the tokens
+    starts : numpy.ndarray
+        offset of the first byte of every token in text
+
+    Returns
+    -------
+    values : numpy.ndarray
+        float values of the tokens, or None if a token is not a number,
+        has a mantissa that does not fit in eight bytes or numpy is older
+        than 2.0
+
+    """
+    if not _has_bitwise_count:
+        return None
+    n = starts.size
+    values = np.empty(n)
+    if not text.isascii():
+        return None
+    if b"," in text:
+        text = text.replace(b",", b" ")
+    signs = b"-" in text or b"+" in text
+    exponents = any(c in text for c in b"eEdD")
+    # zero-padded copy of the text with a 64-bit word starting at every byte
+    pad = np.zeros(len(text) // 8 + 4, dtype=np.uint64)
+    chars = pad.view(np.uint8)
+    chars[: len(text)] = np.frombuffer(text, dtype=np.uint8)
+    words = as_strided(pad, shape=(len(text) + 16,), strides=(1,))
+
+    size = min(n, _parse_chunk)
+    flags = np.empty(size, dtype=np.uint64)
+    first = np.empty(size, dtype=np.uint64)
+    tmp = np.empty(size, dtype=np.uint64)
+    for i0 in range(0, n, size):
+        st = starts[i0 : i0 + size]
+        if st.size < size:
+            flags, first, tmp = flags[: st.size], first[: st.size], tmp[: st.size]
+        neg = None
+        if signs:
+            # skip a leading sign
+            lead = chars[st]
+            neg = lead == 45
+            st = st + (neg | (lead == 43))
+        x = words[st]
+
+        # the first non-digit is the decimal point or ends the mantissa
+        _nondigit_bytes(x, out=flags, tmp=tmp)
+        _lowest_byte(flags, out=first, tmp=tmp)
+        point = _byte_index(first, tmp=tmp)
+        isdot = chars[st + point] == 46
+        np.multiply(first, isdot, out=tmp)
+        flags ^= tmp
+        _lowest_byte(flags, out=flags, tmp=tmp)
+        end = _byte_index(flags, tmp=tmp)
+        stop = chars[st + end]
+        if (end <= isdot).any():
+            return None
+
+        # digits below the decimal point move up one byte into its place
+        x &= _repeat(0x0F)
+        np.right_shift(flags, np.uint64(7), out=tmp)
+        tmp -= np.uint64(1)
+        x &= tmp
+        np.right_shift(first, np.uint64(7), out=tmp)
+        tmp -= np.uint64(1)
+        tmp &= x
+        first <<= np.uint64(1)
+        first -= np.uint64(1)
+        np.invert(first, out=first)
+        x &= first
+        tmp <<= isdot.astype(np.uint64) << np.uint64(3)
+        x |= tmp
+        _parse_digits(x, tmp=tmp)
+        power = point.astype(np.int64)
+        power += isdot
+        power -= 8
+        # mantissas that continue past the word
+        long = (end == 8) & ((stop - 48 < 10) | (stop == 46))
+        if long.any():
+            ilong = np.flatnonzero(long)
+            if not isdot[ilong].all():
+                return None
+            parsed = _parse_fractions(chars, words, st[ilong], point[ilong])
+            if parsed is None:
+                return None
+            x[ilong], power[ilong], end[ilong] = parsed
+            stop[ilong] = chars[st[ilong] + end[ilong]]
+
+        if exponents:
+            low = stop | 32
+            ismark = (low == 101) | (low == 100)
+            if not ((stop <= 32) | ismark).all():
+                return None
+            if ismark.any():
+                imark = np.flatnonzero(ismark)
+                expo = _parse_exponents(chars, words, st[imark] + end[imark] + 1)
+                if expo is None:
+                    return None
+                power[imark] += expo
+        elif (stop > 32).any():
+            return None
+
+        v = values[i0 : i0 + st.size]
+        np.copyto(v, x.view(np.int64), casting="unsafe")
+        if exponents:
+            v *= _powers_of_ten[np.clip(power, 0, 22)]
+            v /= _powers_of_ten[np.clip(-power, 0, 22)]
+        else:
+            v /= _powers_of_ten[-power]
+        if neg is not None:
+            v *= _signs[neg.view(np.int8)]
+        if exponents:
+            # exponents beyond the exact powers of ten
+            for i in np.flatnonzero(np.abs(power) > 22):
+                token = text[starts[i0 + i] : starts[i0 + i] + 32].split()[0]
+                v[i] = float(token.translate(_fixed_table))
+    return values
+
+
+def _parse_fractions(chars, words, starts, point):
+    """Parse mantissas longer than eight bytes as integer and fraction
+
+    Returns the mantissa, the decimal exponent and the offset of the byte
+    after the mantissa, or None if the mantissa is not an exact double.
+    """
+    x = words[starts]
+    tmp = np.empty_like(x)
+    shift = np.uint64(64) - (point.astype(np.uint64) << np.uint64(3))
+    x &= _repeat(0x0F)
+    x <<= shift
+    _parse_digits(x, tmp=tmp)
+    starts = starts + point + 1
+    y = words[starts]
+    flags = np.empty_like(y)
+    _nondigit_bytes(y, out=flags, tmp=tmp)
+    _lowest_byte(flags, out=flags, tmp=tmp)
+    nfrac = _byte_index(flags, tmp=tmp)
+    y &= _repeat(0x0F)
+    y <<= np.uint64(64) - (nfrac.astype(np.uint64) << np.uint64(3))
+    _parse_digits(y, tmp=tmp)
+    x *= _integer_powers_of_ten[nfrac]
+    x += y
+    if (x >= np.uint64(2**53)).any():
+        return None
+    return x, -nfrac.astype(np.int64), point + 1 + nfrac
+
+
+def _parse_exponents(chars, words, starts):
+    """Parse the exponents after the exponent letters, None if invalid"""
+    lead = chars[starts]
+    neg = lead == 45
+    starts = starts + (neg | (lead == 43))
+    x = words[starts]
+    flags = np.empty_like(x)
+    tmp = np.empty_like(x)
+    _nondigit_bytes(x, out=flags, tmp=tmp)
+    _lowest_byte(flags, out=flags, tmp=tmp)
+    end = _byte_index(flags, tmp=tmp)
+    if (end < 1).any() or (end > 7).any() or (chars[starts + end] > 32).any():
+        return None
+    x &= _repeat(0x0F)
+    np.right_shift(flags, np.uint64(7), out=tmp)
+    tmp -= np.uint64(1)
+    x &= tmp
+    # right-align the digits so the last one has a weight of one
+    x <<= (np.uint64(64) - (end.astype(np.uint64) << np.uint64(3)))
+    _parse_digits(x, tmp=tmp)
+    expo = x.view(np.int64)
+    expo[neg] *= -1
+    return expo
+
+
+def _repeat(byte):
+    """uint64 word with byte in each of its eight bytes"""
+    return np.uint64(byte * 0x0101010101010101)
+
+
+def _nondigit_bytes(x, out, tmp):
+    """Set the high bit of the bytes of x that are not digits"""
+    np.add(x, _repeat(0x46), out=out)
+    np.bitwise_or(x, _repeat(0x80), out=tmp)
+    tmp -= _repeat(0x30)
+    np.invert(tmp, out=tmp)
+    out |= tmp
+    out &= _repeat(0x80)
+    return out
+
+
+def _lowest_byte(flags, out, tmp):
+    """Keep only the lowest of the flags set by _nondigit_bytes"""
+    np.invert(flags, out=tmp)
+    tmp += np.uint64(1)
+    np.bitwise_and(flags, tmp, out=out)
+    return out
+
+
+def _byte_index(flag, tmp):
+    """Byte index of the single flag in each word, 8 if there is none"""
+    np.subtract(flag, np.uint64(1), out=tmp)
+    index = np.bitwise_count(tmp)
+    index >>= 3
+    return index
+
+
+def _parse_digits(x, tmp):
+    """Value of the eight digits in x, the lowest byte is the leading digit"""
+    for shift, mask in (
+        (8, 0x00FF00FF00FF00FF),
+        (16, 0x0000FFFF0000FFFF),
+        (32, 0x00000000FFFFFFFF),
+    ):
+        np.right_shift(x, np.uint64(shift), out=tmp)
+        x *= np.uint64(10 ** (shift // 8))
+        x += tmp
+        x &= np.uint64(mask)
+    return x
+
+
+# translation tables for the vectorized array parsers
+_free_table = bytes.maketrans(b",dD", b" EE")
+_fixed_table = bytes.maketrans(b"dD", b"EE")
+
+# np.bitwise_count, used by _parse_free, was added in numpy 2.0. Older
+# versions parse free-format arrays with np.fromstring
+_has_bitwise_count = hasattr(np, "bitwise_count")
+
+# tokens parsed at a time by _parse_free and the exact powers of ten
+_parse_chunk = 1 << 15
+_powers_of_ten = 10.0 ** np.arange(23)
+_integer_powers_of_ten = 10 ** np.arange(9, dtype=np.uint64)
+_signs = np.array([1.0, -1.0])
+
+# fortran edit descriptor such as (81I3), (20F12.4) or (1P10E12.4)
+_fixed_format = re.compile(
+    r"\(\s*(?:-?\d+P)?\s*,?\s*(\d*)\s*([IFEGD])\s*(\d+)", re.IGNORECASE
+)
+
+
+def _data_records(f):
+    """Yield the whitespace-separated tokens of each data line in f"""
+    for line in f:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        yield line.split()
+
+
+def _is_number(token):
+    try:
+        float(token)
+    except ValueError:
+        return False
+    return True
+
+
+def _int_or_float(tokens):
+    """Convert fortran-style numeric tokens to int or float"""
+    values = []
+    for token in tokens:
+        try:
+            values.append(int(token))
+        except ValueError:
+            values.append(float(token.replace("d", "e").replace("D", "E")))
+    return values
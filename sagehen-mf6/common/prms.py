@@ -0,0 +1,362 @@
+import re
+import numpy as np
+import arraycache
+
+# numpy dtypes for the PRMS parameter type codes
+prms_types = {1: np.int64, 2: np.float64, 3: np.float64, 4: str}
+
+# blank-delimited tokens without an n* repeat count
+_no_repeat = re.compile(rb"(?<!\S)(?=[^\s*]+(?!\S))")
+
+
+class ParameterFile:
+    def __init__(self, fpth, dimensions=None):
+        """Create a ParameterFile object for a PRMS parameter file
+
+        The file is scanned once to build an index of the byte offsets of
+        the values of each parameter. Values are only decoded into a numpy
+        array the first time a parameter is accessed, so only the
+        parameters that are used are parsed.
+
+        Parameters
+        ----------
+        fpth : str
+            path to a PRMS .params file
+        dimensions : dict
+            dictionary of dimension sizes used to shape parameters that
+            are dimensioned by dimensions that are not declared in fpth,
+            for example the nhrucell dimension used in gvr.params (default
+            is None)
+        """
+        self.fpth = fpth
+        with open(fpth, "rb") as f:
+            self.buf = f.read()
+        self.dimensions = {}
+        if dimensions is not None:
+            self.dimensions.update(dimensions)
+        self._index = {}
+        self._values = {}
+        self._build_index()
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __getitem__(self, name):
+        values = self._values.get(name)
+        if values is None:
+            values = self._decode(name)
+            self._values[name] = values
+        return values
+
+    def keys(self):
+        """Return the names of the parameters in the file"""
+        return self._index.keys()
+
+    def get(self, name, default=None):
+        """Return a parameter, or default if it is not in the file"""
+        if name in self._index:
+            return self[name]
+        return default
+
+    def info(self, name):
+        """Return the header of a parameter without decoding its values
+
+        Parameters
+        ----------
+        name : str
+            parameter name
+
+        Returns
+        -------
+        info : dict
+            dictionary with the dimension names (dims), number of values
+            (nvalues) and PRMS type code (type) of the parameter
+
+        """
+        dims, nvalues, itype, _, _ = self._index[name]
+        return {"dims": dims, "nvalues": nvalues, "type": itype}
+
+    # protected methods
+    def _build_index(self):
+        """Locate the dimension and parameter blocks in the file"""
+        buf = self.buf
+        delims = [m.end() for m in re.finditer(rb"^####[^\n]*\n?", buf, re.M)]
+        ends = [m.start() for m in re.finditer(rb"^####", buf, re.M)][1:]
+        ends.append(len(buf))
+        for start, end in zip(delims, ends):
+            # strip a trailing section marker such as ** Parameters **
+            marker = buf.find(b"\n**", start, end)
+            if marker >= 0:
+                end = marker + 1
+            pos = start
+            lines = []
+            # a dimension block is a name and a size, a parameter block
+            # has at least a name, ndims, a dimension, a count and a type
+            while len(lines) < 5:
+                eol = buf.find(b"\n", pos, end)
+                if eol < 0:
+                    eol = end
+                line = buf[pos:eol].strip()
+                pos = eol + 1
+                if line:
+                    lines.append(line.decode())
+                if pos >= end:
+                    break
+            if len(lines) == 2:
+                self.dimensions.setdefault(lines[0].split()[0], int(lines[1]))
+                continue
+            if len(lines) < 5:
+                raise ValueError(
+                    "incomplete parameter block in {} at byte {}".format(
+                        self.fpth, start
+                    )
+                )
+            name = lines[0].split()[0]
+            ndims = int(lines[1])
+            dims = tuple(lines[2 : 2 + ndims])
+            # the count and type follow the dimension names
+            while len(lines) < ndims + 4:
+                eol = buf.find(b"\n", pos, end)
+                if eol < 0:
+                    eol = end
+                line = buf[pos:eol].strip()
+                pos = eol + 1
+                if line:
+                    lines.append(line.decode())
+            nvalues = int(lines[2 + ndims])
+            itype = int(lines[3 + ndims])
+            self._index[name] = (dims, nvalues, itype, pos, end)
+
+    def _decode(self, name):
+        """Decode the values of a parameter into a numpy array"""
+        dims, nvalues, itype, start, end = self._index[name]
+        text = self.buf[start:end]
+        if itype == 4:
+            values = np.array(text.decode().split(), dtype=str)
+        else:
+            dtype = prms_types[itype]
+            if b"*" in text:
+                # prefix every token without a repeat count with 1* so the
+                # values can be read as (count, value) pairs
+                pairs = np.fromstring(
+                    _no_repeat.sub(b"1*", text).replace(b"*", b" "),
+                    dtype=np.float64,
+                    sep=" ",
+                ).reshape(-1, 2)
+                values = np.repeat(
+                    pairs[:, 1].astype(dtype), pairs[:, 0].astype(np.int64)
+                )
+            else:
+                values = np.fromstring(text, dtype=np.float64, sep=" ")
+                values = values.astype(dtype, copy=False)
+        if values.size != nvalues:
+            raise ValueError(
+                "parameter {} in {} has {} values, expected {}".format(
+                    name, self.fpth, values.size, nvalues
+                )
+            )
+        shape = tuple(self.dimensions.get(dim, -1) for dim in dims)
+        if len(dims) > 1 and -1 not in shape:
+            # values are stored with the first dimension varying fastest
+            values = values.reshape(shape, order="F")
+        return values
+
+
+class DataFile:
+    def __init__(self, fpth, cache_ws=None, chunksize=65536):
+        """Create a DataFile object for a PRMS climate data file
+
+        The header is parsed for the variable names and counts and the
+        body is converted once into a columnar float32 .npy file with
+        arraycache.load_array. The body is converted chunksize rows at a
+        time, and the converted data are opened as a memory map, so large
+        data files are never held in memory. Missing values are returned
+        as stored in the file (negative values in PRMS data files).
+
+        Parameters
+        ----------
+        fpth : str
+            path to a PRMS .data file
+        cache_ws : str
+            directory for the cache files (default is a .npycache directory
+            next to fpth)
+        chunksize : int
+            number of rows converted at a time (default is 65536)
+        """
+        self.fpth = fpth
+        self.chunksize = chunksize
+        self.variables, self._offset = self._read_header()
+        rows = {}
+        row = 6
+        for name, count in self.variables.items():
+            rows[name] = slice(row, row + count)
+            row += count
+        self._rows = rows
+        self.nvalues = row
+
+        # one row per column of the file, the first six rows are the date
+        self.data = arraycache.load_array(
+            fpth,
+            dtype=np.float32,
+            cache_ws=cache_ws,
+            key="prms data columns",
+            writer=self._write_columns,
+        )
+        year, month, day = self.data[0:3].astype(int)
+        self.dates = (
+            (year - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+            + (month - 1)
+        ).astype("datetime64[D]") + (day - 1)
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    @property
+    def ntimes(self):
+        """Number of time steps in the data file"""
+        return self.data.shape[1]
+
+    def get(self, name, start=None, end=None):
+        """Return the values of a variable for a range of dates
+
+        Parameters
+        ----------
+        name : str
+            variable name, for example tmax, tmin, precip or runoff
+        start : str or numpy.datetime64
+            first date (default is the first date in the file)
+        end : str or numpy.datetime64
+            last date, inclusive (default is the last date in the file)
+
+        Returns
+        -------
+        values : numpy.ndarray
+            (ntimes, count) float32 view of the memory-mapped data
+
+        """
+        i0, i1 = self.date_range(start, end)
+        return self.data[self._rows[name], i0:i1].T
+
+    def date_range(self, start=None, end=None):
+        """Return the index range of the dates from start to end
+
+        Parameters
+        ----------
+        start : str or numpy.datetime64
+            first date (default is the first date in the file)
+        end : str or numpy.datetime64
+            last date, inclusive (default is the last date in the file)
+
+        Returns
+        -------
+        i0, i1 : int
+            first and one past the last index of the date range
+
+        """
+        i0 = 0
+        i1 = self.dates.size
+        if start is not None:
+            i0 = np.searchsorted(self.dates, np.datetime64(start, "D"))
+        if end is not None:
+            i1 = np.searchsorted(
+                self.dates, np.datetime64(end, "D"), side="right"
+            )
+        return int(i0), int(i1)
+
+    # protected methods
+    def _read_header(self):
+        """Read the variable counts and the byte offset of the data"""
+        variables = {}
+        with open(self.fpth, "rb") as f:
+            f.readline()
+            for line in iter(f.readline, b""):
+                if line.startswith(b"####"):
+                    return variables, f.tell()
+                tokens = line.split()
+                if len(tokens) == 2 and not line.startswith(b"//"):
+                    variables[tokens[0].decode()] = int(tokens[1])
+        raise ValueError("no data in {}".format(self.fpth))
+
+    def _write_columns(self, fpth, npy_pth):
+        """Convert the body of the data file to a columnar .npy file"""
+        with open(fpth, "rb") as f:
+            f.seek(self._offset)
+            ntimes = 0
+            last = b"\n"
+            for block in iter(lambda: f.read(1 << 20), b""):
+                ntimes += block.count(b"\n")
+                last = block[-1:]
+            if last != b"\n":
+                ntimes += 1
+            out = np.lib.format.open_memmap(
+                npy_pth,
+                mode="w+",
+                dtype=np.float32,
+                shape=(self.nvalues, ntimes),
+            )
+            f.seek(self._offset)
+            i = 0
+            while i < ntimes:
+                chunk = np.loadtxt(
+                    f,
+                    dtype=np.float32,
+                    max_rows=self.chunksize,
+                    ndmin=2,
+                    usecols=range(self.nvalues),
+                )
+                if chunk.shape[0] == 0:
+                    break
+                out[:, i : i + chunk.shape[0]] = chunk.T
+                i += chunk.shape[0]
+            out.flush()
+            del out
+        if i != ntimes:
+            raise ValueError(
+                "{} has {} data rows, expected {}".format(fpth, i, ntimes)
+            )
+
+
+def read_data(fpth, cache_ws=None):
+    """Open a PRMS climate data file as a columnar memory map
+
+    Parameters
+    ----------
+    fpth : str
+        path to a PRMS .data file
+    cache_ws : str
+        directory for the cache files (default is a .npycache directory
+        next to fpth)
+
+    Returns
+    -------
+    data : DataFile
+        DataFile object with date-range access to each variable
+
+    """
+    return DataFile(fpth, cache_ws=cache_ws)
+
+
+def read_params(fpth, dimensions=None):
+    """Open a PRMS parameter file for lazy, indexed access
+
+    Parameters
+    ----------
+    fpth : str
+        path to a PRMS .params file
+    dimensions : dict
+        dictionary of dimension sizes for dimensions that are not declared
+        in fpth (default is None)
+
+    Returns
+    -------
+    params : ParameterFile
+        ParameterFile object that decodes each parameter on first access
+
+    """
+    return ParameterFile(fpth, dimensions=dimensions)
@@ -8,20 +8,35 @@
 
 import os
 import sys
+import time
+import fnmatch
+import hashlib
+import functools
+from functools import cached_property
 
 sys.path.append(os.path.join("..", "common"))
 
-# Imports
+# Imports. flopy, figspecs and the helper functions are only executed when
+# they are first used, matplotlib is imported by plot_results
 
-import flopy
 import numpy as np
 import config
-import matplotlib.pyplot as plt
-import flopy.utils.binaryfile as bf
-from figspecs import USGSFigure
+import arraycache
+import mfnwt
+import prms
+import gsflow
+import mf6bmi
+import mf6write
+import mf6run
+import mf6lst
+import mf6bin
+import ensemble
+
+flopy = config.lazy_import("flopy")
+figspecs = config.lazy_import("figspecs")
 
 sys.path.append(os.path.join("..", "data", "sagehen-gsf"))
-import build_sagehen_helper_funcs as sageBld
+sageBld = config.lazy_import("build_sagehen_helper_funcs")
 
 mf6exe = os.path.abspath(config.mf6_exe)
 assert os.path.isfile(mf6exe)
@@ -61,913 +76,76 @@ tsmult = [1.0, 1.0]
 
 # Further parent model grid discretization
 
-# from mf-nwt .dis file
+# Path to the arrays extracted from the mf-nwt input files. The arrays are
+# loaded on first use by the SagehenInputs object defined below.
 dat_pth = os.path.join("..","data","sagehen-gsf")
-top = np.loadtxt(os.path.join(dat_pth,"orig_dis_input","top1.txt"))
-bot1 = np.loadtxt(os.path.join(dat_pth,"orig_dis_input","bot1.txt"))
-bot2 = np.loadtxt(os.path.join(dat_pth,"orig_dis_input","bot2.txt"))
-botm = [bot1, bot2]
-# from mf-nwt .bas file
-idomain1 = np.loadtxt(os.path.join(dat_pth,"orig_bas_input","ibnd1.txt"))
-idomain2 = np.loadtxt(os.path.join(dat_pth,"orig_bas_input","ibnd2.txt"))
-strt1 = np.loadtxt(os.path.join(dat_pth,"orig_bas_input","strt1.txt"))
-strt2 = np.loadtxt(os.path.join(dat_pth,"orig_bas_input","strt2.txt"))
-# peel out locations of negative values for setting constant head data
-tmp1 = np.where(idomain1 < 0)
-listOfChdCoords1 = list(zip(np.zeros_like(tmp1[0]), tmp1[0], tmp1[1]))
-# get the corresponding constant head values
-if(len(listOfChdCoords1) > 0):
-    chd_lay1 = list(np.take(strt1 , np.ravel_multi_index(tmp1, strt1.shape)))
-# work on layer 2
-tmp2 = np.where(idomain2 < 0)
-listOfChdCoords2 = list(zip(np.ones_like(tmp2[0]), tmp2[0], tmp2[1]))
-if(len(listOfChdCoords2) > 0):
-    chd_lay2 = list(np.take(strt2 , np.ravel_multi_index(tmp2, strt2.shape)))
-# Get the constant head data into a flopy-compatible format
-listOfChdCoords = listOfChdCoords1 + listOfChdCoords2
-chd_vals = chd_lay1 + chd_lay2
-chdspd = []
-for i in np.arange(len(listOfChdCoords)):
-    chdspd.append([listOfChdCoords[i], chd_vals[i]])
-# finally, get rid of the negative values in idomain since mf6 treats negatives like zeros
-idomain = [np.abs(idomain1), np.abs(idomain2)]
-
-# from mf-nwt .upw file
-k11_lay1 = np.loadtxt(os.path.join(dat_pth,"orig_upw_input","hk1.txt"))
-k11_lay2 = np.loadtxt(os.path.join(dat_pth,"orig_upw_input","hk2.txt"))
-k11 = [k11_lay1, k11_lay2]
-sy_lay1 = np.loadtxt(os.path.join(dat_pth,"orig_upw_input","sy1.txt"))
-sy = [sy_lay1, sy_lay1]
-# sy_lay2 not in original problem (laytyp = 0 in layer 2)
-k33_lay1 = np.loadtxt(os.path.join(dat_pth,"orig_upw_input","vk1.txt"))
-k33_lay2 = np.loadtxt(os.path.join(dat_pth,"orig_upw_input","vk2.txt"))
-k33 = [k33_lay1, k33_lay2]
+
+# Path to the original mf-nwt input files
+orig_pth = os.path.join("..", "..", "sagehen-orig", "input", "modflow")
+
+# Path to the original prms input files and the date of the first day of
+# the transient stress period, used to drive the transient UZF infiltration
+prms_pth = os.path.join("..", "..", "sagehen-orig", "input", "prms")
+start_date = "1980-10-01"
 
 icelltype = [1, 0]  # Water table resides in layer 1
-iconvert = [np.ones_like(strt1), np.zeros_like(strt2)]
+k11_mult = 1.0  # Multiplier of the horizontal and vertical conductivities
+
+# Write the dis, ic, npf and sto griddata arrays to external binary files
+
+binary_griddata = True
+
+# Use the converged steady-state heads of an earlier run with the same
+# steady-state inputs as the starting heads, so the steady-state stress
+# period converges in a few iterations
+
+spinup_cache = True
+
+# Simulated days between checkpoints of the BMI run, a BMI run that is
+# interrupted resumes from the last checkpoint. None disables checkpoints
+
+checkpoint_interval = 365.0
 
 # Solver settings
 
 nouter, ninner = 300, 500
 hclose, rclose, relax = 1e-3, 1e-2, 0.97
 
+# Linear acceleration, preconditioner, under-relaxation and backtracking
+# settings of the IMS package (see ../benchmarks/bench-ims-settings.py)
+
+ims_options = {
+    "complexity": "complex",
+    "linear_acceleration": "BICGSTAB",
+    "preconditioner_levels": 8,
+    "preconditioner_drop_tolerance": 0.001,
+    "number_orthogonalizations": 2,
+    "under_relaxation": "dbd",
+    "under_relaxation_theta": 0.7,
+    "under_relaxation_kappa": 0.08,
+    "under_relaxation_gamma": 0.05,
+    "under_relaxation_momentum": 0.0,
+    "backtracking_number": 20,
+    "backtracking_tolerance": 2.0,
+    "backtracking_reduction_factor": 0.2,
+    "backtracking_residual_limit": 5.0e-4,
+}
+
 # #### Prepping input for SFR package 
 # Package_data information
 
-# Define the connections
-conns = sageBld.gen_mf6_sfr_connections()
-
-# These are zero based
-sfrcells = [
-    (0, 38, 14),
-    (0, 38, 15),
-    (0, 38, 16),
-    (0, 37, 16),
-    (0, 37, 17),
-    (0, 37, 18),
-    (0, 37, 19),
-    (0, 37, 20),
-    (0, 37, 21),
-    (0, 37, 22),
-    (0, 36, 23),
-    (0, 36, 24),
-    (0, 35, 24),
-    (0, 35, 25),
-    (0, 34, 25),
-    (0, 34, 26),
-    (0, 35, 27),
-    (0, 35, 28),
-    (0, 35, 29),
-    (0, 35, 30),
-    (0, 35, 31),
-    (0, 34, 31),
-    (0, 34, 32),
-    (0, 33, 32),
-    (0, 33, 33),
-    (0, 32, 33),
-    (0, 32, 34),
-    (0, 31, 34),
-    (0, 31, 35),
-    (0, 31, 36),
-    (0, 52, 36),
-    (0, 51, 36),
-    (0, 51, 37),
-    (0, 50, 37),
-    (0, 49, 37),
-    (0, 49, 38),
-    (0, 48, 38),
-    (0, 47, 38),
-    (0, 46, 38),
-    (0, 46, 39),
-    (0, 45, 39),
-    (0, 44, 39),
-    (0, 44, 38),
-    (0, 43, 38),
-    (0, 42, 37),
-    (0, 41, 37),
-    (0, 40, 37),
-    (0, 39, 37),
-    (0, 39, 38),
-    (0, 38, 38),
-    (0, 37, 38),
-    (0, 36, 39),
-    (0, 35, 39),
-    (0, 35, 40),
-    (0, 34, 40),
-    (0, 33, 40),
-    (0, 32, 40),
-    (0, 31, 40),
-    (0, 30, 41),
-    (0, 30, 32),
-    (0, 30, 33),
-    (0, 30, 34),
-    (0, 30, 35),
-    (0, 30, 36),
-    (0, 47, 47),
-    (0, 46, 47),
-    (0, 45, 47),
-    (0, 45, 46),
-    (0, 44, 46),
-    (0, 43, 46),
-    (0, 42, 46),
-    (0, 41, 46),
-    (0, 40, 46),
-    (0, 40, 47),
-    (0, 39, 47),
-    (0, 38, 47),
-    (0, 37, 46),
-    (0, 36, 46),
-    (0, 35, 47),
-    (0, 34, 47),
-    (0, 34, 48),
-    (0, 33, 48),
-    (0, 33, 49),
-    (0, 32, 49),
-    (0, 54, 71),
-    (0, 53, 71),
-    (0, 52, 71),
-    (0, 51, 71),
-    (0, 50, 71),
-    (0, 49, 72),
-    (0, 48, 72),
-    (0, 47, 72),
-    (0, 47, 73),
-    (0, 46, 73),
-    (0, 45, 74),
-    (0, 44, 74),
-    (0, 44, 75),
-    (0, 43, 75),
-    (0, 44, 61),
-    (0, 43, 61),
-    (0, 42, 61),
-    (0, 42, 62),
-    (0, 41, 62),
-    (0, 40, 62),
-    (0, 39, 62),
-    (0, 23, 54),
-    (0, 24, 54),
-    (0, 24, 55),
-    (0, 25, 55),
-    (0, 26, 55),
-    (0, 27, 56),
-    (0, 28, 56),
-    (0, 29, 56),
-    (0, 30, 56),
-    (0, 31, 56),
-    (0, 32, 56),
-    (0, 32, 57),
-    (0, 33, 57),
-    (0, 33, 58),
-    (0, 34, 58),
-    (0, 35, 58),
-    (0, 36, 59),
-    (0, 22, 70),
-    (0, 23, 70),
-    (0, 24, 70),
-    (0, 25, 70),
-    (0, 26, 71),
-    (0, 26, 72),
-    (0, 27, 72),
-    (0, 28, 72),
-    (0, 29, 72),
-    (0, 30, 72),
-    (0, 31, 72),
-    (0, 32, 72),
-    (0, 33, 72),
-    (0, 33, 73),
-    (0, 34, 73),
-    (0, 35, 73),
-    (0, 35, 72),
-    (0, 36, 72),
-    (0, 37, 71),
-    (0, 38, 71),
-    (0, 39, 71),
-    (0, 40, 71),
-    (0, 41, 71),
-    (0, 41, 72),
-    (0, 30, 37),
-    (0, 30, 38),
-    (0, 30, 39),
-    (0, 30, 40),
-    (0, 30, 41),
-    (0, 29, 41),
-    (0, 29, 42),
-    (0, 29, 43),
-    (0, 28, 43),
-    (0, 28, 44),
-    (0, 28, 45),
-    (0, 28, 46),
-    (0, 29, 46),
-    (0, 29, 47),
-    (0, 30, 48),
-    (0, 31, 49),
-    (0, 31, 50),
-    (0, 32, 51),
-    (0, 32, 52),
-    (0, 33, 52),
-    (0, 33, 53),
-    (0, 34, 53),
-    (0, 34, 54),
-    (0, 34, 55),
-    (0, 35, 56),
-    (0, 35, 57),
-    (0, 35, 58),
-    (0, 36, 58),
-    (0, 36, 59),
-    (0, 37, 59),
-    (0, 37, 60),
-    (0, 37, 61),
-    (0, 37, 62),
-    (0, 38, 62),
-    (0, 38, 63),
-    (0, 38, 64),
-    (0, 39, 64),
-    (0, 39, 65),
-    (0, 39, 66),
-    (0, 39, 67),
-    (0, 40, 68),
-    (0, 40, 69),
-    (0, 41, 70),
-    (0, 41, 71),
-    (0, 41, 72),
-    (0, 41, 72),
-    (0, 42, 72),
-    (0, 42, 73),
-    (0, 42, 74),
-    (0, 43, 74),
-    (0, 43, 75),
-    (0, 43, 76),
-    (0, 43, 77),
-    (0, 43, 78),
-    (0, 44, 78)
-]
-
-rlen = [
-    102.0,
-     90.0,
-     60.0,
-     30.0,
-    102.0,
-     90.0,
-     90.0,
-     90.0,
-    102.0,
-    102.0,
-    102.0,
-     72.0,
-     30.0,
-     72.0,
-     30.0,
-     90.0,
-    102.0,
-     90.0,
-     90.0,
-    102.0,
-     30.0,
-     72.0,
-     30.0,
-     72.0,
-     30.0,
-     60.0,
-     72.0,
-     30.0,
-    102.0,
-     90.0,
-     90.0,
-     72.0,
-     30.0,
-    102.0,
-     60.0,
-     30.0,
-     90.0,
-    102.0,
-     60.0,
-     30.0,
-     90.0,
-     30.0,
-     60.0,
-    102.0,
-    102.0,
-     90.0,
-    102.0,
-     30.0,
-     60.0,
-    102.0,
-    102.0,
-    102.0,
-     60.0,
-     30.0,
-    102.0,
-     90.0,
-     90.0,
-    102.0,
-    114.0,
-     90.0,
-     90.0,
-    102.0,
-    102.0,
-     90.0,
-     90.0,
-    102.0,
-     30.0,
-     60.0,
-     90.0,
-    102.0,
-     90.0,
-     90.0,
-     60.0,
-     30.0,
-     90.0,
-     90.0,
-     90.0,
-     90.0,
-    102.0,
-     30.0,
-     60.0,
-     72.0,
-     30.0,
-    114.0,
-     90.0,
-     90.0,
-     90.0,
-    102.0,
-    102.0,
-    102.0,
-    102.0,
-     30.0,
-     60.0,
-    102.0,
-    102.0,
-     30.0,
-     72.0,
-     30.0,
-     90.0,
-    102.0,
-     30.0,
-     60.0,
-    102.0,
-     90.0,
-    102.0,
-     60.0,
-     30.0,
-     60.0,
-    102.0,
-     90.0,
-     90.0,
-     90.0,
-     90.0,
-     90.0,
-    102.0,
-     72.0,
-     30.0,
-     72.0,
-     30.0,
-    102.0,
-     90.0,
-    114.0,
-     90.0,
-    102.0,
-     90.0,
-    102.0,
-    102.0,
-     30.0,
-    102.0,
-     90.0,
-     90.0,
-     90.0,
-     90.0,
-     90.0,
-     30.0,
-     60.0,
-     90.0,
-     30.0,
-     60.0,
-    102.0,
-     90.0,
-     90.0,
-     90.0,
-     90.0,
-     30.0,
-     30.0,
-     90.0,
-     90.0,
-     90.0,
-     90.0,
-     72.0,
-     30.0,
-     90.0,
-     60.0,
-     30.0,
-     90.0,
-     90.0,
-     30.0,
-     60.0,
-    102.0,
-    114.0,
-    114.0,
-     90.0,
-    102.0,
-     30.0,
-     72.0,
-     60.0,
-     30.0,
-    102.0,
-    102.0,
-    114.0,
-     90.0,
-     60.0,
-     30.0,
-     72.0,
-     30.0,
-    102.0,
-    102.0,
-     30.0,
-     60.0,
-    120.0,
-     60.0,
-     30.0,
-     90.0,
-     90.0,
-     90.0,
-     90.0,
-    114.0,
-    102.0,
-     90.0,
-     30.0,
-     30.0,
-     30.0,
-    102.0,
-     60.0,
-     30.0,
-     90.0,
-     90.0,
-     90.0,
-     60.0,
-     30.0
-]
-
+# Reach geometry (cells, lengths, gradients and tops) and the segment
+# network are read from the mf-nwt sfr file by SagehenInputs
 rwid = 3.0
-rgrd = [
-    0.042,
-    0.064,
-    0.083,
-    0.081,
-    0.062,
-    0.065,
-    0.089,
-    0.097,
-    0.141,
-    0.186,
-    0.217,
-    0.203,
-    0.206,
-    0.206,
-    0.144,
-    0.147,
-    0.135,
-    0.129,
-    0.124,
-    0.136,
-    0.162,
-    0.147,
-    0.157,
-    0.147,
-    0.115,
-    0.117,
-    0.111,
-    0.120,
-    0.099,
-    0.073,
-    0.037,
-    0.038,
-    0.060,
-    0.048,
-    0.024,
-    0.029,
-    0.032,
-    0.028,
-    0.024,
-    0.029,
-    0.033,
-    0.038,
-    0.032,
-    0.038,
-    0.051,
-    0.047,
-    0.037,
-    0.063,
-    0.063,
-    0.049,
-    0.069,
-    0.077,
-    0.063,
-    0.045,
-    0.037,
-    0.043,
-    0.048,
-    0.054,
-    0.065,
-    0.067,
-    0.091,
-    0.091,
-    0.071,
-    0.073,
-    0.021,
-    0.031,
-    0.045,
-    0.033,
-    0.029,
-    0.042,
-    0.075,
-    0.103,
-    0.092,
-    0.095,
-    0.087,
-    0.083,
-    0.094,
-    0.102,
-    0.093,
-    0.081,
-    0.099,
-    0.077,
-    0.057,
-    0.056,
-    0.044,
-    0.050,
-    0.075,
-    0.076,
-    0.074,
-    0.074,
-    0.071,
-    0.072,
-    0.056,
-    0.060,
-    0.048,
-    0.043,
-    0.049,
-    0.039,
-    0.042,
-    0.056,
-    0.081,
-    0.071,
-    0.068,
-    0.068,
-    0.068,
-    0.044,
-    0.078,
-    0.071,
-    0.051,
-    0.054,
-    0.056,
-    0.056,
-    0.050,
-    0.048,
-    0.038,
-    0.022,
-    0.049,
-    0.059,
-    0.043,
-    0.043,
-    0.045,
-    0.049,
-    0.042,
-    0.031,
-    0.016,
-    0.010,
-    0.012,
-    0.015,
-    0.012,
-    0.011,
-    0.022,
-    0.044,
-    0.056,
-    0.060,
-    0.114,
-    0.100,
-    0.067,
-    0.086,
-    0.127,
-    0.141,
-    0.118,
-    0.100,
-    0.083,
-    0.087,
-    0.100,
-    0.067,
-    0.056,
-    0.083,
-    0.100,
-    0.076,
-    0.045,
-    0.020,
-    0.053,
-    0.042,
-    0.038,
-    0.047,
-    0.047,
-    0.057,
-    0.040,
-    0.032,
-    0.045,
-    0.053,
-    0.042,
-    0.049,
-    0.094,
-    0.085,
-    0.036,
-    0.027,
-    0.030,
-    0.033,
-    0.024,
-    0.017,
-    0.025,
-    0.021,
-    0.015,
-    0.010,
-    0.010,
-    0.012,
-    0.018,
-    0.022,
-    0.017,
-    0.019,
-    0.010,
-    0.013,
-    0.022,
-    0.017,
-    0.021,
-    0.043,
-    0.044,
-    0.038,
-    0.050,
-    0.033,
-    0.021,
-    0.020,
-    0.024,
-    0.029,
-    0.020,
-    0.011,
-    0.024,
-    0.033,
-    0.022
-]
-
-rtp = [
-    2356.5,
-    2352.5,
-    2345.5,
-    2342.5,
-    2336.5,
-    2332.5,
-    2324.5,
-    2316.5,
-    2306.5,
-    2288.5,
-    2268.5,
-    2247.5,
-    2240.5,
-    2226.5,
-    2219.5,
-    2210.5,
-    2196.5,
-    2184.5,
-    2172.5,
-    2161.5,
-    2150.5,
-    2142.5,
-    2135.5,
-    2126.5,
-    2120.5,
-    2115.5,
-    2107.5,
-    2102.5,
-    2093.5,
-    2086.5,
-    2147.5,
-    2144.5,
-    2142.5,
-    2137.5,
-    2135.5,
-    2134.5,
-    2132.5,
-    2129.5,
-    2127.5,
-    2126.5,
-    2124.5,
-    2122.5,
-    2120.5,
-    2118.5,
-    2113.5,
-    2108.5,
-    2104.5,
-    2102.5,
-    2097.5,
-    2094.5,
-    2088.5,
-    2080.5,
-    2074.5,
-    2072.5,
-    2069.5,
-    2066.5,
-    2061.5,
-    2057.5,
-    2049.5,
-    2116.5,
-    2110.5,
-    2099.5,
-    2092.5,
-    2085.5,
-    2113.5,
-    2111.5,
-    2109.5,
-    2107.5,
-    2105.5,
-    2102.5,
-    2097.5,
-    2088.5,
-    2080.5,
-    2077.5,
-    2070.5,
-    2064.5,
-    2055.5,
-    2047.5,
-    2036.5,
-    2032.5,
-    2027.5,
-    2021.5,
-    2018.5,
-    2014.5,
-    2001.5,
-    1997.5,
-    1992.5,
-    1983.5,
-    1977.5,
-    1968.5,
-    1962.5,
-    1956.5,
-    1954.5,
-    1949.5,
-    1943.5,
-    1941.5,
-    1938.5,
-    1936.5,
-    2004.5,
-    1999.5,
-    1995.5,
-    1991.5,
-    1985.5,
-    1979.5,
-    1973.5,
-    2033.5,
-    2031.5,
-    2026.5,
-    2022.5,
-    2017.5,
-    2012.5,
-    2007.5,
-    2002.5,
-    1998.5,
-    1993.5,
-    1991.5,
-    1990.5,
-    1986.5,
-    1984.5,
-    1981.5,
-    1977.5,
-    1972.5,
-    2052.5,
-    2048.5,
-    2046.5,
-    2045.5,
-    2044.5,
-    2043.5,
-    2042.5,
-    2041.5,
-    2040.5,
-    2037.5,
-    2032.5,
-    2027.5,
-    2023.5,
-    2015.5,
-    2011.5,
-    2006.5,
-    2002.5,
-    1990.5,
-    1977.5,
-    1968.5,
-    1959.5,
-    1953.5,
-    1946.5,
-    1944.5,
-    2077.5,
-    2072.5,
-    2062.5,
-    2054.5,
-    2049.5,
-    2048.5,
-    2042.5,
-    2038.5,
-    2037.5,
-    2034.5,
-    2030.5,
-    2027.5,
-    2024.5,
-    2022.5,
-    2018.5,
-    2012.5,
-    2007.5,
-    2003.5,
-    1999.5,
-    1992.5,
-    1989.5,
-    1988.5,
-    1986.5,
-    1983.5,
-    1979.5,
-    1978.5,
-    1976.5,
-    1975.5,
-    1974.5,
-    1973.5,
-    1971.5,
-    1970.5,
-    1969.5,
-    1968.5,
-    1967.5,
-    1966.5,
-    1965.5,
-    1964.5,
-    1962.5,
-    1960.5,
-    1959.5,
-    1956.5,
-    1950.5,
-    1947.5,
-    1944.5,
-    1943.5,
-    1942.5,
-    1941.5,
-    1939.5,
-    1938.5,
-    1936.5,
-    1935.5,
-    1934.5,
-    1931.5,
-    1930.5
-]
-
 rbth = 1.0
 rhk = 5.0
 man = 0.04
 ustrf = 1.0
 ndv = 0
-pkdat = []
-for i in np.arange(len(rlen)):
-    ncon = len(conns[i]) - 1
-    pkdat.append(
-        (
-            i,
-            sfrcells[i],
-            rlen[i],
-            rwid,
-            rgrd[i],
-            rtp[i],
-            rbth,
-            rhk,
-            man,
-            ncon,
-            ustrf,
-            ndv,
-        )
-    )
 
 # #### Prepping input for UZF package 
 # Package_data information
 
-iuzbnd = np.loadtxt(os.path.join(dat_pth,"orig_uzf_input","iuzbnd.txt"))
-thts = np.loadtxt(os.path.join(dat_pth,"orig_uzf_input","thts.txt"))
-uzk33 = np.loadtxt(os.path.join(dat_pth,"orig_uzf_input","uz_vk_cln.txt"))
-finf = np.loadtxt(os.path.join(dat_pth,"orig_uzf_input","finf.txt"))
-
 pet_ss = 0.008    # mf6io.pdf: Must always be specified, even when not used
 extdp_ss = 1.0    # mf6io.pdf: Must always be specified, even when not used
 extwc_ss = 0.055  # mf6io.pdf: Must always be specified, even when not used
@@ -978,70 +156,421 @@ rootact = 0.
 extdp = extdp_ss
 extwc = extwc_ss
 
-uzf_packagedata = []
-pd0             = []
-iuzno_cell_dict = {}
-iuzno_dict_rev  = {}
-iuzno           = 0
-surfdep         = 0.5
-# Set up the UZF static variables
-nuzfcells = 0
-for k in range(nlay):
-    for i in range(0, iuzbnd.shape[0] - 1):
-        for j in range(0,iuzbnd.shape[1] - 1):
-            if iuzbnd[i, j] != 0:
-                nuzfcells += 1
-                if k == 0:
-                    lflag = 1
-                    iuzno_cell_dict.update({(i, j): iuzno})  # establish new dictionary entry for current cell 
-                                                             # addresses & iuzno connections are both 0-based
-                    iuzno_dict_rev.update({iuzno: (i, j)})   # For post-processing the mvr output, need a dict with iuzno as key
-                else:
-                    lflag = 0
-                
-                # Set the vertical connection, which is the cell below
-                # For now, using only the GSFLOW version of Sagehen, only the first layer hosts UZF objects
-                ivertcon = -1
-                #ivertcon =  iuzno + int(iuzfbnd.sum())
-                #if k == nlay - 1: ivertcon = -1       # adjust if on bottom layer (no underlying conn.)
-                #                                      # Keep in mind 0-based adjustment (so ivertcon==-1 -> 0)
-                
-                surfdep = 1.0
-                vks = uzk33[i, j]
-                thtr = 0.01
-                thtsx = thts[i, j]
-                thti = 0.08
-                eps = 4.0
-                
-                # Set the boundname for the land surface cells
-                bndnm = 'sageSurf'
-                
-                # <iuzno> <cellid(ncelldim)> <landflag> <ivertcon> <surfdep> <vks> <thtr> <thts> <thti> <eps> [<boundname>]
-                uz = [iuzno,      (k, i, j),     lflag,  ivertcon,  surfdep,  vks,  thtr,  thtsx,  thti,  eps,   bndnm]
-                uzf_packagedata.append(uz)
-            
-                # steady-state values can be set here
-                if lflag:
-                    finf_ss = finf[i, j]
-                    pd0.append((iuzno, finf_ss, pet_ss, extdp_ss, extwc_ss, ha, hroot, rootact))
-                
-                iuzno += 1
-
-# Store the steady state uzf stresses in dictionary
-uzf_perioddata = {0: pd0}
+surfdep = 1.0
+thtr = 0.01
+thti = 0.08
+eps = 4.0
+
+# ### Lazily evaluated model input
+#
+# The arrays and package data needed by build_model and plot_results are
+# prepared on first access and memoized, so importing this script or
+# running with -nw/-nr only pays for the inputs that are actually used.
+
+class SagehenInputs:
+    def __init__(self, dat_pth, from_mfnwt=False):
+        """Create a SagehenInputs object
+
+        Parameters
+        ----------
+        dat_pth : str
+            path to the directory with the arrays extracted from the
+            mf-nwt input files
+        from_mfnwt : bool
+            read the dis, bas, upw and uzf arrays directly from the original
+            mf-nwt input files instead of the extracted arrays (default is
+            False). The extracted starting heads for layer 2 and the cleaned
+            uzf vertical conductivities differ from the original files.
+        """
+        self.dat_pth = dat_pth
+        self.from_mfnwt = from_mfnwt
+
+    def _load(self, *args):
+        return arraycache.load_array(os.path.join(self.dat_pth, *args))
+
+    # original mf-nwt packages, only read when from_mfnwt is True
+    @cached_property
+    def _dis(self):
+        return mfnwt.read_dis(os.path.join(orig_pth, "sagehen.dis"), cache=True)
+
+    @cached_property
+    def _bas(self):
+        return mfnwt.read_bas(
+            os.path.join(orig_pth, "sagehen.bas"), nlay, nrow, ncol, cache=True
+        )
+
+    @cached_property
+    def _upw(self):
+        return mfnwt.read_upw(
+            os.path.join(orig_pth, "sagehen.upw"),
+            nlay,
+            nrow,
+            ncol,
+            laycbd=self._dis["laycbd"],
+            cache=True,
+        )
+
+    @cached_property
+    def _uzf_nwt(self):
+        return mfnwt.read_uzf(
+            os.path.join(orig_pth, "sagehen.uzf"),
+            nrow,
+            ncol,
+            nper=self._dis["nper"],
+            steady=self._dis["steady"],
+            cache=True,
+        )
+
+    # from mf-nwt .dis file
+    @cached_property
+    def top(self):
+        if self.from_mfnwt:
+            return self._dis["top"]
+        return self._load("orig_dis_input", "top1.txt")
+
+    @cached_property
+    def botm(self):
+        if self.from_mfnwt:
+            return list(self._dis["botm"])
+        bot1 = self._load("orig_dis_input", "bot1.txt")
+        bot2 = self._load("orig_dis_input", "bot2.txt")
+        return [bot1, bot2]
+
+    # from mf-nwt .bas file
+    @cached_property
+    def idomain1(self):
+        if self.from_mfnwt:
+            return self._bas["ibound"][0]
+        return self._load("orig_bas_input", "ibnd1.txt")
+
+    @cached_property
+    def idomain2(self):
+        if self.from_mfnwt:
+            return self._bas["ibound"][1]
+        return self._load("orig_bas_input", "ibnd2.txt")
+
+    @cached_property
+    def strt1(self):
+        if self.from_mfnwt:
+            return self._bas["strt"][0]
+        return self._load("orig_bas_input", "strt1.txt")
+
+    @cached_property
+    def strt2(self):
+        if self.from_mfnwt:
+            return self._bas["strt"][1]
+        return self._load("orig_bas_input", "strt2.txt")
+    @cached_property
+    def chdspd(self):
+        idomain1, idomain2 = self.idomain1, self.idomain2
+        strt1, strt2 = self.strt1, self.strt2
+        # peel out locations of negative values for setting constant head data
+        tmp1 = np.where(idomain1 < 0)
+        listOfChdCoords1 = list(zip(np.zeros_like(tmp1[0]), tmp1[0], tmp1[1]))
+        # get the corresponding constant head values
+        chd_lay1 = []
+        if(len(listOfChdCoords1) > 0):
+            chd_lay1 = list(np.take(strt1 , np.ravel_multi_index(tmp1, strt1.shape)))
+        # work on layer 2
+        tmp2 = np.where(idomain2 < 0)
+        listOfChdCoords2 = list(zip(np.ones_like(tmp2[0]), tmp2[0], tmp2[1]))
+        chd_lay2 = []
+        if(len(listOfChdCoords2) > 0):
+            chd_lay2 = list(np.take(strt2 , np.ravel_multi_index(tmp2, strt2.shape)))
+        # Get the constant head data into a flopy-compatible format
+        listOfChdCoords = listOfChdCoords1 + listOfChdCoords2
+        chd_vals = chd_lay1 + chd_lay2
+        chdspd = []
+        for i in np.arange(len(listOfChdCoords)):
+            chdspd.append([listOfChdCoords[i], chd_vals[i]])
+        return chdspd
+
+    @cached_property
+    def idomain(self):
+        # get rid of the negative values in idomain since mf6 treats negatives like zeros
+        return [np.abs(self.idomain1), np.abs(self.idomain2)]
+
+    @cached_property
+    def iconvert(self):
+        return [np.ones_like(self.strt1), np.zeros_like(self.strt2)]
+
+    # from mf-nwt .upw file
+    @cached_property
+    def k11(self):
+        if self.from_mfnwt:
+            return list(self._upw["hk"])
+        k11_lay1 = self._load("orig_upw_input", "hk1.txt")
+        k11_lay2 = self._load("orig_upw_input", "hk2.txt")
+        return [k11_lay1, k11_lay2]
+
+    @cached_property
+    def sy(self):
+        # sy_lay2 not in original problem (laytyp = 0 in layer 2)
+        if self.from_mfnwt:
+            sy_lay1 = self._upw["sy"][0]
+        else:
+            sy_lay1 = self._load("orig_upw_input", "sy1.txt")
+        return [sy_lay1, sy_lay1]
+
+    @cached_property
+    def k33(self):
+        if self.from_mfnwt:
+            return list(self._upw["vka"])
+        k33_lay1 = self._load("orig_upw_input", "vk1.txt")
+        k33_lay2 = self._load("orig_upw_input", "vk2.txt")
+        return [k33_lay1, k33_lay2]
+
+    # from mf-nwt .sfr file
+    @cached_property
+    def _sfr(self):
+        return mfnwt.read_sfr2(os.path.join(orig_pth, "sagehen.sfr"))
+
+    @property
+    def sfr_reaches(self):
+        return self._sfr[0]
+
+    @property
+    def sfr_segments(self):
+        return self._sfr[1]
+
+    @cached_property
+    def conns(self):
+        return sageBld.gen_mf6_sfr_connections(
+            self.sfr_segments, self.sfr_reaches
+        )
+
+    # from mf-nwt .gag file
+    @cached_property
+    def gages(self):
+        return mfnwt.read_gag(os.path.join(orig_pth, "sagehen.gag"))
+
+    @cached_property
+    def gage_reaches(self):
+        # zero based reach of every stream gage
+        reaches = self.sfr_reaches
+        return [
+            int(
+                np.flatnonzero(
+                    (reaches.iseg == gage.gageseg)
+                    & (reaches.ireach == gage.gagerch)
+                )[0]
+            )
+            for gage in self.gages
+        ]
+
+    @cached_property
+    def pkdat(self):
+        conns = self.conns
+        reaches = self.sfr_reaches
+        # These are zero based
+        sfrcells = list(
+            zip(
+                (reaches.krch - 1).tolist(),
+                (reaches.irch - 1).tolist(),
+                (reaches.jrch - 1).tolist(),
+            )
+        )
+        rlen = reaches.rchlen.tolist()
+        rgrd = reaches.slope.tolist()
+        rtp = reaches.strtop.tolist()
+        pkdat = []
+        for i in range(len(rlen)):
+            ncon = len(conns[i]) - 1
+            pkdat.append(
+                (
+                    i,
+                    sfrcells[i],
+                    rlen[i],
+                    rwid,
+                    rgrd[i],
+                    rtp[i],
+                    rbth,
+                    rhk,
+                    man,
+                    ncon,
+                    ustrf,
+                    ndv,
+                )
+            )
+        return pkdat
+
+    # from mf-nwt .uzf file
+    @cached_property
+    def iuzbnd(self):
+        if self.from_mfnwt:
+            return self._uzf_nwt["iuzfbnd"]
+        # the trailing column of iuzbnd.txt holds the row number
+        return self._load("orig_uzf_input", "iuzbnd.txt")[:, :ncol]
+
+    @cached_property
+    def thts(self):
+        if self.from_mfnwt:
+            return self._uzf_nwt["thts"]
+        return self._load("orig_uzf_input", "thts.txt")
+
+    @cached_property
+    def uzk33(self):
+        if self.from_mfnwt:
+            return self._uzf_nwt["vks"]
+        return self._load("orig_uzf_input", "uz_vk_cln.txt")
+
+    @cached_property
+    def finf(self):
+        if self.from_mfnwt:
+            return self._uzf_nwt["finf"][0]
+        return self._load("orig_uzf_input", "finf.txt")
+
+    @cached_property
+    def _uzf(self):
+        # the last row is not assigned UZF cells
+        iuzbnd = self.iuzbnd[:-1]
+        return sageBld.gen_mf6_uzf_packagedata(
+            iuzbnd,
+            self.uzk33,
+            self.thts,
+            self.finf,
+            nlay,
+            surfdep=surfdep,
+            thtr=thtr,
+            thti=thti,
+            eps=eps,
+            pet=pet_ss,
+            extdp=extdp_ss,
+            extwc=extwc_ss,
+            ha=ha,
+            hroot=hroot,
+            rootact=rootact,
+        )
+
+    @property
+    def uzf_packagedata(self):
+        return self._uzf[0]
+
+    @property
+    def nuzfcells(self):
+        return len(self._uzf[0])
+
+    @property
+    def iuzno_cell(self):
+        # zero-based (k, i, j) of every iuzno
+        return self._uzf[2]
+
+    @property
+    def cell_iuzno(self):
+        # iuzno of every (k, i, j), -1 where there is no UZF cell
+        return self._uzf[3]
+
+    # from prms .data file
+    @cached_property
+    def climate(self):
+        return prms.read_data(os.path.join(prms_pth, "sagehen.data"))
+
+    # from prms gsflow.params and gvr.params files
+    @cached_property
+    def hru_map(self):
+        # sparse operator between prms hrus and the land surface uzf cells
+        return gsflow.HruCellMap.from_params(
+            os.path.join(prms_pth, "gvr.params"),
+            self.cell_iuzno[0],
+            cache=True,
+        )
+
+    @cached_property
+    def hru_precip(self):
+        # (ndays, nhru) daily precipitation of every prms hru for the
+        # transient stress period, the precipitation of the hru station
+        # (hru_psta) times the monthly rain adjustment factor (rain_adj).
+        # Missing station values (negative) are replaced by the average of
+        # the stations with data
+        params = prms.read_params(os.path.join(prms_pth, "gsflow.params"))
+        end = np.datetime64(start_date) + (perlen[1] - 1)
+        precip = self.climate.get("precip", start_date, end)
+        if precip.shape[0] != perlen[1]:
+            raise ValueError(
+                "sagehen.data does not cover {} days from {}".format(
+                    perlen[1], start_date
+                )
+            )
+        valid = precip >= 0.0
+        total = np.where(valid, precip, 0.0).sum(axis=1, dtype=float)
+        count = valid.sum(axis=1)
+        daily = np.divide(
+            total, count, out=np.zeros_like(total), where=count > 0
+        )
+        station = np.asarray(params["hru_psta"], dtype=int) - 1
+        hru_precip = np.where(
+            valid[:, station], precip[:, station], daily[:, np.newaxis]
+        )
+        i0, i1 = self.climate.date_range(start_date, end)
+        month = self.climate.dates[i0:i1].astype("datetime64[M]").astype(int)
+        rain_adj = np.asarray(params["rain_adj"], dtype=float)
+        return hru_precip * rain_adj[:, month % 12].T
+
+    @cached_property
+    def precip_scale(self):
+        # daily precipitation of the land surface uzf cells regridded from
+        # the hrus, averaged over the cells and normalized by its mean for
+        # the transient stress period. The column sums of the operator
+        # weight each hru by its area in the land surface cells
+        weights = np.asarray(self.hru_map.cell_matrix.sum(axis=0)).ravel()
+        land = self.hru_precip @ weights
+        return land / land.mean()
+
+    @cached_property
+    def _cell_precip_mean(self):
+        return self.hru_map.to_cells(self.hru_precip.mean(axis=0))
+
+    def cell_precip_scale(self, day):
+        # daily precipitation of every land surface uzf cell regridded from
+        # the hrus with one sparse matrix-vector product, normalized by the
+        # mean of the cell for the transient stress period
+        return (
+            self.hru_map.to_cells(self.hru_precip[day])
+            / self._cell_precip_mean
+        )
+
+    @cached_property
+    def _uzf_transient(self):
+        # the steady-state infiltration is distributed over the transient
+        # stress period in proportion to the daily precipitation. A time
+        # series scales every cell that uses it, so the input files use the
+        # precipitation of the land surface and only a BMI run applies the
+        # precipitation of every cell
+        times = perlen[0] + np.arange(perlen[1], dtype=float)
+        return sageBld.gen_mf6_uzf_finf_timeseries(
+            self._uzf[1], times, self.precip_scale
+        )
+
+    @cached_property
+    def uzf_perioddata(self):
+        # Store the steady state uzf stresses in dictionary
+        return {0: self._uzf[1]}
+
+    def iter_uzf_perioddata(self):
+        # transient uzf stresses, streamed to external files by write_model
+        # one stress period at a time
+        yield 1, self._uzf_transient[0]
+
+    @property
+    def uzf_timeseries(self):
+        return self._uzf_transient[1]
 
 
+sagehen_inputs = SagehenInputs(dat_pth)
+
 # ### Function to build models
 #
 # MODFLOW 6 flopy simulation object (sim) is returned if building the model
 
-def build_model(sim_name, silent=False):
-    if config.buildModel:
+def build_model(sim_name, silent=False, run_config=None):
+    rc = run_config or config.run_config
+    if rc.build:
 
         # Instantiate the MODFLOW 6 simulation
         name = "sagehen-gsf"
         gwfname = "gwf_" + name
-        sim_ws = os.path.join(ws, sim_name)
+        sim_ws = rc.workspace(sim_name)
+        inputs = sagehen_inputs
         sim = flopy.mf6.MFSimulation(
             sim_name=sim_name,
             version="mf6",
@@ -1049,6 +578,9 @@ def build_model(sim_name, silent=False):
             exe_name=mf6exe,
             continue_=True,
         )
+        # arrays are wrapped at the number of columns, like
+        # write_simulation, when packages are written by write_model
+        sim.simulation_data.max_columns_of_data = ncol
 
         # Instantiating MODFLOW 6 time discretization
         tdis_rc = []
@@ -1072,27 +604,14 @@ def build_model(sim_name, silent=False):
         imsgwf = flopy.mf6.ModflowIms(
             sim,
             print_option="summary",
-            complexity="complex",
             outer_dvclose=hclose,
             outer_maximum=nouter,
-            under_relaxation="dbd",
-            linear_acceleration="BICGSTAB",
-            under_relaxation_theta=0.7,
-            under_relaxation_kappa=0.08,
-            under_relaxation_gamma=0.05,
-            under_relaxation_momentum=0.0,
-            backtracking_number=20,
-            backtracking_tolerance=2.0,
-            backtracking_reduction_factor=0.2,
-            backtracking_residual_limit=5.0e-4,
             inner_dvclose=hclose,
             rcloserecord=[0.0001, "relative_rclose"],
             inner_maximum=ninner,
             relaxation_factor=relax,
-            number_orthogonalizations=2,
-            preconditioner_levels=8,
-            preconditioner_drop_tolerance=0.001,
-            filename="{}.ims".format(gwfname)
+            filename="{}.ims".format(gwfname),
+            **ims_options
         )
         sim.register_ims_package(imsgwf, [gwf.name])
 
@@ -1104,14 +623,14 @@ def build_model(sim_name, silent=False):
             ncol=ncol,
             delr=delr,
             delc=delc,
-            top=top,
-            botm=botm,
-            idomain=idomain,
+            top=inputs.top,
+            botm=inputs.botm,
+            idomain=inputs.idomain,
             filename="{}.dis".format(gwfname)
         )
 
         # Instantiating MODFLOW 6 initial conditions package for flow model
-        strt = [strt1, strt2]
+        strt = [inputs.strt1, inputs.strt2]
         flopy.mf6.ModflowGwfic(
             gwf, 
             strt=strt, 
@@ -1124,8 +643,8 @@ def build_model(sim_name, silent=False):
             save_flows=False,
             alternative_cell_averaging="AMT-HMK",
             icelltype=icelltype,
-            k=k11,
-            k33=k33,
+            k=[k * k11_mult for k in inputs.k11],
+            k33=[k * k11_mult for k in inputs.k33],
             save_specific_discharge=False,
             filename="{}.npf".format(gwfname)
         )
@@ -1134,8 +653,8 @@ def build_model(sim_name, silent=False):
         flopy.mf6.ModflowGwfsto(
             gwf, 
             ss=2e-6, 
-            sy=sy,
-            iconvert=iconvert,
+            sy=inputs.sy,
+            iconvert=inputs.iconvert,
             steady_state={0:True},
             transient={1:True},
             filename='{}.sto'.format(gwfname)
@@ -1154,6 +673,7 @@ def build_model(sim_name, silent=False):
         )
 
         # Instantiating MODFLOW 6 constant head package
+        chdspd = inputs.chdspd
         chdspdx = {0: chdspd}
         flopy.mf6.ModflowGwfchd(
             gwf,
@@ -1165,7 +685,7 @@ def build_model(sim_name, silent=False):
         )
         
         # Instantiating MODFLOW 6 streamflow routing package
-        flopy.mf6.ModflowGwfsfr(
+        sfr = flopy.mf6.ModflowGwfsfr(
             gwf,
             print_stage=False,
             print_flows=False,
@@ -1175,61 +695,338 @@ def build_model(sim_name, silent=False):
             pname="SFR-1",
             unit_conversion=86400.0,
             boundnames=True,
-            nreaches=len(conns),
-            packagedata=pkdat,
-            connectiondata=conns,
+            nreaches=len(inputs.conns),
+            packagedata=inputs.pkdat,
+            connectiondata=inputs.conns,
             perioddata=None,
             filename="{}.sfr".format(gwfname),
         )
+
+        # Instantiating MODFLOW 6 observations of the flow and stage at the
+        # stream gages and of the head in the cells below them, saved in
+        # binary files
+        reaches = inputs.sfr_reaches
+        sfr_obs = []
+        head_obs = []
+        for gage, rno in zip(inputs.gages, inputs.gage_reaches):
+            obsname = "gage{}".format(gage.unit)
+            cellid = (
+                int(reaches.krch[rno]) - 1,
+                int(reaches.irch[rno]) - 1,
+                int(reaches.jrch[rno]) - 1,
+            )
+            sfr_obs.append((obsname + "_q", "outflow", (rno,)))
+            sfr_obs.append((obsname + "_stage", "stage", (rno,)))
+            head_obs.append((obsname + "_h", "head", cellid))
+        sfr.obs.initialize(
+            filename="{}.sfr.obs".format(gwfname),
+            digits=10,
+            continuous={
+                ("{}.sfr.obs.bin".format(gwfname), "binary"): sfr_obs
+            },
+        )
+        flopy.mf6.ModflowUtlobs(
+            gwf,
+            digits=10,
+            continuous={
+                ("{}.head.obs.bin".format(gwfname), "binary"): head_obs
+            },
+            filename="{}.obs".format(gwfname),
+        )
         
         # Instantiating MODFLOW 6 unsaturated zone flow package
         flopy.mf6.ModflowGwfuzf(
             gwf, 
-            nuzfcells=nuzfcells, 
+            nuzfcells=inputs.nuzfcells, 
             boundnames=True,
             ntrailwaves=15, 
             nwavesets=150, 
             print_flows=False,
             save_flows=True,
             simulate_et=False, 
-            packagedata=uzf_packagedata, 
-            perioddata=uzf_perioddata,
+            packagedata=inputs.uzf_packagedata, 
+            perioddata=inputs.uzf_perioddata,
+            timeseries=dict(
+                inputs.uzf_timeseries, filename="{}.uzf.ts".format(gwfname)
+            ),
             budget_filerecord='{}.uzf.bud'.format(gwfname),
             pname='UZF-1',
             filename='{}.uzf'.format(gwfname)
         )
-        
+
+        # starting heads from the spin-up cache
+        if spinup_cache:
+            fpth = spinup_path(sim, run_config=rc)
+            if os.path.isfile(fpth):
+                gwf.ic.strt.set_data(np.load(fpth))
+                if not silent:
+                    print("starting heads from {}".format(fpth))
+
         return sim
     return None
 
+# Functions of the spin-up cache. The converged steady-state heads are saved
+# in the base workspace under a hash of every input that affects the
+# steady-state stress period, so ensemble members that only differ in their
+# transient inputs share them
+
+def spinup_key(sim):
+    # the initial conditions are not part of the key, the original starting
+    # heads are. The steady-state heads depend on the solver settings
+    # (nouter, ninner, hclose, relax and ims_options), the model options
+    # (newton) and the inputs of the flow packages, for example k11_mult in
+    # npf, rhk in sfr and surfdep in uzf. These are hashed with the package
+    # fingerprints of the manifest. The observations, the output control
+    # and the transient stress period do not change the steady-state heads
+    inputs = sagehen_inputs
+    gwf = sim.get_model(sim.model_names[0])
+    h = hashlib.blake2b(digest_size=16)
+    for strt in (inputs.strt1, inputs.strt2):
+        h.update(np.ascontiguousarray(strt, dtype=np.float64).data)
+    h.update(repr((perlen[0], nstp[0], tsmult[0])).encode())
+    packages = [
+        package
+        for package in sim.sim_package_list
+        if package.package_type == "ims"
+    ]
+    packages.append(gwf.name_file)
+    packages += [
+        package
+        for package in gwf.packagelist
+        if package.package_type in ("dis", "npf", "sto", "chd", "sfr", "uzf")
+    ]
+    for package in packages:
+        h.update(mf6write.package_fingerprint(package).encode())
+    return h.hexdigest()
+
+
+def spinup_path(sim, run_config=None):
+    rc = run_config or config.run_config
+    return os.path.join(
+        rc.base_ws,
+        arraycache.cache_dirname,
+        "{}-spinup-{}.npy".format(example_name, spinup_key(sim)),
+    )
+
+
+def save_spinup(sim, run_config=None):
+    # the first saved heads are the heads at the end of the steady-state
+    # stress period, the starting heads are kept in inactive cells
+    fpth = spinup_path(sim, run_config=run_config)
+    sim_ws = sim.simulation_data.mfpath.get_sim_path()
+    hds_pth = os.path.join(sim_ws, "{}.hds".format(sim.model_names[0]))
+    if os.path.isfile(fpth) or not os.path.isfile(hds_pth):
+        return
+    hobj = mf6bin.read_head(hds_pth, cache=False)
+    try:
+        if tuple(hobj.get_kstpkper()[0]) != (0, 0):
+            return
+        head = np.array(hobj.get_data(idx=0))
+    finally:
+        hobj.close()
+    strt = np.array([sagehen_inputs.strt1, sagehen_inputs.strt2])
+    head = np.where(np.array(sagehen_inputs.idomain) > 0, head, strt)
+    os.makedirs(os.path.dirname(fpth), exist_ok=True)
+    tmp_pth = "{}.{}.tmp.npy".format(fpth, os.getpid())
+    np.save(tmp_pth, head)
+    os.replace(tmp_pth, fpth)
+
+
+def steady_state_converged(sim):
+    # a time step that failed to converge used every outer iteration
+    sim_ws = sim.simulation_data.mfpath.get_sim_path()
+    fpth = os.path.join(sim_ws, "mfsim.lst")
+    if not os.path.isfile(fpth):
+        return False
+    lst = mf6lst.read_listing(fpth)
+    if lst.nfail == 0:
+        return True
+    solver = lst.solver
+    if not solver:
+        return False
+    outer = solver["outer"][solver["kper"] == 1]
+    return outer.size == nstp[0] and bool((outer < nouter).all())
+
 # Function to write model files
 
-def write_model(sim, silent=True):
-    if config.writeModel:
-        sim.write_simulation(silent=silent)
+def write_model(sim, silent=True, run_config=None):
+    rc = run_config or config.run_config
+    if rc.write:
+        gwf = sim.get_model(sim.model_names[0])
+        uzf = gwf.get_package("UZF-1")
+        # only packages with inputs that changed since the last write are
+        # written. The transient uzf period data that are appended to the
+        # uzf file are part of the uzf inputs
+        manifest = mf6write.PackageManifest(sim)
+        changed = manifest.changed(
+            extra={uzf.filename: sagehen_inputs.iter_uzf_perioddata()}
+        )
+        if binary_griddata:
+            packages = [
+                name
+                for name in ("dis", "ic", "npf", "sto")
+                if gwf.get_package(name).filename in changed
+            ]
+            mf6write.store_griddata_external(gwf, packages=packages)
+        manifest.write(changed)
+        if not silent:
+            print(
+                "wrote {} of {} packages".format(
+                    len(changed), len(manifest.fingerprints)
+                )
+            )
+        # append the transient uzf period blocks to the uzf file. Only the
+        # records that change from the previous stress period are written,
+        # mf6 keeps the settings of the other uzf cells
+        if uzf.filename in changed:
+            periods = mf6write.delta_periods(
+                sagehen_inputs.iter_uzf_perioddata(),
+                previous=sagehen_inputs.uzf_perioddata[0],
+            )
+            mf6write.write_period_files(
+                os.path.join(sim.simulation_data.mfpath.get_sim_path(), uzf.filename),
+                periods,
+                index_fields=("iuzno",),
+            )
+            # the uzf file is complete, save its size and modification time
+            manifest.save()
+
+# Outputs of a run. They are removed before the model runs, so a run that
+# fails or does not write an output is never summarized with the outputs
+# of an earlier run in the same workspace
+
+run_outputs = ("*.lst", "*.hds", "*.bud", "*.obs.bin", "*.bmi.npz")
+
+
+def remove_outputs(sim):
+    sim_ws = sim.simulation_data.mfpath.get_sim_path()
+    if not os.path.isdir(sim_ws):
+        return
+    for fname in os.listdir(sim_ws):
+        if any(fnmatch.fnmatch(fname, pattern) for pattern in run_outputs):
+            os.remove(os.path.join(sim_ws, fname))
 
 # Function to run the model. True is returned if the model runs successfully
 
-def run_model(sim, silent=True):
+def run_model(sim, silent=True, run_config=None):
+    rc = run_config or config.run_config
     success = True
-    if config.runModel:
+    if rc.run:
         success = False
-        success, buff = sim.run_simulation(silent=silent)
-        if not success:
-            print(buff)
+        remove_outputs(sim)
+        if rc.bmi and os.path.isfile(config.libmf6):
+            success, converged = run_bmi(sim, run_config=rc)
+        else:
+            # mf6 runs as a subprocess and the stress period, time step and
+            # solver iterations are reported while it runs, less often when
+            # silent
+            tdis_rc = list(zip(perlen, nstp, tsmult))
+            success, buff, progress = mf6run.run(
+                mf6exe,
+                sim.simulation_data.mfpath.get_sim_path(),
+                perioddata=tdis_rc,
+                interval=30.0 if silent else 1.0,
+            )
+            if not success:
+                print(buff)
+            converged = success and steady_state_converged(sim)
+        # mf6 continues after time steps that fail to converge, so the
+        # heads are only cached if the steady-state stress period converged
+        if converged and spinup_cache:
+            save_spinup(sim, run_config=rc)
     return success
 
+# Function to run the model in-process through the MODFLOW 6 BMI
+#
+# Infiltration is written to UZF every day of the transient stress period
+# and the heads at the SFR reach cells and the SFR reach outflows are read
+# back from the MODFLOW 6 memory. The saved results are written once, at
+# the end of the run. The MODFLOW 6 state is saved every checkpoint_interval
+# days and a run that was interrupted resumes from the last checkpoint.
+# The checkpoints are kept in the base workspace, a tmpfs workspace is
+# removed when the run stops.
+
+def run_bmi(sim, run_config=None):
+    rc = run_config or config.run_config
+    inputs = sagehen_inputs
+    sim_ws = sim.simulation_data.mfpath.get_sim_path()
+    gwfname = sim.model_names[0]
+
+    # steady-state infiltration of every uzf cell, zero below land surface.
+    # The land surface cells are the first rows of the uzf cells and their
+    # daily infiltration is scaled by the precipitation of the cell
+    finf = np.zeros(inputs.nuzfcells)
+    pd0 = inputs.uzf_perioddata[0]
+    finf[pd0["iuzno"]] = pd0["finf"]
+    nland = inputs.hru_map.nrow
+
+    def infiltration(t, sinf):
+        day = int(t) - perlen[0]
+        if day >= 0:
+            np.multiply(
+                finf[:nland],
+                inputs.cell_precip_scale(day),
+                out=sinf[:nland],
+            )
+
+    # a checkpoint is only resumed by a run with the same input files and
+    # infiltration
+    key = hashlib.blake2b(digest_size=16)
+    fpth = mf6write.PackageManifest(sim).fpth
+    if os.path.isfile(fpth):
+        with open(fpth, "rb") as f:
+            key.update(f.read())
+    key.update(inputs.hru_precip.tobytes())
+    key.update(inputs.hru_map.cell_matrix.data.tobytes())
+    checkpoint = os.path.join(
+        rc.base_ws,
+        arraycache.cache_dirname,
+        "{}-{}.checkpoint.npz".format(os.path.basename(sim_ws), gwfname),
+    )
+    os.makedirs(os.path.dirname(checkpoint), exist_ok=True)
+
+    driver = mf6bmi.Mf6BmiDriver(config.libmf6, sim_ws, gwfname)
+    try:
+        driver.initialize()
+        reaches = inputs.sfr_reaches
+        cellids = np.column_stack(
+            (reaches.krch - 1, reaches.irch - 1, reaches.jrch - 1)
+        )
+        results = driver.run(
+            infiltration=infiltration,
+            head_index=driver.node_index(cellids),
+            reaches=np.arange(len(reaches)),
+            checkpoint=checkpoint,
+            checkpoint_interval=checkpoint_interval,
+            key=key.hexdigest(),
+        )
+    finally:
+        driver.finalize()
+
+    np.savez(
+        os.path.join(sim_ws, "{}.bmi.npz".format(gwfname)),
+        times=results["times"],
+        head=results["head"],
+        qoutflow=results["qoutflow"],
+    )
+    # like mf6 with the continue option, time steps that fail to converge
+    # are reported but do not stop the simulation. The second value
+    # indicates if the steady-state stress period converged
+    return True, bool(results["converged"][: nstp[0]].all())
+
 # Function to plot the model results
 
-def plot_results(mf6, idx):
-    if config.plotModel:
+def plot_results(mf6, idx, run_config=None):
+    rc = run_config or config.run_config
+    if rc.plot:
         print("Plotting model results...")
         sim_name = mf6.name
-        fs = USGSFigure(figure_type="graph", verbose=False)
+        plt = config.pyplot()
+        fs = figspecs.USGSFigure(figure_type="graph", verbose=False)
         
         # Generate a plot of FINF distribution
-        finf_plt = finf.copy()
-        finf_plt[idomain1 == 0] = np.nan
+        finf_plt = sagehen_inputs.finf.copy()
+        finf_plt[sagehen_inputs.idomain1 == 0] = np.nan
         
         fig = plt.figure(figsize=figure_size, dpi=300, tight_layout=True)
         ax = fig.add_subplot(1, 1, 1)
@@ -1242,11 +1039,10 @@ def plot_results(mf6, idx):
         fs.heading(heading=title)
         
         # save figure
-        if config.plotSave:
+        if rc.plot_save:
             fpth = os.path.join(
-                "..",
-                "figures",
-                "{}{}".format(sim_name + "-finfFact", config.figure_ext),
+                config.work_directory("figures"),
+                "{}{}".format(sim_name + "-finfFact", rc.figure_ext),
             )
             fig.savefig(fpth)
 
@@ -1260,13 +1056,201 @@ def plot_results(mf6, idx):
 #
 
 
-def scenario(idx, silent=True):
-    sim = build_model(example_name)
-    write_model(sim, silent=silent)
-    success = run_model(sim, silent=silent)
+def scenario(idx, silent=True, run_config=None):
+    rc = run_config or config.run_config
+    sim = build_model(example_name, run_config=rc)
+    try:
+        write_model(sim, silent=silent, run_config=rc)
+        success = run_model(sim, silent=silent, run_config=rc)
+    finally:
+        # only the selected outputs of a tmpfs workspace are kept
+        rc.copy_back(sim.simulation_data.mfpath.get_sim_path())
 
     if success:
-        plot_results(sim, idx)
+        plot_results(sim, idx, run_config=rc)
+
+
+# ### Ensemble of parameter scenarios
+#
+# Each ensemble member is a dictionary that overrides the parameters defined
+# at the top of this script. Every member is built, written, run and
+# post-processed in its own workspace (ex-gwf-sagehen-gsf-m000, ...) by a
+# process pool sized to the available cores, and the summary metrics of
+# all members are saved in ../tables. Run the ensemble with -en, and add -tm
+# to place the member workspaces on tmpfs and only copy their listing and
+# observation files to ../examples. rclose is not a member parameter, the
+# solver uses a fixed relative rclose.
+
+ensemble_parameters = (
+    "rhk",
+    "surfdep",
+    "k11_mult",
+    "nouter",
+    "ninner",
+    "hclose",
+    "relax",
+    "ims_options",
+)
+
+ensemble_members = [
+    {},
+    {"rhk": 1.0},
+    {"rhk": 10.0},
+    {"surfdep": 0.5},
+    {"k11_mult": 0.5},
+    {"k11_mult": 2.0},
+    {"hclose": 1e-4},
+]
+
+# Function to summarize the results of an ensemble member
+
+def summarize_run(sim):
+    inputs = sagehen_inputs
+    sim_ws = sim.simulation_data.mfpath.get_sim_path()
+    gwfname = sim.model_names[0]
+    metrics = {}
+
+    # mean and range of the final heads in the active cells
+    fpth = os.path.join(sim_ws, "{}.hds".format(gwfname))
+    if os.path.isfile(fpth):
+        hobj = mf6bin.read_head(fpth)
+        head = np.array(hobj.get_data())
+        hobj.close()
+        active = np.array(inputs.idomain) > 0
+        metrics["mean_head"] = head[active].mean()
+        metrics["min_head"] = head[active].min()
+        metrics["max_head"] = head[active].max()
+
+    # largest volumetric budget discrepancy
+    fpth = os.path.join(sim_ws, "{}.lst".format(gwfname))
+    if os.path.isfile(fpth):
+        budget = mf6lst.read_listing(fpth).budget
+        metrics["max_discrepancy"] = np.abs(budget["PERCENT_DISCREPANCY"]).max()
+
+    # solver iterations and run time
+    fpth = os.path.join(sim_ws, "mfsim.lst")
+    if os.path.isfile(fpth):
+        lst = mf6lst.read_listing(fpth)
+        solver = lst.solver
+        if solver:
+            metrics["outer"] = solver["outer"].sum()
+            metrics["inner"] = solver["inner"].sum()
+        metrics["nfail"] = lst.nfail
+        metrics["elapsed"] = lst.elapsed
+
+    # mean outflow from the reaches without a downstream connection, from
+    # the sfr budget file or from the results saved by run_bmi
+    outlets = [
+        i
+        for i, conn in enumerate(inputs.conns)
+        if not any(c < 0 for c in conn[1:])
+    ]
+    fpth = os.path.join(sim_ws, "{}.sfr.bud".format(gwfname))
+    npz_pth = os.path.join(sim_ws, "{}.bmi.npz".format(gwfname))
+    if os.path.isfile(fpth):
+        cbc = mf6bin.read_budget(fpth)
+        _, outflow = cbc.reduce("EXT-OUTFLOW", ids=np.array(outlets) + 1)
+        cbc.close()
+        metrics["mean_outflow"] = -outflow.mean()
+    elif os.path.isfile(npz_pth):
+        with np.load(npz_pth) as results:
+            qoutflow = results["qoutflow"][:, outlets]
+        metrics["mean_outflow"] = -qoutflow.sum(axis=1).mean()
+
+    # daily outflow at the basin outlet gage compared with the measured
+    # runoff in sagehen.data (cfs), from the stream gage observations. It
+    # is skipped if the outlet reach has no gage
+    fpth = os.path.join(sim_ws, "{}.sfr.obs.bin".format(gwfname))
+    if (
+        os.path.isfile(fpth)
+        and outlets
+        and outlets[0] in inputs.gage_reaches
+    ):
+        obs = mf6bin.read_obs(fpth)
+        outlet = inputs.gages[inputs.gage_reaches.index(outlets[0])]
+        simulated = -obs.get_data("gage{}_q".format(outlet.unit))
+        simulated = simulated[obs.get_times() > perlen[0]]
+        end = np.datetime64(start_date) + (simulated.size - 1)
+        runoff = inputs.climate.get("runoff", start_date, end)[:, 0]
+        measured = runoff.astype(np.float64) * 0.3048**3 * 86400.0
+        valid = runoff >= 0.0
+        if valid.any() and valid.size == simulated.size:
+            simulated, measured = simulated[valid], measured[valid]
+            metrics["mean_gage_outflow"] = simulated.mean()
+            metrics["mean_runoff"] = measured.mean()
+            metrics["nse_runoff"] = 1.0 - (
+                ((simulated - measured) ** 2).sum()
+                / ((measured - measured.mean()) ** 2).sum()
+            )
+
+    # mean infiltration over the basin
+    fpth = os.path.join(sim_ws, "{}.uzf.bud".format(gwfname))
+    if os.path.isfile(fpth):
+        cbc = mf6bin.read_budget(fpth)
+        _, infiltration = cbc.reduce("INFILTRATION")
+        cbc.close()
+        metrics["mean_infiltration"] = infiltration.mean()
+    return metrics
+
+# Function that builds, writes, runs and summarizes one ensemble member.
+# It is called in a worker process, the overridden parameters and the
+# inputs that depend on them are restored when the member is done
+
+def ensemble_member(idx, member, silent=True, run_config=None):
+    global sagehen_inputs
+    rc = run_config or config.run_config
+    unknown = set(member) - set(ensemble_parameters)
+    if unknown:
+        raise ValueError(
+            "unknown ensemble parameters: {}".format(", ".join(sorted(unknown)))
+        )
+    saved = {name: globals()[name] for name in member}
+    saved_inputs = sagehen_inputs
+    globals().update(member)
+    sagehen_inputs = SagehenInputs(dat_pth)
+    try:
+        row = {"member": idx}
+        row.update({name: globals()[name] for name in ensemble_parameters})
+        t0 = time.perf_counter()
+        sim_name = "{}-m{:03d}".format(example_name, idx)
+        sim = build_model(sim_name, run_config=rc)
+        sim_ws = sim.simulation_data.mfpath.get_sim_path()
+        try:
+            t1 = time.perf_counter()
+            write_model(sim, silent=silent, run_config=rc)
+            t2 = time.perf_counter()
+            success = run_model(sim, silent=silent, run_config=rc)
+            t3 = time.perf_counter()
+            row.update(
+                success=success,
+                build_time=t1 - t0,
+                write_time=t2 - t1,
+                run_time=t3 - t2,
+            )
+            if success and rc.run:
+                row.update(summarize_run(sim))
+        finally:
+            rc.copy_back(sim_ws)
+    finally:
+        globals().update(saved)
+        sagehen_inputs = saved_inputs
+    return row
+
+# Function to run the ensemble and save the summary table
+
+def run_ensemble(members=None, max_workers=None, run_config=None):
+    if members is None:
+        members = ensemble_members
+    rows = ensemble.run_ensemble(
+        functools.partial(ensemble_member, run_config=run_config),
+        members,
+        max_workers=max_workers,
+    )
+    fpth = os.path.join(
+        config.work_directory("tables"), "{}-ensemble.csv".format(example_name)
+    )
+    ensemble.write_table(fpth, rows)
+    return rows
 
 
 # nosetest - exclude block from this nosetest to the next nosetest
@@ -1281,4 +1265,7 @@ if __name__ == "__main__":
     #
     # Two-dimensional transport in a uniform flow field
 
-    scenario(0)
+    if config.run_config.ensemble:
+        run_ensemble()
+    else:
+        scenario(0)
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "common"))
+import arraycache
+
+
+def counting_loader(calls):
+    def loader(fpth):
+        calls.append(fpth)
+        return np.loadtxt(fpth)
+
+    return loader
+
+
+def write_text(fpth, arr, mtime_ns):
+    np.savetxt(fpth, arr, fmt="%.1f")
+    os.utime(fpth, ns=(mtime_ns, mtime_ns))
+
+
+def test_load_array_cache_hit(tmp_path):
+    fpth = str(tmp_path / "array.txt")
+    arr = np.arange(6.0).reshape(2, 3)
+    write_text(fpth, arr, 10**18)
+    calls = []
+    first = arraycache.load_array(fpth, loader=counting_loader(calls))
+    second = arraycache.load_array(fpth, loader=counting_loader(calls))
+    assert len(calls) == 1
+    assert np.array_equal(first, arr)
+    assert np.array_equal(second, arr)
+    # the cached array is a read-only memory map of the .npy file
+    assert not second.flags.writeable
+    assert os.path.isdir(tmp_path / arraycache.cache_dirname)
+
+
+def test_load_array_rewritten_file(tmp_path):
+    fpth = str(tmp_path / "array.txt")
+    write_text(fpth, np.zeros((2, 3)), 10**18)
+    calls = []
+    arraycache.load_array(fpth, loader=counting_loader(calls))
+    # same size, different contents and modification time
+    arr = np.full((2, 3), 5.0)
+    write_text(fpth, arr, 2 * 10**18)
+    for hash_contents in (True, False):
+        result = arraycache.load_array(
+            fpth, loader=counting_loader(calls), hash_contents=hash_contents
+        )
+        assert np.array_equal(result, arr)
+    assert len(calls) == 2
+
+
+def test_load_array_hash_contents(tmp_path):
+    fpth = str(tmp_path / "array.txt")
+    arr = np.arange(6.0).reshape(2, 3)
+    write_text(fpth, arr, 10**18)
+    calls = []
+    arraycache.load_array(fpth, loader=counting_loader(calls))
+
+    # touched but unchanged - the content hash matches and the cache is used
+    os.utime(fpth, ns=(2 * 10**18, 2 * 10**18))
+    result = arraycache.load_array(fpth, loader=counting_loader(calls))
+    assert len(calls) == 1
+    assert np.array_equal(result, arr)
+
+    # without hashing a touched file is parsed again
+    os.utime(fpth, ns=(3 * 10**18, 3 * 10**18))
+    arraycache.load_array(
+        fpth, loader=counting_loader(calls), hash_contents=False
+    )
+    assert len(calls) == 2
+
+
+def test_load_array_key(tmp_path):
+    fpth = str(tmp_path / "array.txt")
+    write_text(fpth, np.arange(6.0).reshape(2, 3), 10**18)
+    flat = arraycache.load_array(fpth, loader=lambda f: np.loadtxt(f).ravel())
+    table = arraycache.load_array(fpth, key="2d")
+    assert flat.shape == (6,)
+    assert table.shape == (2, 3)
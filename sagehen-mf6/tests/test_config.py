@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "common"))
+import config
+import mf6write
+
+
+def build_sim(ws, k=1.0):
+    import flopy
+
+    sim = flopy.mf6.MFSimulation(sim_name="tmpfs", sim_ws=ws)
+    flopy.mf6.ModflowTdis(sim)
+    flopy.mf6.ModflowIms(sim)
+    gwf = flopy.mf6.ModflowGwf(sim, modelname="gwf")
+    flopy.mf6.ModflowGwfdis(gwf, nrow=2, ncol=3)
+    flopy.mf6.ModflowGwfic(gwf)
+    flopy.mf6.ModflowGwfnpf(gwf, k=k)
+    return sim
+
+
+def write_changed(sim):
+    manifest = mf6write.PackageManifest(sim)
+    changed = manifest.changed()
+    manifest.write(changed)
+    return changed
+
+
+def test_disk_tmpfs_disk(tmp_path):
+    disk = config.RunConfig(base_ws=str(tmp_path / "examples"))
+    tmpfs = disk.replace(tmpfs=str(tmp_path / "shm"))
+
+    # run on disk
+    sim_ws = disk.workspace("sim")
+    assert write_changed(build_sim(sim_ws)) != []
+    assert disk.copy_back(sim_ws) == []
+    with open(os.path.join(sim_ws, "gwf.npf")) as f:
+        npf = f.read()
+
+    # run on tmpfs with other inputs, only the outputs are copied back
+    tmpfs_ws = tmpfs.workspace("sim")
+    assert os.path.dirname(tmpfs_ws) == tmpfs.tmpfs_root
+    assert len(write_changed(build_sim(tmpfs_ws, k=2.0))) == 7
+    for fname in ("mfsim.lst", "gwf.lst", "gwf.obs.bin"):
+        with open(os.path.join(tmpfs_ws, fname), "w") as f:
+            f.write("output")
+    assert tmpfs.copy_back(tmpfs_ws) == ["gwf.lst", "gwf.obs.bin", "mfsim.lst"]
+    assert not os.path.isdir(tmpfs.tmpfs_root)
+    assert os.path.isfile(os.path.join(sim_ws, "gwf.lst"))
+    with open(os.path.join(sim_ws, "gwf.npf")) as f:
+        assert f.read() == npf
+
+    # the next run on disk with the tmpfs inputs writes the changed package
+    assert write_changed(build_sim(sim_ws, k=2.0)) == ["gwf.npf"]
+    with open(os.path.join(sim_ws, "gwf.npf")) as f:
+        assert f.read() != npf
+    assert write_changed(build_sim(sim_ws, k=2.0)) == []
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "common"))
+import gsflow
+
+# two HRUs over a 2 x 2 grid. HRU 1 covers cell 1 and half of cells 2 and
+# 4, HRU 2 covers the other halves and cell 3, which is not a UZF cell
+hru_id = [1, 1, 1, 2, 2, 2]
+cell_id = [1, 2, 4, 2, 3, 4]
+hru_pct = [0.5, 0.25, 0.25, 0.25, 0.5, 0.25]
+cell_pct = [1.0, 0.5, 0.5, 0.5, 1.0, 0.5]
+cell_index = np.array([[0, 1], [-1, 2]])
+
+
+def test_hru_cell_map():
+    hru_map = gsflow.HruCellMap(
+        hru_id, cell_id, hru_pct, cell_pct, cell_index
+    )
+    assert hru_map.nhru == 2
+    assert hru_map.nrow == 3
+    assert hru_map.nunmapped == 1
+
+    # rates per unit area are area weighted
+    assert np.allclose(hru_map.to_cells(np.array([2.0, 4.0])), [2.0, 3.0, 3.0])
+    # a uniform rate stays uniform
+    values = np.ones((2, 3))
+    assert np.allclose(hru_map.to_cells(values), 1.0)
+
+    # the transpose product with the fraction of the hru area in each cell
+    assert np.allclose(
+        hru_map.to_hrus(np.array([1.0, 2.0, 3.0])), [1.75, 1.25]
+    )
@@ -0,0 +1,369 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "common"))
+import mf6bin
+
+# (kstp, kper, pertim, totim) of the saved times
+head_times = [(1, 1, 1.0, 1.0), (1, 2, 1.0, 2.0), (2, 2, 3.0, 4.0)]
+
+
+def write_head(fpth, heads, realtype=np.float64, times=head_times, mode="wb"):
+    """Write (ntimes, nlay, nrow, ncol) heads like MODFLOW 6"""
+    header_dtype = mf6bin._array_header[realtype]
+    text = b"HEAD".rjust(16)
+    with open(fpth, mode) as f:
+        for (kstp, kper, pertim, totim), head in zip(times, heads):
+            for ilay, layer in enumerate(head, start=1):
+                nrow, ncol = layer.shape
+                header = np.array(
+                    (kstp, kper, pertim, totim, text, ncol, nrow, ilay),
+                    dtype=header_dtype,
+                )
+                f.write(header.tobytes())
+                f.write(layer.astype(realtype).tobytes())
+
+
+def synthetic_heads(ntimes=3, shape=(2, 3, 4)):
+    return np.arange(ntimes * np.prod(shape), dtype=float).reshape(
+        (ntimes,) + shape
+    ) / 8.0
+
+
+def count_scans(monkeypatch, cls):
+    scans = []
+    scan = cls._scan
+
+    def counting_scan(self, fpth):
+        scans.append(fpth)
+        return scan(self, fpth)
+
+    monkeypatch.setattr(cls, "_scan", counting_scan)
+    return scans
+
+
+@pytest.mark.parametrize("realtype", [np.float64, np.float32])
+def test_head_file_round_trip(tmp_path, realtype):
+    import flopy
+
+    fpth = str(tmp_path / "model.hds")
+    heads = synthetic_heads()
+    write_head(fpth, heads, realtype)
+    hds = mf6bin.read_head(fpth)
+    assert hds.precision == ("double" if realtype == np.float64 else "single")
+    assert hds.ntimes == 3
+    assert hds.nlay == 2
+    assert hds.get_times() == [1.0, 2.0, 4.0]
+    assert hds.get_kstpkper() == [(0, 0), (0, 1), (1, 1)]
+    # records of the same shape are read through one strided view
+    assert hds._view is not None
+    assert np.array_equal(hds.get_data(), heads[-1])
+    assert np.array_equal(hds.get_data(0), heads[0])
+    assert np.array_equal(hds.get_data(kstpkper=(0, 1)), heads[1])
+    assert np.array_equal(hds.get_data(totim=4.0), heads[2])
+    with pytest.raises(ValueError, match="not a saved time"):
+        hds.get_data(totim=3.0)
+
+    cellids = [(0, 1, 2), (1, 2, 3)]
+    ts = hds.get_ts(cellids)
+    assert ts[:, 0].tolist() == [1.0, 2.0, 4.0]
+    assert np.array_equal(ts[:, 1], heads[:, 0, 1, 2])
+    assert np.array_equal(ts[:, 2], heads[:, 1, 2, 3])
+
+    # same values as the flopy reader
+    ref = flopy.utils.HeadFile(fpth, precision=hds.precision)
+    for kstpkper in ref.get_kstpkper():
+        head = hds.get_data(kstpkper=kstpkper)
+        assert np.array_equal(head, ref.get_data(kstpkper=kstpkper))
+    assert np.array_equal(ts, ref.get_ts(cellids))
+    hds.close()
+
+
+def test_head_file_irregular_records(tmp_path):
+    fpth = str(tmp_path / "model.hds")
+    heads = synthetic_heads()
+    write_head(fpth, heads)
+    # a last time with a different grid, the records are not evenly spaced
+    small = np.ones((1, 2, 2, 2))
+    write_head(fpth, small, times=[(3, 2, 6.0, 7.0)], mode="ab")
+    hds = mf6bin.read_head(fpth, cache=False)
+    assert hds._view is None
+    assert hds.ntimes == 4
+    assert np.array_equal(hds.get_data(1), heads[1])
+    assert np.array_equal(hds.get_data(), small[0])
+
+    # a truncated header or array
+    size = os.path.getsize(fpth)
+    for nbytes in (8, 60):
+        with open(fpth, "r+b") as f:
+            f.truncate(size - nbytes)
+        with pytest.raises(ValueError, match="incomplete record"):
+            mf6bin.read_head(fpth, cache=False)
+
+
+def test_head_file_index_cache(tmp_path, monkeypatch):
+    fpth = str(tmp_path / "model.hds")
+    heads = synthetic_heads()
+    write_head(fpth, heads)
+    scans = count_scans(monkeypatch, mf6bin.HeadFile)
+    mf6bin.read_head(fpth).close()
+    hds = mf6bin.read_head(fpth)
+    assert len(scans) == 1
+    assert np.array_equal(hds.get_data(), heads[-1])
+    hds.close()
+
+    # a new run with more saved times is scanned again
+    heads = synthetic_heads(ntimes=2) + 100.0
+    write_head(fpth, heads)
+    hds = mf6bin.read_head(fpth)
+    assert len(scans) == 2
+    assert hds.ntimes == 2
+    assert np.array_equal(hds.get_data(), heads[-1])
+    hds.close()
+
+
+# (kstp, kper, delt, pertim, totim) of the saved budget times
+budget_times = [
+    (1, 1, 1.0, 1.0, 1.0),
+    (1, 2, 2.0, 2.0, 3.0),
+    (2, 2, 2.0, 4.0, 5.0),
+]
+
+
+def write_budget(fpth, records, realtype=np.float64, mode="wb"):
+    """Write budget records like MODFLOW 6 with compact headers
+
+    records is a list of (time, text, data, names) tuples, where time is an
+    entry of budget_times. data is a (nlay, nrow, ncol) array for imeth 1,
+    or a structured array with id1, id2, q and auxiliary fields for imeth 6
+    with names (modelnam, paknam, modelnam2, paknam2).
+    """
+    real = np.dtype(realtype)
+    with open(fpth, mode) as f:
+        for (kstp, kper, delt, pertim, totim), text, data, names in records:
+            if names is None:
+                imeth = 1
+                nlay, nrow, ncol = data.shape
+            else:
+                imeth = 6
+                nlay, nrow, ncol = 1, 1, data.size
+            f.write(np.array([kstp, kper], dtype="<i4").tobytes())
+            f.write(text.encode().rjust(16))
+            dims = np.array([ncol, nrow, -nlay, imeth], dtype="<i4")
+            f.write(dims.tobytes())
+            f.write(np.array([delt, pertim, totim], dtype=real).tobytes())
+            if imeth == 1:
+                f.write(data.astype(real).tobytes())
+                continue
+            for name in names:
+                f.write(name.encode().ljust(16))
+            auxnames = data.dtype.names[3:]
+            f.write(np.array([1 + len(auxnames)], dtype="<i4").tobytes())
+            for name in auxnames:
+                f.write(name.upper().encode().ljust(16))
+            f.write(np.array([data.size], dtype="<i4").tobytes())
+            dtype = [("id1", "<i4"), ("id2", "<i4")] + [
+                (name, real) for name in data.dtype.names[2:]
+            ]
+            f.write(data.astype(dtype).tobytes())
+
+
+def list_data(id1, q, aux=None):
+    fields = [("id1", "<i4"), ("id2", "<i4"), ("q", "<f8")]
+    if aux is not None:
+        fields.append(("flow-area", "<f8"))
+    data = np.zeros(len(id1), dtype=fields)
+    data["id1"] = id1
+    data["id2"] = id1
+    data["q"] = q
+    if aux is not None:
+        data["flow-area"] = aux
+    return data
+
+
+def budget_records():
+    sto = synthetic_heads()
+    chd = ("GWF", "GWF", "GWF", "CHD-1")
+    wel = ("GWF", "GWF", "GWF", "WEL-2")
+    records = []
+    for i, time in enumerate(budget_times):
+        chd_data = list_data([1, 5, 9], [1.0, 2.0, 3.0 + i])
+        wel_data = list_data([2, 4], [-1.0, -2.0 - i], [10.0, 20.0])
+        records.append((time, "STO-SS", sto[i], None))
+        records.append((time, "CHD", chd_data, chd))
+        records.append((time, "WEL", wel_data, wel))
+    return sto, records
+
+
+def test_budget_file_round_trip(tmp_path):
+    import flopy
+
+    fpth = str(tmp_path / "model.bud")
+    sto, records = budget_records()
+    write_budget(fpth, records)
+    cbc = mf6bin.read_budget(fpth)
+    assert cbc.get_record_names() == ["STO-SS", "CHD", "WEL"]
+    assert cbc.get_times() == [1.0, 3.0, 5.0]
+    assert cbc.get_kstpkper() == [(0, 0), (0, 1), (1, 1)]
+    assert cbc.index["delt"].tolist() == [1.0] * 3 + [2.0] * 6
+
+    # array records
+    assert np.array_equal(cbc.get_data("sto-ss"), sto[-1])
+    assert np.array_equal(cbc.get_data("STO-SS", totim=1.0), sto[0])
+    assert np.array_equal(cbc.get_term("STO-SS"), sto)
+    # list records with the auxiliary variables
+    chd = cbc.get_data("CHD", idx=0)
+    assert chd["id1"].tolist() == [1, 5, 9]
+    assert chd["q"].tolist() == [1.0, 2.0, 3.0]
+    wel = cbc.get_data("WEL", paknam="wel-2")
+    assert wel.dtype.names == ("id1", "id2", "q", "flow-area")
+    assert wel["flow-area"].tolist() == [10.0, 20.0]
+    assert cbc.get_term("WEL").tolist() == [
+        [-1.0, -2.0],
+        [-1.0, -3.0],
+        [-1.0, -4.0],
+    ]
+    flow_area = cbc.get_term("WEL", field="flow-area")
+    assert flow_area.tolist() == [[10.0, 20.0]] * 3
+    with pytest.raises(ValueError, match="CHD WEL-2 is not in"):
+        cbc.find("CHD", paknam="WEL-2")
+    with pytest.raises(ValueError, match="not saved at time"):
+        cbc.get_data("CHD", totim=2.0)
+
+    # reductions of ids of list records and of nodes of array records
+    totim, q = cbc.reduce("CHD")
+    assert totim.tolist() == [1.0, 3.0, 5.0]
+    assert q.tolist() == [6.0, 7.0, 8.0]
+    assert cbc.reduce("CHD", ids=[5, 9])[1].tolist() == [5.0, 6.0, 7.0]
+    _, smax = cbc.reduce("STO-SS", ids=[1, 24], func=np.max)
+    assert smax.tolist() == sto.reshape(3, -1)[:, 23].tolist()
+
+    # same values as the flopy reader
+    ref = flopy.utils.CellBudgetFile(fpth, precision="double")
+    for idx, kstpkper in enumerate(ref.get_kstpkper()):
+        (ref_sto,) = ref.get_data(text="STO-SS", kstpkper=kstpkper)
+        assert np.array_equal(cbc.get_data("STO-SS", idx=idx), ref_sto)
+        (ref_wel,) = ref.get_data(text="WEL", kstpkper=kstpkper)
+        assert np.array_equal(cbc.get_data("WEL", idx=idx)["q"], ref_wel["q"])
+    cbc.close()
+
+
+def test_budget_file_irregular_records(tmp_path):
+    fpth = str(tmp_path / "model.bud")
+    sto, records = budget_records()
+    # the first time has a second CHD package, so the records of a term are
+    # not evenly spaced and are read one at a time
+    chd2 = ("GWF", "GWF", "GWF", "CHD-2")
+    records.insert(2, (budget_times[0], "CHD", list_data([3], [7.0]), chd2))
+    write_budget(fpth, records, realtype=np.float32)
+    cbc = mf6bin.read_budget(fpth, precision="single", cache=False)
+    assert cbc._regular_view(cbc.index[cbc.find("STO-SS")], "q") is None
+    assert np.array_equal(cbc.get_term("STO-SS"), sto.astype(np.float32))
+    assert cbc.get_term("CHD", paknam="CHD-1").tolist() == [
+        [1.0, 2.0, 3.0],
+        [1.0, 2.0, 4.0],
+        [1.0, 2.0, 5.0],
+    ]
+    assert cbc.reduce("CHD")[1].tolist() == [6.0, 7.0, 7.0, 8.0]
+    assert cbc.get_data("CHD", paknam="CHD-2")["q"].tolist() == [7.0]
+
+    with open(fpth, "r+b") as f:
+        f.truncate(os.path.getsize(fpth) - 4)
+    with pytest.raises(ValueError, match="incomplete record"):
+        mf6bin.read_budget(fpth, precision="single", cache=False)
+
+
+def test_budget_file_index_cache(tmp_path, monkeypatch):
+    fpth = str(tmp_path / "model.bud")
+    sto, records = budget_records()
+    write_budget(fpth, records[:3])
+    scans = count_scans(monkeypatch, mf6bin.BudgetFile)
+    mf6bin.read_budget(fpth).close()
+    cbc = mf6bin.read_budget(fpth)
+    assert len(scans) == 1
+    assert cbc.get_times() == [1.0]
+    cbc.close()
+
+    # the file of a longer run is scanned again
+    write_budget(fpth, records)
+    cbc = mf6bin.read_budget(fpth)
+    assert len(scans) == 2
+    assert np.array_equal(cbc.get_data("STO-SS"), sto[-1])
+    cbc.close()
+
+
+def obs_bytes(names, values, realtype=np.float64, lenobsname=40):
+    """Return a MODFLOW 6 binary observation file as bytes
+
+    values is a (nrecords, 1 + nobs) array with totim in the first column.
+    """
+    precision = "double" if realtype == np.float64 else "single"
+    header = "cont {}{}".format(precision, lenobsname).ljust(100).encode()
+    header += np.array([len(names)], dtype="<i4").tobytes()
+    header += b"".join(name.encode().ljust(lenobsname) for name in names)
+    return header + np.asarray(values, dtype=realtype).tobytes()
+
+
+obs_names = ["gage_1", "hd_12"]
+obs_values = np.array([[1.0, 0.5, 10.0], [2.0, 0.75, 11.0], [3.0, 1.0, 12.5]])
+
+
+@pytest.mark.parametrize("realtype", [np.float64, np.float32])
+def test_obs_file_round_trip(tmp_path, realtype):
+    import flopy
+
+    fpth = tmp_path / "model.obs.bin"
+    fpth.write_bytes(obs_bytes(obs_names, obs_values, realtype))
+    obs = mf6bin.read_obs(str(fpth))
+    assert obs.precision == ("double" if realtype == np.float64 else "single")
+    assert obs.names == ["GAGE_1", "HD_12"]
+    assert obs.nobs == 2
+    assert obs.data.dtype["totim"] == realtype
+    assert obs.get_times().tolist() == [1.0, 2.0, 3.0]
+    assert obs.get_data("Gage_1").tolist() == [0.5, 0.75, 1.0]
+    assert obs.get_data("HD_12").tolist() == [10.0, 11.0, 12.5]
+    with pytest.raises(ValueError, match="HD_13 is not in"):
+        obs.get_data("HD_13")
+
+    # same values as the flopy reader
+    ref = flopy.utils.Mf6Obs(str(fpth), isBinary=True).get_data()
+    assert np.array_equal(obs.get_times(), ref["totim"])
+    for name in obs_names:
+        assert np.array_equal(obs.get_data(name), ref[name])
+
+
+def test_obs_file_update(tmp_path):
+    fpth = tmp_path / "model.obs.bin"
+    data = obs_bytes(obs_names, obs_values)
+    header = 104 + 2 * 40
+    record = 3 * 8
+
+    # the file is not written yet, or only part of the header is
+    obs = mf6bin.read_obs(str(fpth))
+    assert obs.nobs == 0
+    assert obs.data.size == 0
+    for end in (50, 102, header - 1):
+        fpth.write_bytes(data[:end])
+        assert obs.update().size == 0
+        assert obs.nobs == 0
+
+    # only complete records are read
+    fpth.write_bytes(data[: header + record + 10])
+    assert obs.update().tolist() == [tuple(obs_values[0])]
+    assert obs.nobs == 2
+    assert obs.update().size == 0
+    fpth.write_bytes(data)
+    new = obs.update()
+    assert new["totim"].tolist() == [2.0, 3.0]
+    assert obs.get_times().tolist() == [1.0, 2.0, 3.0]
+    assert obs.get_data("GAGE_1").tolist() == [0.5, 0.75, 1.0]
+
+
+def test_obs_file_not_continuous(tmp_path):
+    fpth = tmp_path / "model.obs.bin"
+    fpth.write_bytes(b"single".ljust(120))
+    with pytest.raises(ValueError, match="not a continuous observation file"):
+        mf6bin.read_obs(str(fpth))
@@ -0,0 +1,81 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "common"))
+import mf6bmi
+
+
+class FakeXmi:
+    """Memory of a MODFLOW 6 simulation with the xmipy get/set interface"""
+
+    def __init__(self):
+        self.memory = {
+            "TDIS/KPER": ("INTEGER", np.array([2])),
+            "TDIS/KSTP": ("INTEGER", np.array([10])),
+            "TDIS/TOTIM": ("DOUBLE", np.array([11.0])),
+            "TDIS/NPER": ("INTEGER", np.array([2])),
+            "GWF/X": ("DOUBLE (2)", np.array([1.0, 2.0])),
+            "GWF/XOLD": ("DOUBLE (2)", np.array([1.0, 2.0])),
+            "GWF/IBOUND": ("INTEGER (2)", np.array([1, 1])),
+            "GWF/DIS/NODES": ("INTEGER", np.array([2])),
+            "GWF/UZF-1/NWAVST": ("INTEGER (1)", np.array([3])),
+            "GWF/UZF-1/IOUT": ("INTEGER", np.array([7])),
+            "GWF/SFR-1/STAGE": ("DOUBLE (1)", np.array([5.0])),
+            "SLN_1/MXITER": ("INTEGER", np.array([300])),
+            "SLN_1/DVCLOSE": ("DOUBLE", np.array([0.01])),
+            "OTHER/X": ("DOUBLE (1)", np.array([9.0])),
+        }
+
+    def get_input_var_names(self):
+        return list(self.memory)
+
+    def get_var_type(self, address):
+        return self.memory[address][0]
+
+    def get_value(self, address):
+        return self.memory[address][1].copy()
+
+    def set_value(self, address, value):
+        self.memory[address][1][...] = value
+
+
+def fake_driver():
+    driver = mf6bmi.Mf6BmiDriver("libmf6.so", ".", "gwf")
+    driver.mf6 = FakeXmi()
+    driver._addresses = None
+    return driver
+
+
+def test_state_is_doubles_and_state_integers():
+    driver = fake_driver()
+    assert sorted(driver.get_state()) == [
+        "GWF/IBOUND",
+        "GWF/SFR-1/STAGE",
+        "GWF/UZF-1/NWAVST",
+        "GWF/X",
+        "GWF/XOLD",
+        "SLN_1/DVCLOSE",
+        "TDIS/KPER",
+        "TDIS/KSTP",
+        "TDIS/TOTIM",
+    ]
+
+
+def test_set_state_restores_state_only():
+    driver = fake_driver()
+    state = driver.get_state()
+    memory = driver.mf6.memory
+    for _, value in memory.values():
+        value += 1
+    driver.set_state(state)
+    assert memory["TDIS/KSTP"][1][0] == 10
+    assert memory["TDIS/TOTIM"][1][0] == 11.0
+    assert memory["GWF/X"][1].tolist() == [1.0, 2.0]
+    assert memory["GWF/UZF-1/NWAVST"][1][0] == 3
+    # dimensions, options and file units are not overwritten
+    assert memory["TDIS/NPER"][1][0] == 3
+    assert memory["GWF/DIS/NODES"][1][0] == 3
+    assert memory["GWF/UZF-1/IOUT"][1][0] == 8
+    assert memory["SLN_1/MXITER"][1][0] == 301
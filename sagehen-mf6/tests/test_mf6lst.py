@@ -0,0 +1,163 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "common"))
+import mf6lst
+
+solver_text = """\
+ {outer} CALLS TO NUMERICAL SOLUTION IN TIME STEP {kstp} STRESS PERIOD {kper}
+ {inner} TOTAL ITERATIONS
+"""
+
+failed_text = """\
+ FAILED TO MEET SOLVER CONVERGENCE CRITERIA IN TIME STEP {kstp} OF STRESS \
+PERIOD {kper}
+"""
+
+budget_text = """\
+
+  VOLUME BUDGET FOR ENTIRE MODEL AT END OF TIME STEP    {kstp}, STRESS PERIOD   {kper}
+  ---------------------------------------------------------------------------
+
+     CUMULATIVE VOLUME      L**3       RATES FOR THIS TIME STEP      L**3/T          PACKAGE NAME
+     ------------------                 ------------------------                     ----------------
+
+           IN:                                      IN:
+           ---                                      ---
+                    CHD =         {cum:.4f}                      CHD =         {rate:.4f}     CHD-1
+                    UZF =          10.0000                      UZF =           1.0000     UZF-1
+                    UZF =           2.0000                      UZF =       1.5000-100     UZF-2
+
+     TOTAL IN =         {cum:.4f}                 TOTAL IN =         {rate:.4f}
+
+          OUT:                                     OUT:
+          ----                                     ----
+                    CHD =           5.0000                      CHD =           0.5000     CHD-1
+
+    TOTAL OUT =           5.0000                TOTAL OUT =           0.5000
+
+     IN - OUT =       1.0000E-02                 IN - OUT =       1.0000E-03
+
+ PERCENT DISCREPANCY =           0.01     PERCENT DISCREPANCY =           0.02
+
+"""
+
+time_text = """\
+ TIME SUMMARY AT END OF TIME STEP {kstp:4d} IN STRESS PERIOD {kper:4d}
+                    SECONDS     MINUTES      HOURS       DAYS        YEARS
+                    -----------------------------------------------------------
+   TIME STEP LENGTH  86400.      1440.0      24.000      {delt:.4f}     2.73785E-03
+ STRESS PERIOD TIME  86400.      1440.0      24.000      {delt:.4f}     2.73785E-03
+         TOTAL TIME  86400.      1440.0      24.000      {totim:.4f}     2.73785E-03
+
+"""
+
+elapsed_text = " Elapsed run time:  0 Days,  0 Hours,  1 Minutes, 30.500 Seconds\n"
+
+# (kper, kstp, outer, inner) of the time steps, the second one failed
+steps = [(1, 1, 12, 57), (2, 1, 3, 8), (2, 2, 2, 5)]
+
+
+def step_text(i):
+    kper, kstp, outer, inner = steps[i]
+    text = solver_text.format(kper=kper, kstp=kstp, outer=outer, inner=inner)
+    if i == 1:
+        text += failed_text.format(kper=kper, kstp=kstp)
+    text += budget_text.format(
+        kper=kper, kstp=kstp, cum=100.0 * (i + 1), rate=10.0 * (i + 1)
+    )
+    text += time_text.format(kper=kper, kstp=kstp, delt=1.0, totim=i + 1.0)
+    return text
+
+
+def listing_text():
+    return "".join(step_text(i) for i in range(len(steps))) + elapsed_text
+
+
+def check_listing(lst):
+    solver = lst.solver
+    assert solver["kper"].tolist() == [s[0] for s in steps]
+    assert solver["kstp"].tolist() == [s[1] for s in steps]
+    assert solver["outer"].tolist() == [s[2] for s in steps]
+    assert solver["inner"].tolist() == [s[3] for s in steps]
+    assert lst.nfail == 1
+
+    budget = lst.budget
+    assert budget["kper"].tolist() == [1, 2, 2]
+    assert budget["CHD_IN"].tolist() == [10.0, 20.0, 30.0]
+    assert budget["CUM_CHD_IN"].tolist() == [100.0, 200.0, 300.0]
+    assert budget["CHD_OUT"].tolist() == [0.5, 0.5, 0.5]
+    # terms that appear more than once get the package name
+    assert budget["UZF_IN"].tolist() == [1.0, 1.0, 1.0]
+    assert budget["UZF_UZF-2_IN"].tolist() == [1.5e-100] * 3
+    assert budget["TOTAL_IN"].tolist() == [10.0, 20.0, 30.0]
+    assert budget["IN-OUT"].tolist() == [1.0e-3] * 3
+    assert budget["PERCENT_DISCREPANCY"].tolist() == [0.02] * 3
+    assert budget["CUM_PERCENT_DISCREPANCY"].tolist() == [0.01] * 3
+
+    times = lst.times
+    assert times["kstp"].tolist() == [1, 1, 2]
+    assert times["delt"].tolist() == [1.0, 1.0, 1.0]
+    assert times["totim"].tolist() == [1.0, 2.0, 3.0]
+    assert lst.elapsed == 90.5
+
+
+def count_parsed_lines(monkeypatch):
+    parsed = []
+    parse = mf6lst.ListingFile._parse
+
+    def counting_parse(self, line):
+        parsed.append(line)
+        parse(self, line)
+
+    monkeypatch.setattr(mf6lst.ListingFile, "_parse", counting_parse)
+    return parsed
+
+
+def test_read_listing(tmp_path):
+    fpth = tmp_path / "mfsim.lst"
+    fpth.write_text(listing_text())
+    check_listing(mf6lst.ListingFile(str(fpth)))
+
+
+def test_listing_update(tmp_path):
+    fpth = tmp_path / "mfsim.lst"
+    text = listing_text()
+    # the file ends inside a budget table and a line
+    split = text.index("TOTAL OUT", len(step_text(0)) + 10)
+    fpth.write_text(text[:split])
+    lst = mf6lst.ListingFile(str(fpth))
+    assert lst.solver["kper"].tolist() == [1, 2]
+    assert lst.budget["kper"].tolist() == [1]
+    assert lst.offset == text.rindex("\n", 0, split) + 1
+
+    with open(fpth, "a") as f:
+        f.write(text[split:])
+    offset = lst.offset
+    assert lst.update() == len(text) - offset
+    check_listing(lst)
+    assert lst.update() == 0
+
+
+def test_listing_cache_resume(tmp_path, monkeypatch):
+    fpth = tmp_path / "mfsim.lst"
+    text = listing_text()
+    first = step_text(0)
+    fpth.write_text(first)
+    mf6lst.read_listing(str(fpth))
+    assert os.path.isfile(mf6lst.ListingFile(str(fpth))._cache_path())
+
+    # the listing grows, only the appended lines are parsed
+    with open(fpth, "a") as f:
+        f.write(text[len(first) :])
+    parsed = count_parsed_lines(monkeypatch)
+    lst = mf6lst.read_listing(str(fpth))
+    assert len(parsed) == len(text[len(first) :].splitlines())
+    check_listing(lst)
+
+    # a listing file of another run is parsed from the start
+    fpth.write_text(text.replace("30.500 Seconds", "31.500 Seconds"))
+    parsed.clear()
+    lst = mf6lst.read_listing(str(fpth))
+    assert len(parsed) == len(text.splitlines())
+    assert lst.elapsed == 91.5
@@ -0,0 +1,99 @@
+import os
+import sys
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "common"))
+import mf6run
+
+# lines written by MODFLOW 6 to stdout and to the simulation listing file
+stdout_lines = [
+    "                                   MODFLOW 6",
+    "    Solving:  Stress period:     1    Time step:     1",
+    "    Solving:  Stress period:     2    Time step:    12",
+    " Normal termination of simulation.",
+]
+
+listing_lines = [
+    " 12 CALLS TO NUMERICAL SOLUTION IN TIME STEP 1 STRESS PERIOD 1",
+    " 57 TOTAL ITERATIONS",
+    " 3 CALLS TO NUMERICAL SOLUTION IN TIME STEP 12 STRESS PERIOD 2",
+    " 8 TOTAL ITERATIONS",
+    " FAILED TO MEET SOLVER CONVERGENCE CRITERIA IN TIME STEP 12 OF "
+    "STRESS PERIOD 2",
+    " OUTER ITERATION SUMMARY",
+]
+
+# shell script that writes the lines like MODFLOW 6
+fake_mf6 = """\
+#!/bin/sh
+printf '{listing}\\n' > mfsim.lst
+printf '{stdout}\\n'
+"""
+
+
+def test_step_end_times():
+    perioddata = [(1.0, 1, 1.0), (10.0, 4, 1.0), (31.0, 5, 2.0)]
+    first, times = mf6run._step_end_times(perioddata)
+    assert first.tolist() == [0, 1, 5]
+    assert np.allclose(times[:5], [1.0, 3.5, 6.0, 8.5, 11.0])
+    # the steps of a period with tsmult grow by tsmult and sum to perlen
+    assert np.allclose(times[5:], 11.0 + np.array([1.0, 3.0, 7.0, 15.0, 31.0]))
+
+    progress = mf6run.Mf6Progress("test", perioddata=perioddata)
+    assert progress.total_steps == 10
+    assert progress.simulated_time is None
+    progress.kper, progress.kstp = 3, 2
+    assert progress.simulated_time == pytest.approx(14.0)
+
+
+def test_parse_stdout_and_listing():
+    progress = mf6run.Mf6Progress("test")
+    started = [progress.parse_stdout(line) for line in stdout_lines]
+    assert started == [False, True, True, False]
+    assert (progress.kper, progress.kstp, progress.nstep) == (2, 12, 2)
+
+    solved = [progress.parse_listing(line) for line in listing_lines]
+    assert solved == [False, True, False, True, False, False]
+    assert progress.nouter == 15
+    assert progress.ninner == 65
+    assert progress.nfail == 1
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses a shell script")
+def test_run_inside_running_loop(tmp_path):
+    exe = tmp_path / "mf6"
+    exe.write_text(
+        fake_mf6.format(
+            listing="\\n".join(listing_lines), stdout="\\n".join(stdout_lines)
+        )
+    )
+    exe.chmod(0o755)
+    reports = []
+
+    def callback(progress):
+        reports.append((threading.get_ident(), progress.done))
+
+    def run():
+        return mf6run.run(str(exe), str(tmp_path), callback=callback)
+
+    # without a running event loop the run uses the calling thread
+    success, buff, progress = run()
+    assert success
+    assert buff == stdout_lines
+    assert reports[-1] == (threading.get_ident(), True)
+
+    # inside a running loop, like in a notebook, asyncio.run can not be used
+    # and the run uses a worker thread
+    async def main():
+        return run()
+
+    reports.clear()
+    success, buff, progress = asyncio.run(main())
+    assert success
+    assert (progress.nstep, progress.nouter, progress.nfail) == (2, 15, 1)
+    assert reports[-1][1]
+    assert reports[-1][0] != threading.get_ident()
@@ -0,0 +1,184 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "common"))
+import mf6write
+
+uzf_dtype = np.dtype([("iuzno", int), ("finf", float), ("pet", float)])
+
+package_text = """\
+BEGIN options
+END options
+
+BEGIN period  1
+  1  0.1  0.0
+END period  1
+"""
+
+
+def uzf_records(finf, iuzno=None):
+    records = np.zeros(len(finf), dtype=uzf_dtype)
+    records["iuzno"] = np.arange(len(finf)) if iuzno is None else iuzno
+    records["finf"] = finf
+    return records
+
+
+def reused_periods(finfs, first_kper=1):
+    # like a streaming generator, the same array is updated in place
+    records = uzf_records(finfs[0])
+    for kper, finf in enumerate(finfs, start=first_kper):
+        records["finf"] = finf
+        yield kper, records
+
+
+def test_delta_periods_changed_records():
+    previous = uzf_records([0.1, 0.2, 0.3])
+    finfs = [[0.1, 0.2, 0.3], [0.1, 0.5, 0.3], [0.1, 0.5, 0.3], [0.4, 0.5, 0.6]]
+    delta = list(mf6write.delta_periods(reused_periods(finfs), previous))
+    # periods without changes are skipped
+    assert [kper for kper, _ in delta] == [2, 4]
+    assert delta[0][1]["iuzno"].tolist() == [1]
+    assert delta[0][1]["finf"].tolist() == [0.5]
+    # compared with the last produced period, not the input buffer
+    assert delta[1][1]["iuzno"].tolist() == [0, 2]
+    assert delta[1][1]["finf"].tolist() == [0.4, 0.6]
+
+
+def test_delta_periods_full_periods():
+    # without previous records the first period is produced in full
+    delta = list(mf6write.delta_periods(reused_periods([[0.1, 0.2]])))
+    assert delta[0][1]["finf"].tolist() == [0.1, 0.2]
+
+    # a change of the keys or of the number of records produces the full
+    # period
+    previous = uzf_records([0.1, 0.2])
+    periods = [
+        (1, uzf_records([0.1, 0.2], iuzno=[1, 0])),
+        (2, uzf_records([0.1, 0.2, 0.3])),
+    ]
+    delta = list(mf6write.delta_periods(iter(periods), previous))
+    assert [kper for kper, _ in delta] == [1, 2]
+    assert delta[0][1]["iuzno"].tolist() == [1, 0]
+    assert delta[1][1].shape == (3,)
+
+
+def test_write_period_files(tmp_path):
+    fpth = tmp_path / "model.uzf"
+    fpth.write_text(package_text)
+    periods = [(1, uzf_records([0.5, 1.25e-9])), (3, uzf_records([2.0]))]
+    fnames = mf6write.write_period_files(
+        str(fpth), iter(periods), index_fields=("iuzno",)
+    )
+    assert fnames == ["model.uzf.per00002.txt", "model.uzf.per00004.txt"]
+    text = fpth.read_text()
+    assert text.startswith(package_text)
+    assert "BEGIN period  2\n  OPEN/CLOSE  model.uzf.per00002.txt\n" in text
+    assert text.endswith("END period  4\n")
+
+    # index fields are one-based, the records are not changed
+    lines = (tmp_path / fnames[0]).read_text().splitlines()
+    assert [line.split() for line in lines] == [
+        ["1", "0.5", "0"],
+        ["2", "1.25E-09", "0"],
+    ]
+    assert periods[0][1]["iuzno"].tolist() == [0, 1]
+
+
+def test_write_period_files_order(tmp_path):
+    fpth = tmp_path / "model.uzf"
+    fpth.write_text(package_text)
+    with pytest.raises(ValueError, match="not after the last PERIOD block"):
+        mf6write.write_period_files(str(fpth), iter([(0, uzf_records([1.0]))]))
+
+    mf6write.write_period_files(str(fpth), iter([(2, uzf_records([1.0]))]))
+    with pytest.raises(ValueError, match="stress period 2"):
+        mf6write.write_period_files(str(fpth), iter([(1, uzf_records([1.0]))]))
+
+
+def test_write_records_round_trip(tmp_path):
+    fpth = tmp_path / "records.txt"
+    rng = np.random.default_rng(0)
+    records = uzf_records(rng.uniform(0.0, 1.0e-6, 50))
+    records["pet"] = rng.uniform(-1.0e3, 1.0e3, 50)
+    mf6write._write_records(str(fpth), records, ())
+    values = np.loadtxt(fpth)
+    assert values[:, 0].tolist() == records["iuzno"].tolist()
+    # %.15G keeps 15 significant digits
+    assert np.allclose(values[:, 1], records["finf"], rtol=1e-14, atol=0.0)
+    assert np.allclose(values[:, 2], records["pet"], rtol=1e-14, atol=0.0)
+
+
+def build_sim(ws, k=1.0):
+    import flopy
+
+    sim = flopy.mf6.MFSimulation(sim_name="manifest", sim_ws=str(ws))
+    flopy.mf6.ModflowTdis(sim)
+    flopy.mf6.ModflowIms(sim)
+    gwf = flopy.mf6.ModflowGwf(sim, modelname="gwf")
+    flopy.mf6.ModflowGwfdis(gwf, nrow=2, ncol=3)
+    flopy.mf6.ModflowGwfic(gwf)
+    flopy.mf6.ModflowGwfnpf(gwf, k=k)
+    return sim
+
+
+def write_changed(sim):
+    manifest = mf6write.PackageManifest(sim)
+    changed = manifest.changed()
+    manifest.write(changed)
+    return changed
+
+
+def stamps(ws):
+    return {
+        fname: os.stat(os.path.join(ws, fname)).st_mtime_ns
+        for fname in os.listdir(ws)
+    }
+
+
+def test_package_manifest_unchanged(tmp_path):
+    sim = build_sim(tmp_path)
+    assert len(write_changed(sim)) == 7
+    before = stamps(tmp_path)
+    # nothing is written, including the manifest
+    assert write_changed(build_sim(tmp_path)) == []
+    assert stamps(tmp_path) == before
+
+
+def test_package_manifest_changed_only(tmp_path):
+    write_changed(build_sim(tmp_path))
+    before = stamps(tmp_path)
+
+    # changed package data
+    assert write_changed(build_sim(tmp_path, k=2.0)) == ["gwf.npf"]
+    after = stamps(tmp_path)
+    assert after["gwf.npf"] != before["gwf.npf"]
+    assert after["gwf.dis"] == before["gwf.dis"]
+
+    # files that are missing or were changed after they were written
+    os.remove(tmp_path / "gwf.ic")
+    with open(tmp_path / "gwf.dis", "a") as f:
+        f.write("# edited\n")
+    sim = build_sim(tmp_path, k=2.0)
+    assert write_changed(sim) == ["gwf.dis", "gwf.ic"]
+    assert "# edited" not in (tmp_path / "gwf.dis").read_text()
+    assert write_changed(build_sim(tmp_path, k=2.0)) == []
+
+
+def test_package_manifest_save_after_append(tmp_path):
+    sim = build_sim(tmp_path)
+    manifest = mf6write.PackageManifest(sim)
+    manifest.write(manifest.changed())
+    with open(tmp_path / "gwf.npf", "a") as f:
+        f.write("# appended\n")
+    # without save the appended file does not match the manifest
+    assert write_changed(build_sim(tmp_path)) == ["gwf.npf"]
+
+    manifest = mf6write.PackageManifest(build_sim(tmp_path, k=2.0))
+    manifest.write(manifest.changed())
+    with open(tmp_path / "gwf.npf", "a") as f:
+        f.write("# appended\n")
+    manifest.save()
+    assert write_changed(build_sim(tmp_path, k=2.0)) == []
@@ -0,0 +1,137 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "common"))
+import mfnwt
+
+# SFR2 file with ISFROPT 0 and a segment for ICALC 1, 2 and 3. Items 6b
+# and 6c only hold a width for ICALC <= 1, and ICALC 2 is followed by the
+# eight-point cross section (items 6d and 6e).
+sfr2_icalc = """\
+# SFR2 file
+3  3  0  0  86400.  0.0001  0  0
+1  1  1  1  1  100.  1.
+1  1  2  2  1  100.  1.
+1  1  3  3  1  100.  1.
+3  0  0
+1  1  2  0  0.5  0.  0.  0.  0.035
+1.0  1.0  100.  5.0
+1.0  1.0  99.  6.0
+2  2  3  0  0.  0.  0.  0.  0.035  0.05
+1.0  1.0  98.
+1.0  1.0  97.
+0.  10.  20.  30.  40.  50.  60.  70.
+5.  4.  3.  2.  2.  3.  4.  5.
+3  3  0  0  0.  0.  0.  0.  0.3  0.4  5.0  0.5
+1.0  1.0  96.
+1.0  1.0  95.
+"""
+
+
+def test_read_sfr2_icalc(tmp_path):
+    fpth = tmp_path / "model.sfr"
+    fpth.write_text(sfr2_icalc)
+    reaches, segments = mfnwt.read_sfr2(str(fpth))
+    assert reaches.shape == (3,)
+    assert segments.nseg.tolist() == [1, 2, 3]
+    assert segments.icalc.tolist() == [1, 2, 3]
+    assert segments.outseg.tolist() == [2, 3, 0]
+    assert segments.width1[0] == 5.0
+    assert segments.width2[0] == 6.0
+    assert np.isnan(segments.width1[1:]).all()
+    assert np.isnan(segments.width2[1:]).all()
+    assert segments.roughch.tolist()[:2] == [0.035, 0.035]
+    assert segments.roughbk[1] == 0.05
+
+
+# free-format tokens that _parse_free parses itself and the python floats
+# they must match exactly
+free_tokens = [
+    "0", "7", "-1.5", "+2.25", "1234.56", "-0.001", ".5", "5.", "-.25",
+    "12345678", "1234.5678", "99999999.", "0.00000001", "1.5E3", "1.5e-3",
+    "-2.5D+02", "3d4", "1.E5", "+7e0", "1234567.8E-12", "12345678.12345678",
+    "1E+22", "4E-22", "1e300", "-1e-300",
+]
+
+# tokens that make the whole array fall back to np.fromstring: more than
+# eight integer digits or more than eight fraction digits
+fallback_tokens = ["123456789012", "-0.123456789", "0.12345678901234567"]
+
+
+def write_free_array(fpth, rows):
+    """Write rows of tokens, each row a list of lines, as an INTERNAL array"""
+    with open(fpth, "w") as f:
+        f.write("INTERNAL  1.0  (FREE)  0\n")
+        for row in rows:
+            for line in row:
+                f.write(" ".join(line) + "\n")
+
+
+def value_starts(tmp_path, text):
+    fpth = tmp_path / "tokens.txt"
+    fpth.write_bytes(text)
+    return mfnwt.ArrayFileReader(str(fpth)).value_start
+
+
+def expected_values(tokens):
+    return np.array(
+        [float(t.replace("d", "e").replace("D", "e")) for t in tokens]
+    )
+
+
+def test_parse_free_matches_float(tmp_path):
+    text = " ".join(free_tokens).encode()
+    values = mfnwt._parse_free(text, value_starts(tmp_path, text))
+    assert values is not None
+    assert np.array_equal(values, expected_values(free_tokens))
+
+    rng = np.random.default_rng(0)
+    numbers = rng.uniform(-3000.0, 3000.0, 2000)
+    for fmt in ("%.2f", "%.6g", "%15.6E", "%10.3f", "%.4e"):
+        tokens = [fmt % v for v in numbers]
+        text = "\n".join(tokens).encode()
+        values = mfnwt._parse_free(text, value_starts(tmp_path, text))
+        assert values is not None, fmt
+        assert np.array_equal(values, [float(t) for t in tokens]), fmt
+
+
+def test_parse_free_rejects_invalid_tokens(tmp_path):
+    for token in ("-.", ".", "e5", ".E5", "-E5", "1.5.2", "1-2", "abc", "1e"):
+        text = "1.0 {} 2.0".format(token).encode()
+        values = mfnwt._parse_free(text, value_starts(tmp_path, text))
+        assert values is None, token
+    for token in fallback_tokens:
+        text = "1.0 {} 2.0".format(token).encode()
+        assert mfnwt._parse_free(text, value_starts(tmp_path, text)) is None
+
+
+def test_read_array_wrapped_and_ragged_rows(tmp_path, monkeypatch):
+    tokens = free_tokens + fallback_tokens
+    ncol = 7
+    nrow = len(tokens) // ncol
+    tokens = tokens[: nrow * ncol]
+    expected = expected_values(tokens).reshape(nrow, ncol)
+    cells = [tokens[i * ncol : (i + 1) * ncol] for i in range(nrow)]
+    layouts = {
+        "one row per line": [[row] for row in cells],
+        "wrapped": [[row[:4], row[4:]] for row in cells],
+        "ragged": [
+            [row[:i + 1], row[i + 1 :]] if i % 2 else [row]
+            for i, row in enumerate(cells)
+        ],
+    }
+    for has_bitwise_count in (True, False):
+        monkeypatch.setattr(mfnwt, "_has_bitwise_count", has_bitwise_count)
+        for label, rows in layouts.items():
+            fpth = tmp_path / "array.txt"
+            write_free_array(fpth, rows)
+            arr = mfnwt.ArrayFileReader(str(fpth)).read_array((nrow, ncol))
+            assert np.array_equal(arr, expected), label
+
+        # only the supported tokens, so the vectorized parser is used
+        fpth = tmp_path / "array.txt"
+        write_free_array(fpth, [[row] for row in cells[:2]])
+        arr = mfnwt.ArrayFileReader(str(fpth)).read_array((2, ncol))
+        assert np.array_equal(arr, expected[:2])